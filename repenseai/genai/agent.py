@@ -4,6 +4,12 @@ import typing as tp
 
 from repenseai.secrets.base import BaseSecrets
 from repenseai.genai.mcp.server import Server, ServerManager
+from repenseai.genai.batch import run_batch
+from repenseai.genai.cache import CompletionCache
+from repenseai.genai.prompt_cache import tokens_cost
+from repenseai.genai.scheduler import RateLimiter
+from repenseai.genai.selection import MetricsStore
+from repenseai.genai.tokens import count_tokens, get_context_window
 
 from repenseai.genai.providers import (
     TEXT_MODELS,
@@ -49,16 +55,27 @@ class AsyncAgent:
         model_type: str,
         api_key: str = None,
         secrets_manager: BaseSecrets = None,
-        server: tp.Union[Server, tp.List[Server]] = None,
+        server: tp.Union[Server, tp.List[Server], ServerManager] = None,
+        rate_limiter: RateLimiter = None,
+        cache: CompletionCache = None,
+        metrics_store: MetricsStore = None,
+        hooks: tp.List[tp.Any] = None,
         **kwargs,
     ) -> None:
         self.model = model
         self.model_type = model_type
         self.api_key = api_key
         self.secrets_manager = secrets_manager
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metrics_store = metrics_store
+        self.hooks = hooks or []
 
         # Inicializa o server_manager com os servidores fornecidos
-        if server is not None:
+        if isinstance(server, ServerManager):
+            # i.e. a ServerPool shared by many agents
+            self.server_manager = server
+        elif server is not None:
             if not isinstance(server, list):
                 servers = [server]
             else:
@@ -161,6 +178,14 @@ class AsyncAgent:
     def get_price(self) -> dict:
         return self.price
 
+    def get_context_window(self) -> int | None:
+        """Context window of the model in tokens (`context_window` kwarg overrides)."""
+        return self.kwargs.get("context_window") or get_context_window(self.model)
+
+    def count_tokens(self, messages: tp.Any, tools: list | None = None) -> int:
+        """Prompt tokens of `messages` for this model, counted locally."""
+        return count_tokens(messages, self.provider, self.model, tools)
+
     def calculate_cost(
         self,
         tokens: tp.Union[tp.Dict[str, int], int, None] = None,
@@ -176,14 +201,9 @@ class AsyncAgent:
                 return 0
 
         if isinstance(tokens, dict):
-            if isinstance(self.price, dict):
-                input_cost = tokens["prompt_tokens"] * self.price["input"]
-                output_cost = tokens["completion_tokens"] * self.price["output"]
-                total = (input_cost + output_cost) / 1_000_000
-            else:
-                input_cost = tokens["prompt_tokens"] * self.price
-                output_cost = tokens["completion_tokens"] * self.price
-                total = (input_cost + output_cost) / 1_000_000
+            # Prompt tokens read from (or written to) the provider cache
+            # have their own price
+            total = tokens_cost(tokens, self.price, self.provider)
         else:
             total = self.price * tokens
 
@@ -200,6 +220,10 @@ class Agent:
         model_type: str,
         api_key: str = None,
         secrets_manager: BaseSecrets = None,
+        rate_limiter: RateLimiter = None,
+        cache: CompletionCache = None,
+        metrics_store: MetricsStore = None,
+        hooks: tp.List[tp.Any] = None,
         **kwargs,
     ) -> None:
 
@@ -207,6 +231,10 @@ class Agent:
         self.model_type = model_type
         self.api_key = api_key
         self.secrets_manager = secrets_manager
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metrics_store = metrics_store
+        self.hooks = hooks or []
 
         self.tokens = None
         self.api = None
@@ -304,9 +332,30 @@ class Agent:
 
         return self.api
 
+    def batch(
+        self,
+        tasks: tp.List[tp.Any],
+        context: tp.List[dict] | dict | None = None,
+        **kwargs,
+    ) -> list:
+        """
+        Run many tasks of this agent as one provider batch job, for offline
+        workloads. See `repenseai.genai.batch.run_batch` for the options
+        (`path` for resumable state, `poll_interval`, `timeout`, `local`).
+        """
+        return run_batch(self, tasks, context, **kwargs)
+
     def get_price(self) -> dict:
         return self.price
 
+    def get_context_window(self) -> int | None:
+        """Context window of the model in tokens (`context_window` kwarg overrides)."""
+        return self.kwargs.get("context_window") or get_context_window(self.model)
+
+    def count_tokens(self, messages: tp.Any, tools: list | None = None) -> int:
+        """Prompt tokens of `messages` for this model, counted locally."""
+        return count_tokens(messages, self.provider, self.model, tools)
+
     def calculate_cost(
         self,
         tokens: tp.Union[tp.Dict[str, int], int, None] = None,
@@ -323,17 +372,9 @@ class Agent:
                 return 0
 
         if isinstance(tokens, dict):
-            if isinstance(self.price, dict):
-                input_cost = tokens["prompt_tokens"] * self.price["input"]
-                output_cost = tokens["completion_tokens"] * self.price["output"]
-
-                total = (input_cost + output_cost) / 1_000_000
-
-            else:
-                input_cost = tokens["prompt_tokens"] * self.price
-                output_cost = tokens["completion_tokens"] * self.price
-
-                total = (input_cost + output_cost) / 1_000_000
+            # Prompt tokens read from (or written to) the provider cache
+            # have their own price
+            total = tokens_cost(tokens, self.price, self.provider)
         else:
             total = self.price * tokens
 
@@ -1,9 +1,18 @@
-import base64
-import httpx
-import io
 import inspect
 import json
 
+from functools import partial
+
+from repenseai.genai.clients import get_client
+from repenseai.genai.images import (
+    afetch_image_base64,
+    aprefetch_images,
+    fetch_image_base64,
+    get_image_urls,
+    prefetch_images,
+)
+from repenseai.genai.prompt_cache import add_cache_control
+from repenseai.genai.retry import NO_RETRY
 from repenseai.genai.providers import VISION_MODELS
 from repenseai.genai.mcp.server import ServerManager
 
@@ -11,15 +20,84 @@ from mcp.types import Tool
 
 from typing import Any, Dict, Union, List, Callable
 
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
+from anthropic.types import Message
 from pydantic import BaseModel
 
 from PIL import Image
 
+from repenseai.utils.agent import (
+    acall_function,
+    arun_tools,
+    call_function,
+    get_tool_input,
+    run_tools,
+)
+from repenseai.utils.image import image_to_base64
 from repenseai.utils.logs import logger
 from repenseai.utils.text import extract_json_text
 
 
+def get_tool_calls(message: dict) -> list:
+    """Tool uses of an assistant message as {"id", "name", "arguments", "input"}."""
+    calls = []
+
+    if not isinstance(message, dict) or not message.get("content"):
+        return calls
+
+    for content in message.get("content"):
+        if isinstance(content, dict) and content.get("type") == "tool_use":
+            calls.append(
+                {
+                    "id": content.get("id"),
+                    "name": content.get("name"),
+                    "arguments": json.dumps(content.get("input") or {}),
+                    "input": content.get("input") or {},
+                }
+            )
+
+    return calls
+
+
+def get_usage_tokens(usage: dict) -> dict:
+    """
+    Token usage of a message. `prompt_tokens` counts every prompt token;
+    `cached_tokens` were read from the prompt cache and
+    `cache_creation_tokens` written to it.
+    """
+    input_tokens = usage.get("input_tokens") or 0
+    output_tokens = usage.get("output_tokens") or 0
+
+    cached_tokens = usage.get("cache_read_input_tokens") or 0
+    cache_creation_tokens = usage.get("cache_creation_input_tokens") or 0
+
+    prompt_tokens = input_tokens + cached_tokens + cache_creation_tokens
+
+    return {
+        "completion_tokens": output_tokens,
+        "prompt_tokens": prompt_tokens,
+        "total_tokens": output_tokens + prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "cache_creation_tokens": cache_creation_tokens,
+    }
+
+
+def build_tool_call_message(calls: list, text: str = "") -> dict:
+    content = [{"type": "text", "text": text}] if text else []
+
+    for call in calls:
+        content.append(
+            {
+                "type": "tool_use",
+                "id": call.get("id"),
+                "name": call.get("name"),
+                "input": call.get("input") or {},
+            }
+        )
+
+    return {"role": "assistant", "content": content}
+
+
 class AsyncChatAPI:
     def __init__(
         self,
@@ -32,6 +110,7 @@ class AsyncChatAPI:
         tools: List[Callable] = None,
         json_schema: BaseModel = None,
         server: ServerManager = None,
+        prompt_cache: bool = True,
         **kwargs,
     ):
         self.api_key = api_key
@@ -42,6 +121,7 @@ class AsyncChatAPI:
         self.thinking = thinking
         self.json_schema = json_schema
         self.server_manager = server
+        self.prompt_cache = prompt_cache
 
         self.response = None
         self.tokens = None
@@ -52,7 +132,14 @@ class AsyncChatAPI:
         self.tool_flag = False
         self.server_tools_initialized = False
 
-        self.client = Anthropic(api_key=api_key)
+        self.client = get_client(
+            "anthropic",
+            AsyncAnthropic,
+            api_key=api_key,
+            asynchronous=True,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
         if tools:
             self.tools = {tool.__name__: tool for tool in tools}
@@ -120,15 +207,16 @@ class AsyncChatAPI:
             string += f'"{k}": "{v}",\n'
         return string
 
-    def __process_content_image(self, image_url: dict) -> str:
-        url = image_url.get("url")
-        image_content = httpx.get(url).content
-        return base64.standard_b64encode(image_content).decode("utf-8")
+    async def __process_content_image(self, image_url: dict) -> str:
+        return await afetch_image_base64(image_url.get("url"))
 
     def __get_media_type(self, image_url: dict) -> str:
         return "image/png" if "png" in image_url.get("url") else "image/jpeg"
 
-    def __process_prompt_list(self, prompt: list) -> list:
+    async def __process_prompt_list(self, prompt: list) -> list:
+        # Download every image of the conversation at once (or hit the cache)
+        await aprefetch_images(get_image_urls(prompt))
+
         for history in prompt:
             content = history.get("content", [])
 
@@ -140,7 +228,7 @@ class AsyncChatAPI:
                 img_dict = {
                     "type": "image",
                     "source": {
-                        "data": self.__process_content_image(image_url),
+                        "data": await self.__process_content_image(image_url),
                         "type": "base64",
                         "media_type": self.__get_media_type(image_url),
                     },
@@ -167,7 +255,7 @@ class AsyncChatAPI:
         }
 
         if isinstance(prompt, list):
-            json_data["messages"] = self.__process_prompt_list(prompt)
+            json_data["messages"] = await self.__process_prompt_list(prompt)
         else:
             json_data["messages"] = [{"role": "user", "content": prompt}]
 
@@ -179,9 +267,6 @@ class AsyncChatAPI:
                 }
                 json_data["temperature"] = 1.0
 
-            if self.stream and not self.json_tools and not self.json_schema:
-                return self._stream_api_call(json_data)
-
             if self.json_tools and not self.json_schema:
                 json_data["tools"] = self.json_tools
 
@@ -193,58 +278,87 @@ class AsyncChatAPI:
                 )
                 json_data["messages"].append({"role": "user", "content": output_prompt})
 
-            self.response = self.client.messages.create(**json_data)
+            # Stable prefixes (tools, history) are read from the prompt cache
+            if self.prompt_cache:
+                json_data = add_cache_control(json_data)
+
+            # Tool calls are streamed as deltas and assembled by the Task
+            if self.stream and not self.json_schema:
+                return self._stream_api_call(json_data)
+
+            self.response = await self.retry_policy.acall(
+                self.client.messages.create, **json_data
+            )
             self.tokens = self.get_tokens()
             return self.get_output()
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Error in API call - model {json_data['model']}: {e}")
 
     async def process_tool_calls(self, message: dict) -> list:
-        tools = []
+        calls = get_tool_calls(message)
 
-        # Verificar o formato da mensagem
-        if isinstance(message, dict) and message.get("content"):
-            for content_item in message.get("content", []):
-                if content_item.get("type") == "tool_use":
-                    tools.append(content_item)
+        # Independent tool calls of the same turn run concurrently
+        tool_messages = await arun_tools(
+            [partial(self.run_tool_call, call) for call in calls]
+        )
 
-        tool_messages = []
+        return self.build_tool_results(tool_messages)
 
-        for tool in tools:
-            args = tool.get("input")
-            tool_name = tool.get("name")
+    def build_tool_call_message(self, calls: list, text: str = "") -> dict:
+        """Assistant message of assembled (streamed) tool calls."""
+        return build_tool_call_message(calls, text)
 
-            output = None
+    def build_tool_results(self, results: list) -> list:
+        return [{"role": "user", "content": list(results)}]
 
-            # Try to call server tool first
-            if self.server_manager is not None:
-                try:
-                    tool_output = await self.server_manager.call_tool(tool_name, args)
-                    output = tool_output.content
-                except ValueError:
-                    # Tool not found in server, try local tools
-                    pass
-
-            # If not found in server, try local tools
-            if not output and self.tools and tool_name in self.tools:
-                try:
-                    output = await self.tools[tool_name](**args)
-                except Exception as e:
-                    logger(f"Error calling tool {tool_name}: {str(e)}")
+    async def run_tool_call(self, call: dict) -> dict:
+        """Run one tool call ({"id", "name", "input"}) into a tool result."""
+        tool_name = call.get("name")
 
-            if output is None:
-                output = f"Error: Tool '{tool_name}' not found or failed to execute"
+        try:
+            args = get_tool_input(call)
+        except ValueError as e:
+            logger(f"Invalid arguments for tool {tool_name}: {str(e)}")
 
-            tool_messages.append(
-                {
-                    "type": "tool_result",
-                    "tool_use_id": tool.get("id"),
-                    "content": str(output),
-                }
-            )
+            return {
+                "type": "tool_result",
+                "tool_use_id": call.get("id"),
+                "content": f"Error: Invalid arguments for tool '{tool_name}': {e}",
+                "is_error": True,
+            }
 
-        return [{"role": "user", "content": tool_messages}]
+        output = None
+
+        # Try to call server tool first
+        if self.server_manager is not None:
+            try:
+                tool_output = await self.server_manager.call_tool(tool_name, args)
+                output = tool_output.content
+            except ValueError:
+                # Tool not found in server, try local tools
+                pass
+            except Exception as e:
+                logger(f"Error calling tool {tool_name}: {str(e)}")
+
+        # If not found in server, try local tools
+        if not output and self.tools and tool_name in self.tools:
+            try:
+                output = await acall_function(self.tools[tool_name], args)
+            except Exception as e:
+                logger(f"Error calling tool {tool_name}: {str(e)}")
+
+        if output is None:
+            output = f"Error: Tool '{tool_name}' not found or failed to execute"
+
+        return {
+            "type": "tool_result",
+            "tool_use_id": call.get("id"),
+            "content": str(output),
+        }
 
     def get_response(self) -> Any:
         return self.response
@@ -278,31 +392,15 @@ class AsyncChatAPI:
 
     def get_tokens(self) -> Union[None, dict]:
         if self.response is not None:
-            input_tokens = self.response.usage.input_tokens
-            output_tokens = self.response.usage.output_tokens
-
-            return {
-                "completion_tokens": output_tokens,
-                "prompt_tokens": input_tokens,
-                "total_tokens": output_tokens + input_tokens,
-            }
+            return get_usage_tokens(self.response.usage.model_dump())
         else:
             return None
 
     def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
         if chunk.type == "content_block_delta":
-            return chunk.delta.text
+            return getattr(chunk.delta, "text", None)
         if chunk.type == "message_stop":
-            usage = chunk.model_dump()["message"]["usage"]
-
-            input_tokens = usage.get("input_tokens", 0)
-            output_tokens = usage.get("output_tokens", 0)
-
-            self.tokens = {
-                "completion_tokens": output_tokens,
-                "prompt_tokens": input_tokens,
-                "total_tokens": output_tokens + input_tokens,
-            }
+            self.tokens = get_usage_tokens(chunk.model_dump()["message"]["usage"])
 
 
 class ChatAPI:
@@ -316,6 +414,7 @@ class ChatAPI:
         thinking: bool = False,
         tools: List[Callable] = None,
         json_schema: BaseModel = None,
+        prompt_cache: bool = True,
         **kwargs,
     ):
         self.api_key = api_key
@@ -324,6 +423,7 @@ class ChatAPI:
         self.max_tokens = max_tokens
         self.stream = stream
         self.thinking = thinking
+        self.prompt_cache = prompt_cache
 
         self.json_schema = json_schema
 
@@ -340,7 +440,13 @@ class ChatAPI:
             self.tools = {tool.__name__: tool for tool in tools}
             self.json_tools = [self.__function_to_json(tool) for tool in tools]
 
-        self.client = Anthropic(api_key=self.api_key)
+        self.client = get_client(
+            "anthropic",
+            Anthropic,
+            api_key=self.api_key,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __function_to_json(self, func: callable) -> dict:
 
@@ -401,17 +507,15 @@ class ChatAPI:
         return string
 
     def __process_content_image(self, image_url: dict) -> dict:
-        url = image_url.get("url")
-
-        image_content = httpx.get(url).content
-        image = base64.standard_b64encode(image_content).decode("utf-8")
-
-        return image
+        return fetch_image_base64(image_url.get("url"))
 
     def __get_media_type(self, image_url: dict) -> str:
         return "image/png" if "png" in image_url.get("url") else "image/jpeg"
 
     def __process_prompt_list(self, prompt: list) -> list:
+        if self.model in VISION_MODELS:
+            prefetch_images(get_image_urls(prompt))
+
         for history in prompt:
             content = history.get("content", [])
 
@@ -443,7 +547,8 @@ class ChatAPI:
             for message in stream:
                 yield message
 
-    def call_api(self, prompt: list | str) -> Any:
+    def build_request(self, prompt: list | str) -> dict:
+        """Arguments of the messages request for `prompt`."""
         json_data = {
             "model": self.model,
             "temperature": self.temperature,
@@ -455,37 +560,59 @@ class ChatAPI:
         else:
             json_data["messages"] = [{"role": "user", "content": prompt}]
 
-        try:
-            if self.thinking:
-                json_data["thinking"] = {
-                    "type": "enabled",
-                    "budget_tokens": int(self.max_tokens * 0.75),
-                }
+        if self.thinking:
+            json_data["thinking"] = {
+                "type": "enabled",
+                "budget_tokens": int(self.max_tokens * 0.75),
+            }
 
-                json_data["temperature"] = 1.0
+            json_data["temperature"] = 1.0
 
-            if self.stream and not self.tools and not self.json_schema:
-                return self._stream_api_call(json_data)
+        if self.tools and not self.json_schema:
+            json_data["tools"] = self.json_tools
 
-            if self.tools and not self.json_schema:
-                json_data["tools"] = self.json_tools
+        if self.json_schema:
+            json_string = self.__schema_to_string()
+            output_prompt = (
+                "\n\nPlease provide the output information in a valid JSON format:\n\n"
+                f"{json_string}"
+            )
 
-            if self.json_schema:
-                json_string = self.__schema_to_string()
-                output_prompt = (
-                    "\n\nPlease provide the output information in a valid JSON format:\n\n"
-                    f"{json_string}"
-                )
+            json_data["messages"].append({"role": "user", "content": output_prompt})
 
-                json_data["messages"].append({"role": "user", "content": output_prompt})
+        # Stable prefixes (tools, history) are read from the prompt cache
+        if self.prompt_cache:
+            json_data = add_cache_control(json_data)
+
+        return json_data
+
+    def parse_response(self, body: dict) -> Any:
+        """Output of a message returned as JSON (i.e. by a batch job)."""
+        self.response = Message.model_validate(body)
+        self.tokens = self.get_tokens()
+
+        return self.get_output()
+
+    def call_api(self, prompt: list | str) -> Any:
+        try:
+            json_data = self.build_request(prompt)
 
-            self.response = self.client.messages.create(**json_data)
+            # Tool calls are streamed as deltas and assembled by the Task
+            if self.stream and not self.json_schema:
+                return self._stream_api_call(json_data)
+
+            self.response = self.retry_policy.call(
+                self.client.messages.create, **json_data
+            )
             self.tokens = self.get_tokens()
 
             return self.get_output()
 
         except Exception as e:
-            logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
+            if self.retry_policy is not NO_RETRY:
+                raise
+
+            logger(f"Erro na chamada da API - modelo {self.model}: {e}")
 
     def get_response(self) -> Any:
         return self.response
@@ -516,53 +643,58 @@ class ChatAPI:
 
     def get_tokens(self) -> Union[None, str]:
         if self.response is not None:
-
-            input_tokens = self.response.usage.input_tokens
-            output_tokens = self.response.usage.output_tokens
-
-            return {
-                "completion_tokens": output_tokens,
-                "prompt_tokens": input_tokens,
-                "total_tokens": output_tokens + input_tokens,
-            }
+            return get_usage_tokens(self.response.usage.model_dump())
         else:
             return None
 
     def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
         if chunk.type == "content_block_delta":
-            return chunk.delta.text
+            return getattr(chunk.delta, "text", None)
         if chunk.type == "message_stop":
-            usage = chunk.model_dump()["message"]["usage"]
+            self.tokens = get_usage_tokens(chunk.model_dump()["message"]["usage"])
 
-            input_tokens = usage.get("input_tokens", 0)
-            output_tokens = usage.get("output_tokens", 0)
+    def build_tool_call_message(self, calls: list, text: str = "") -> dict:
+        """Assistant message of assembled (streamed) tool calls."""
+        return build_tool_call_message(calls, text)
 
-            self.tokens = {
-                "completion_tokens": output_tokens,
-                "prompt_tokens": input_tokens,
-                "total_tokens": output_tokens + input_tokens,
+    def build_tool_results(self, results: list) -> list:
+        return [{"role": "user", "content": list(results)}]
+
+    def run_tool_call(self, call: dict) -> dict:
+        """Run one tool call ({"id", "name", "input"}) into a tool result."""
+        tool_name = call.get("name")
+
+        try:
+            args = get_tool_input(call)
+        except ValueError as e:
+            logger(f"Invalid arguments for tool {tool_name}: {str(e)}")
+
+            return {
+                "type": "tool_result",
+                "tool_use_id": call.get("id"),
+                "content": f"Error: Invalid arguments for tool '{tool_name}': {e}",
+                "is_error": True,
             }
 
-    def process_tool_calls(self, message: dict) -> list:
-        tools = message.get("content")
-        tool_messages = []
+        try:
+            output = call_function(self.tools[tool_name], args)
+        except Exception as e:
+            logger(f"Error calling tool {tool_name}: {str(e)}")
+            output = f"Error: Tool '{tool_name}' failed to execute: {e}"
 
-        for tool in tools:
-            if tool["type"] == "tool_use":
-                args = tool.get("input")
-                tool_name = tool.get("name")
+        return {
+            "type": "tool_result",
+            "tool_use_id": call.get("id"),
+            "content": str(output),
+        }
 
-                output = self.tools[tool_name](**args)
+    def process_tool_calls(self, message: dict) -> list:
+        calls = get_tool_calls(message)
 
-                tool_messages.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": tool.get("id"),
-                        "content": str(output),
-                    }
-                )
+        # Independent tool calls of the same turn run concurrently
+        tool_messages = run_tools([partial(self.run_tool_call, call) for call in calls])
 
-        return [{"role": "user", "content": tool_messages}]
+        return self.build_tool_results(tool_messages)
 
 
 class VisionAPI:
@@ -573,8 +705,15 @@ class VisionAPI:
         temperature: float = 0.0,
         max_tokens: int = 3500,
         stream: bool = False,
+        **kwargs,
     ):
-        self.client = Anthropic(api_key=api_key)
+        self.client = get_client(
+            "anthropic",
+            Anthropic,
+            api_key=api_key,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
@@ -588,56 +727,22 @@ class VisionAPI:
             for message in stream:
                 yield message
 
-    def _resize_image(self, image: Image.Image) -> Image.Image:
-        max_size = 1568
-        min_size = 200
-        width, height = image.size
-
-        if max(width, height) > max_size:
-            aspect_ratio = width / height
-            if width > height:
-                new_width = max_size
-                new_height = int(new_width / aspect_ratio)
-            else:
-                new_height = max_size
-                new_width = int(new_height * aspect_ratio)
-            image = image.resize((new_width, new_height))
-        elif min(width, height) < min_size:
-            aspect_ratio = width / height
-            if width < height:
-                new_width = min_size
-                new_height = int(new_width / aspect_ratio)
-            else:
-                new_height = min_size
-                new_width = int(new_height * aspect_ratio)
-            image = image.resize((new_width, new_height))
-
-        return image
-
-    def _process_image(self, image: Any) -> bytearray:
+    def _process_image(self, image: Any) -> tuple:
         if isinstance(image, str):
-            return image
+            return image, "image/png"
         elif isinstance(image, Image.Image):
-            img_byte_arr = io.BytesIO()
-
-            image = self._resize_image(image)
-            image.save(img_byte_arr, format="PNG")
-
-            img_byte_arr = img_byte_arr.getvalue()
-            image_string = base64.b64encode(img_byte_arr).decode("utf-8")
-
-            return image_string
+            return image_to_base64(image, "anthropic")
         else:
             raise Exception("Incorrect image type! Accepted: img_string or Image")
 
     def __create_content_image(self, image: str | Image.Image) -> dict:
-        img = self._process_image(image)
+        img, media_type = self._process_image(image)
         img_dict = {
             "type": "image",
             "source": {
                 "data": img,
                 "type": "base64",
-                "media_type": "image/png",
+                "media_type": media_type,
             },
         }
 
@@ -695,11 +800,16 @@ class VisionAPI:
             if self.stream:
                 return self._stream_api_call(json_data)
 
-            self.response = self.client.messages.create(**json_data)
+            self.response = self.retry_policy.call(
+                self.client.messages.create, **json_data
+            )
             self.tokens = self.get_tokens()
 
             return self.get_output()
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_output(self) -> Union[None, str]:
@@ -724,7 +834,7 @@ class VisionAPI:
 
     def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
         if chunk.type == "content_block_delta":
-            return chunk.delta.text
+            return getattr(chunk.delta, "text", None)
         if chunk.type == "message_stop":
             usage = chunk.model_dump()["message"]["usage"]
 
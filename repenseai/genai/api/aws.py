@@ -1,18 +1,200 @@
-import io
+import asyncio
 import base64
 import json
-import httpx
 
 from PIL import Image
 from typing import Any, Union
 
-import boto3
-
+from repenseai.genai.clients import get_boto3_client
+from repenseai.genai.images import (
+    afetch_image,
+    aprefetch_images,
+    fetch_image,
+    get_image_urls,
+    prefetch_images,
+)
+from repenseai.genai.retry import NO_RETRY
+from repenseai.utils.image import prepare_image
 from repenseai.utils.logs import logger
 
 from repenseai.genai.providers import VISION_MODELS
 
 
+class AsyncChatAPI:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "amazon.nova-micro-v1:0",
+        temperature: float = 0.0,
+        max_tokens: int = 3500,
+        stream: bool = False,
+        **kwargs,
+    ):
+        _ = api_key
+        self.model = model
+        self.temperature = temperature
+        self.stream = stream
+        self.max_tokens = max_tokens
+
+        self.tool_flag = False
+
+        self.response = None
+        self.tokens = None
+
+        self.client = get_boto3_client(
+            "bedrock-runtime",
+            region="us-east-1",
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
+
+    async def __process_content_image(self, image_url: dict) -> dict:
+        return await afetch_image(image_url.get("url"))
+
+    def __get_media_type(self, image_url: dict) -> str:
+        return "png" if "png" in image_url.get("url") else "jpeg"
+
+    async def __process_prompt_list(self, prompt: list) -> list:
+        # Download every image of the conversation at once (or hit the cache)
+        await aprefetch_images(get_image_urls(prompt))
+
+        # Remove type if exists
+        for message in prompt:
+            for i, content in enumerate(message.get("content", [])):
+                if content:
+                    if content.get("type"):
+                        # Replace the part: parts are shared with the Task prompt
+                        message["content"][i] = {
+                            k: v for k, v in content.items() if k != "type"
+                        }
+                    if image_url := content.get("image_url"):
+                        message["content"][i] = {
+                            "image": {
+                                "format": self.__get_media_type(image_url),
+                                "source": {
+                                    "bytes": await self.__process_content_image(
+                                        image_url
+                                    ),
+                                },
+                            }
+                        }
+
+        if self.model not in VISION_MODELS:
+            for message in prompt:
+                if "image" in message.get("content", [{"": ""}])[0]:
+                    prompt.remove(message)
+
+        # Merge consecutive user messages
+        i = 0
+        while i < len(prompt) - 1:
+            if prompt[i]["role"] == "user" and prompt[i + 1]["role"] == "user":
+                if isinstance(prompt[i]["content"], list):
+                    prompt[i]["content"].extend(prompt[i + 1]["content"])
+                else:
+                    prompt[i]["content"] = [prompt[i]["content"]] + (
+                        prompt[i + 1]["content"]
+                        if isinstance(prompt[i + 1]["content"], list)
+                        else [prompt[i + 1]["content"]]
+                    )
+                prompt.pop(i + 1)
+            else:
+                i += 1
+
+        return prompt
+
+    async def _stream_api_call(self, stream: Any) -> Any:
+        # boto3 has no async client, so each event is read in a worker thread
+        iterator = iter(stream)
+        sentinel = object()
+
+        while True:
+            chunk = await asyncio.to_thread(next, iterator, sentinel)
+
+            if chunk is sentinel:
+                break
+
+            yield chunk
+
+    async def call_api(self, prompt: list | str) -> None:
+
+        inference_config = {
+            "temperature": self.temperature,
+            "maxTokens": self.max_tokens,
+        }
+
+        json_data = {
+            "modelId": f"us.{self.model}",
+            "inferenceConfig": inference_config,
+        }
+
+        if isinstance(prompt, list):
+            json_data["messages"] = await self.__process_prompt_list(prompt)
+        else:
+            json_data["messages"] = [{"role": "user", "content": [{"text": prompt}]}]
+
+        try:
+            if self.stream:
+                self.response = await self.retry_policy.acall(
+                    asyncio.to_thread, self.client.converse_stream, **json_data
+                )
+                return self._stream_api_call(self.response["stream"])
+
+            self.response = await self.retry_policy.acall(
+                asyncio.to_thread, self.client.converse, **json_data
+            )
+            self.tokens = self.get_tokens()
+
+            return self.get_output()
+
+        except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
+            logger(f"Erro na chamada da API - modelo {json_data['modelId']}: {e}")
+
+    def get_response(self) -> Any:
+        return self.response
+
+    def get_output(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response["output"]["message"]["content"][0]["text"]
+        else:
+            return None
+
+    def get_tokens(self) -> Union[None, str]:
+        if self.response is not None:
+
+            input_tokens = self.response["usage"]["inputTokens"]
+            output_tokens = self.response["usage"]["outputTokens"]
+
+            return {
+                "completion_tokens": output_tokens,
+                "prompt_tokens": input_tokens,
+                "total_tokens": output_tokens + input_tokens,
+            }
+        else:
+            return None
+
+    def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
+        if "contentBlockDelta" in chunk:
+
+            text = chunk["contentBlockDelta"]["delta"]["text"]
+
+            if text:
+                return text
+
+        if "metadata" in chunk:
+
+            input_tokens = chunk["metadata"]["usage"]["inputTokens"]
+            output_tokens = chunk["metadata"]["usage"]["outputTokens"]
+
+            self.tokens = {
+                "completion_tokens": output_tokens,
+                "prompt_tokens": input_tokens,
+                "total_tokens": output_tokens + input_tokens,
+            }
+
+
 class ChatAPI:
     def __init__(
         self,
@@ -34,25 +216,31 @@ class ChatAPI:
         self.response = None
         self.tokens = None
 
-        self.client = boto3.client("bedrock-runtime", region_name="us-east-1")
+        self.client = get_boto3_client(
+            "bedrock-runtime",
+            region="us-east-1",
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __process_content_image(self, image_url: dict) -> dict:
-        url = image_url.get("url")
-        image_content = httpx.get(url).content
-
-        return image_content
+        return fetch_image(image_url.get("url"))
 
     def __get_media_type(self, image_url: dict) -> str:
         return "png" if "png" in image_url.get("url") else "jpeg"
 
     def __process_prompt_list(self, prompt: list) -> list:
+        prefetch_images(get_image_urls(prompt))
 
         # Remove type if exists
         for message in prompt:
             for i, content in enumerate(message.get("content", [])):
                 if content:
                     if content.get("type"):
-                        del message["content"][i]["type"]
+                        # Replace the part: parts are shared with the Task prompt
+                        message["content"][i] = {
+                            k: v for k, v in content.items() if k != "type"
+                        }
                     if image_url := content.get("image_url"):
                         message["content"][i] = {
                             "image": {
@@ -105,15 +293,20 @@ class ChatAPI:
 
         try:
             if self.stream:
-                self.response = self.client.converse_stream(**json_data)
+                self.response = self.retry_policy.call(
+                    self.client.converse_stream, **json_data
+                )
                 return self.response["stream"]
 
-            self.response = self.client.converse(**json_data)
+            self.response = self.retry_policy.call(self.client.converse, **json_data)
             self.tokens = self.get_tokens()
 
             return self.get_output()
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['modelId']}: {e}")
 
     def get_response(self) -> Any:
@@ -167,8 +360,14 @@ class VisionAPI:
         temperature: float = 0.0,
         max_tokens: int = 3500,
         stream: bool = False,
+        **kwargs,
     ):
-        self.client = boto3.client("bedrock-runtime", region_name="us-east-1")
+        self.client = get_boto3_client(
+            "bedrock-runtime",
+            region="us-east-1",
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
         _ = api_key
 
@@ -180,20 +379,27 @@ class VisionAPI:
         self.response = None
         self.tokens = None
 
-    def _process_image(self, image: Any, format: str = "PNG") -> bytearray:
+    def _process_image(self, image: Any, format: str | None = None) -> tuple:
         if isinstance(image, str):
-            return base64.b64decode(image)
+            return base64.b64decode(image), "png"
         elif isinstance(image, Image.Image):
-            img_byte_arr = io.BytesIO()
-
-            image.save(img_byte_arr, format=format)
-
-            img_byte_arr = img_byte_arr.getvalue()
-
-            return img_byte_arr
+            prepared = prepare_image(image, "aws", format=format, as_base64=False)
+            return prepared["bytes"], prepared["format"].lower()
         else:
             raise Exception("Incorrect image type! Accepted: img_string or Image")
 
+    def __create_content_image(self, image: str | Image.Image) -> dict:
+        img, format = self._process_image(image)
+
+        return {
+            "image": {
+                "format": format,
+                "source": {
+                    "bytes": img,
+                },
+            }
+        }
+
     def __process_prompt_content(self, prompt: str | list) -> bytearray:
         if isinstance(prompt, str):
             content = [{"text": prompt}]
@@ -206,34 +412,12 @@ class VisionAPI:
         self, content: list, image: str | Image.Image | list
     ) -> bytearray:
         if isinstance(image, str) or isinstance(image, Image.Image):
-            img = self._process_image(image)
-
-            img_dict = {
-                "image": {
-                    "format": "png",
-                    "source": {
-                        "bytes": img,
-                    },
-                }
-            }
-
-            content.append(img_dict)
+            content.append(self.__create_content_image(image))
 
         elif isinstance(image, list):
 
             for img in image:
-
-                img = self._process_image(img)
-                img_dict = {
-                    "image": {
-                        "format": "png",
-                        "source": {
-                            "bytes": img,
-                        },
-                    }
-                }
-
-                content.append(img_dict)
+                content.append(self.__create_content_image(img))
         else:
             raise Exception(
                 "Incorrect image type! Accepted: img_string or list[img_string]"
@@ -250,7 +434,10 @@ class VisionAPI:
                 for i, content in enumerate(message.get("content", [])):
                     if content:
                         if content.get("type"):
-                            del message["content"][i]["type"]
+                            # Replace the part: parts are shared with the Task prompt
+                            message["content"][i] = {
+                                k: v for k, v in content.items() if k != "type"
+                            }
 
             # Merge consecutive user messages
             i = 0
@@ -293,15 +480,20 @@ class VisionAPI:
 
         try:
             if self.stream:
-                self.response = self.client.converse_stream(**json_data)
+                self.response = self.retry_policy.call(
+                    self.client.converse_stream, **json_data
+                )
                 return self.response["stream"]
 
-            self.response = self.client.converse(**json_data)
+            self.response = self.retry_policy.call(self.client.converse, **json_data)
             self.tokens = self.get_tokens()
 
             return self.get_output()
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['modelId']}: {e}")
 
     def get_response(self) -> Any:
@@ -359,7 +551,12 @@ class ImageAPI:
 
         _ = api_key
 
-        self.client = boto3.client("bedrock-runtime", region_name="us-east-1")
+        self.client = get_boto3_client(
+            "bedrock-runtime",
+            region="us-east-1",
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
         self.cfg_scale = cfg_scale
 
@@ -406,8 +603,8 @@ class ImageAPI:
             },
         }
 
-        model_response = self.client.invoke_model(
-            modelId=f"{self.model}", body=json.dumps(payload)
+        model_response = self.retry_policy.call(
+            self.client.invoke_model, modelId=f"{self.model}", body=json.dumps(payload)
         )
 
         self.response = json.loads(model_response["body"].read())
@@ -1,14 +1,222 @@
-import json
 import inspect
 
+from functools import partial
+
 from typing import Any, List, Union, Callable
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from pydantic import BaseModel
 
+from repenseai.genai.clients import get_client
+from repenseai.genai.prompt_cache import normalize_usage
+from repenseai.genai.retry import NO_RETRY
+from repenseai.utils.agent import acall_tool, arun_tools, call_tool, run_tools
 from repenseai.utils.logs import logger
 
 
+class AsyncChatAPI:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "deepseek-chat",
+        temperature: float = 0.0,
+        max_tokens: int = 3500,
+        stream: bool = False,
+        json_mode: bool = False,
+        json_schema: BaseModel = None,
+        tools: List[Callable] = None,
+        **kwargs,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.stream = stream
+        self.max_tokens = max_tokens
+
+        self.response = None
+        self.tokens = None
+
+        self.json_mode = json_mode
+        self.json_schema = json_schema
+
+        self.tools = None
+        self.json_tools = None
+
+        self.tool_flag = False
+
+        if tools:
+            self.tools = {tool.__name__: tool for tool in tools}
+            self.json_tools = [self.__function_to_json(tool) for tool in tools]
+
+        self.client = get_client(
+            "deepseek",
+            AsyncOpenAI,
+            api_key=self.api_key,
+            base_url="https://api.deepseek.com",
+            asynchronous=True,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
+
+    def __function_to_json(self, func: callable) -> dict:
+
+        type_map = {
+            str: "string",
+            int: "integer",
+            float: "number",
+            bool: "boolean",
+            list: "array",
+            dict: "object",
+            type(None): "null",
+        }
+
+        try:
+            signature = inspect.signature(func)
+        except ValueError as e:
+            raise ValueError(
+                f"Failed to get signature for function {func.__name__}: {str(e)}"
+            )
+
+        parameters = {}
+        for param in signature.parameters.values():
+            try:
+                param_type = type_map.get(param.annotation, "string")
+            except KeyError as e:
+                raise KeyError(
+                    f"Unknown type annotation {param.annotation} for parameter {param.name}: {str(e)}"
+                )
+            parameters[param.name] = {"type": param_type}
+
+        required = [
+            param.name
+            for param in signature.parameters.values()
+            if param.default == inspect._empty
+        ]
+
+        return {
+            "type": "function",
+            "function": {
+                "name": func.__name__,
+                "description": func.__doc__ or "",
+                "parameters": {
+                    "type": "object",
+                    "properties": parameters,
+                    "required": required,
+                },
+            },
+        }
+
+    def __process_prompt_list(self, prompt: list) -> list:
+        for message in prompt:
+            if isinstance(message.get("content"), list):
+                message["content"] = message.get("content")[0].get("text", "")
+
+        return prompt
+
+    async def call_api(self, prompt: list | str) -> Any:
+        json_data = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.tokens,
+            "stream": self.stream,
+            "tools": self.json_tools,
+        }
+
+        if isinstance(prompt, list):
+            json_data["messages"] = self.__process_prompt_list(prompt)
+        else:
+            json_data["messages"] = [{"role": "user", "content": prompt}]
+
+        try:
+            if self.stream and not self.json_mode:
+                json_data["stream_options"] = {"include_usage": True}
+
+            if self.tool_flag:
+                json_data.pop("max_tokens")
+
+            if self.json_mode:
+                json_data["response_format"] = {
+                    "type": "json_object",
+                    "schema": self.json_schema.model_json_schema(),
+                }
+
+                json_data.pop("stream")
+                json_data.pop("tools")
+
+            self.response = await self.retry_policy.acall(
+                self.client.chat.completions.create, **json_data
+            )
+
+            if not self.stream:
+                self.tokens = self.get_tokens()
+                return self.get_output()
+
+            return self.response
+
+        except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
+            logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
+
+    def get_response(self) -> Any:
+        return self.response
+
+    def get_output(self) -> Union[None, str]:
+        if self.response is not None:
+            dump = self.response.model_dump()
+
+            if dump["choices"][0]["finish_reason"] == "tool_calls":
+                self.tool_flag = True
+                return dump["choices"][0]["message"]
+
+            self.tool_flag = False
+            return dump["choices"][0]["message"].get("content")
+        else:
+            return None
+
+    def get_tokens(self) -> Union[None, str]:
+        if self.response is not None:
+            return normalize_usage(self.response.model_dump()["usage"])
+        else:
+            return None
+
+    def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
+        if chunk.choices:
+            content = chunk.choices[0].delta.content
+            if content:
+                return content
+            else:
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
+        else:
+            if chunk.model_dump()["usage"]:
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
+
+    async def process_tool_calls(self, message: dict) -> list:
+        tools = message.get("tool_calls")
+        calls = []
+
+        # Arguments are parsed by each call: malformed ones only fail that call
+        for tool in tools:
+            calls.append(partial(acall_tool, self.tools, tool.get("function")))
+
+        # Independent tool calls of the same turn run concurrently
+        outputs = await arun_tools(calls)
+        tool_messages = []
+
+        for tool, output in zip(tools, outputs):
+            if isinstance(output, Exception):
+                tool_name = tool.get("function").get("name")
+                logger(f"Error calling tool {tool_name}: {str(output)}")
+                output = f"Error: Tool '{tool_name}' failed to execute: {output}"
+
+            tool_messages.append(
+                {"role": "tool", "tool_call_id": tool.get("id"), "content": str(output)}
+            )
+
+        return tool_messages
+
+
 class ChatAPI:
     def __init__(
         self,
@@ -43,10 +251,14 @@ class ChatAPI:
             self.tools = {tool.__name__: tool for tool in tools}
             self.json_tools = [self.__function_to_json(tool) for tool in tools]
 
-        self.client = OpenAI(
+        self.client = get_client(
+            "deepseek",
+            OpenAI,
             api_key=self.api_key,
             base_url="https://api.deepseek.com",
+            retry_policy=kwargs.get("retry_policy"),
         )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __function_to_json(self, func: callable) -> dict:
 
@@ -133,7 +345,9 @@ class ChatAPI:
                 json_data.pop("stream")
                 json_data.pop("tools")
 
-            self.response = self.client.chat.completions.create(**json_data)
+            self.response = self.retry_policy.call(
+                self.client.chat.completions.create, **json_data
+            )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -142,6 +356,9 @@ class ChatAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_response(self) -> Any:
@@ -162,7 +379,7 @@ class ChatAPI:
 
     def get_tokens(self) -> Union[None, str]:
         if self.response is not None:
-            return self.response.model_dump()["usage"]
+            return normalize_usage(self.response.model_dump()["usage"])
         else:
             return None
 
@@ -172,21 +389,28 @@ class ChatAPI:
             if content:
                 return content
             else:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
         else:
             if chunk.model_dump()["usage"]:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
 
     def process_tool_calls(self, message: dict) -> list:
         tools = message.get("tool_calls")
-        tool_messages = []
+        calls = []
 
+        # Arguments are parsed by each call: malformed ones only fail that call
         for tool in tools:
+            calls.append(partial(call_tool, self.tools, tool.get("function")))
 
-            config = tool.get("function")
-            args = json.loads(config.get("arguments"))
+        # Independent tool calls of the same turn run concurrently
+        outputs = run_tools(calls)
+        tool_messages = []
 
-            output = self.tools[config.get("name")](**args)
+        for tool, output in zip(tools, outputs):
+            if isinstance(output, Exception):
+                tool_name = tool.get("function").get("name")
+                logger(f"Error calling tool {tool_name}: {str(output)}")
+                output = f"Error: Tool '{tool_name}' failed to execute: {output}"
 
             tool_messages.append(
                 {"role": "tool", "tool_call_id": tool.get("id"), "content": str(output)}
@@ -203,8 +427,9 @@ class VisionAPI:
         temperature: float = 0.0,
         max_tokens: int = 3500,
         stream: bool = False,
+        **kwargs,
     ):
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client("deepseek", OpenAI, api_key=api_key)
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
@@ -230,7 +455,7 @@ class VisionAPI:
 
     def get_tokens(self) -> Union[None, str]:
         if self.response is not None:
-            return self.response.model_dump()["usage"]
+            return normalize_usage(self.response.model_dump()["usage"])
         else:
             return None
 
@@ -240,10 +465,10 @@ class VisionAPI:
             if content:
                 return content
             else:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
         else:
             if chunk.model_dump()["usage"]:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
 
 
 class ImageAPI:
@@ -8,9 +8,210 @@ from pydantic import BaseModel
 
 from typing import Any, List, Union, Callable
 
+from repenseai.genai.clients import get_client
+from repenseai.genai.prompt_cache import normalize_usage
+from repenseai.genai.retry import NO_RETRY
 from repenseai.utils.text import extract_json_text
 
 
+def get_usage_tokens(usage: Any) -> dict:
+    """
+    Token usage of a response, from its `usage_metadata`. `cached_tokens`
+    were read from the context cache (implicit or explicit).
+    """
+    prompt_tokens = (usage.prompt_token_count or 0) if usage else 0
+    output_tokens = (usage.candidates_token_count or 0) if usage else 0
+    cached_tokens = (usage.cached_content_token_count or 0) if usage else 0
+
+    return normalize_usage(
+        {
+            "completion_tokens": output_tokens,
+            "prompt_tokens": prompt_tokens,
+            "total_tokens": output_tokens + prompt_tokens,
+            "cached_tokens": cached_tokens,
+        }
+    )
+
+
+class AsyncChatAPI:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.0-flash",
+        temperature: float = 0.0,
+        max_tokens: int = 3500,
+        stream: bool = False,
+        tools: List[Callable] = None,
+        json_schema: BaseModel = None,
+        **kwargs,
+    ):
+        self.api_key = api_key
+        self.stream = stream
+        self.json_schema = json_schema
+
+        self.response = None
+        self.tokens = None
+
+        self.tool_flag = False
+        self.tools = tools
+
+        self.client = get_client(
+            "google", genai.Client, api_key=self.api_key, http_client_arg=None
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
+        self.model = model
+
+        self.config = types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            tools=self.tools,
+            response_mime_type="application/json" if self.json_schema else None,
+            response_schema=self.json_schema,
+        )
+
+    def __convert_image_to_bytes(self, img):
+        if hasattr(img, "convert"):  # Check if it's a PIL Image
+            img_byte_arr = io.BytesIO()
+            img.convert("RGB").save(img_byte_arr, format="JPEG")
+            return img_byte_arr.getvalue()
+        return img  # Return as-is if already bytes
+
+    async def __process_str_prompt(
+        self, prompt: str, image: Union[Any, List[Any]] = None
+    ) -> str:
+        self.prompt = prompt
+        content = [{"role": "user", "parts": [{"text": prompt}]}]
+
+        # Add images if provided
+        if image is not None:
+            if isinstance(image, list):
+                for img in image:
+                    img_bytes = self.__convert_image_to_bytes(img)
+                    content[0]["parts"].append(
+                        {"inline_data": {"mime_type": "image/jpeg", "data": img_bytes}}
+                    )
+            else:
+                img_bytes = self.__convert_image_to_bytes(image)
+                content[0]["parts"].append(
+                    {"inline_data": {"mime_type": "image/jpeg", "data": img_bytes}}
+                )
+
+        if self.stream:
+            self.response = await self.retry_policy.acall(
+                self.client.aio.models.generate_content_stream,
+                model=self.model,
+                contents=content,
+                config=self.config,
+            )
+        else:
+            self.response = await self.retry_policy.acall(
+                self.client.aio.models.generate_content,
+                model=self.model,
+                contents=content,
+                config=self.config,
+            )
+            self.tokens = self.get_tokens()
+            return self.get_output()
+
+        return self.response
+
+    async def __process_list_prompt(self, prompt: list) -> str:
+        # Convert the prompt list to the format expected by Gemini
+        contents = []
+        for message in prompt:
+            role = "user" if message.get("role") == "user" else "model"
+            parts = []
+
+            # Handle text content
+            if isinstance(message.get("content"), str):
+                text = message.get("content")
+                parts.append({"text": text})
+            else:
+                for content_item in message.get("content", []):
+                    if content_item.get("type") == "text":
+                        parts.append({"text": content_item.get("text", "")})
+                    elif content_item.get("type") == "image":
+                        img_bytes = self.__convert_image_to_bytes(
+                            content_item.get("image")
+                        )
+                        parts.append(
+                            {
+                                "inline_data": {
+                                    "mime_type": "image/jpeg",
+                                    "data": img_bytes,
+                                }
+                            }
+                        )
+
+            if parts:  # Only add message if it has parts
+                contents.append({"role": role, "parts": parts})
+
+        if not contents:
+            raise ValueError("No valid content found in prompt messages")
+
+        # Get the last text part for token counting
+        self.prompt = next(
+            (
+                part["text"]
+                for msg in reversed(contents)
+                for part in msg["parts"]
+                if "text" in part
+            ),
+            "",
+        )
+
+        if self.stream:
+            self.response = await self.retry_policy.acall(
+                self.client.aio.models.generate_content_stream,
+                model=self.model,
+                contents=contents,
+                config=self.config,
+            )
+        else:
+            self.response = await self.retry_policy.acall(
+                self.client.aio.models.generate_content,
+                model=self.model,
+                contents=contents,
+                config=self.config,
+            )
+            self.tokens = self.get_tokens()
+            return self.get_output()
+
+        return self.response
+
+    async def call_api(
+        self, prompt: Union[str, list], image: Union[Any, List[Any]] = None
+    ):
+        if isinstance(prompt, str):
+            return await self.__process_str_prompt(prompt, image)
+        else:
+            return await self.__process_list_prompt(prompt)
+
+    def get_response(self) -> Any:
+        return self.response
+
+    def get_output(self) -> Union[None, str]:
+        if self.response is not None:
+            if self.json_schema:
+                return json.loads(extract_json_text(self.response.text))
+            return self.response.text
+        else:
+            return None
+
+    def get_tokens(self) -> Union[None, dict]:
+        if self.response is not None:
+            return get_usage_tokens(self.response.usage_metadata)
+        else:
+            return None
+
+    def process_stream_chunk(self, chunk: Any) -> str:
+        if chunk.usage_metadata.candidates_token_count:
+            self.tokens = get_usage_tokens(chunk.usage_metadata)
+            return chunk.text
+        else:
+            return chunk.text
+
+
 class ChatAPI:
     def __init__(
         self,
@@ -33,7 +234,10 @@ class ChatAPI:
         self.tool_flag = False
         self.tools = tools
 
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_client(
+            "google", genai.Client, api_key=self.api_key, http_client_arg=None
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
         self.model = model
 
         self.config = types.GenerateContentConfig(
@@ -72,13 +276,15 @@ class ChatAPI:
                 )
 
         if self.stream:
-            self.response = self.client.models.generate_content_stream(
+            self.response = self.retry_policy.call(
+                self.client.models.generate_content_stream,
                 model=self.model,
                 contents=content,
                 config=self.config,
             )
         else:
-            self.response = self.client.models.generate_content(
+            self.response = self.retry_policy.call(
+                self.client.models.generate_content,
                 model=self.model,
                 contents=content,
                 config=self.config,
@@ -134,13 +340,15 @@ class ChatAPI:
         )
 
         if self.stream:
-            self.response = self.client.models.generate_content_stream(
+            self.response = self.retry_policy.call(
+                self.client.models.generate_content_stream,
                 model=self.model,
                 contents=contents,
                 config=self.config,
             )
         else:
-            self.response = self.client.models.generate_content(
+            self.response = self.retry_policy.call(
+                self.client.models.generate_content,
                 model=self.model,
                 contents=contents,
                 config=self.config,
@@ -169,39 +377,13 @@ class ChatAPI:
 
     def get_tokens(self) -> Union[None, dict]:
         if self.response is not None:
-            try:
-                prompt_tokens = self.client.models.count_tokens(
-                    model=self.model, contents=self.prompt
-                ).total_tokens
-
-                output_tokens = self.client.models.count_tokens(
-                    model=self.model, contents=self.response.text
-                ).total_tokens
-
-                return {
-                    "completion_tokens": output_tokens,
-                    "prompt_tokens": prompt_tokens,
-                    "total_tokens": output_tokens + prompt_tokens,
-                }
-            except Exception as e:
-                return {
-                    "completion_tokens": 0,
-                    "prompt_tokens": 0,
-                    "total_tokens": 0,
-                }
+            return get_usage_tokens(self.response.usage_metadata)
         else:
             return None
 
     def process_stream_chunk(self, chunk: Any) -> str:
         if chunk.usage_metadata.candidates_token_count:
-            self.tokens = {
-                "completion_tokens": chunk.usage_metadata.candidates_token_count,
-                "prompt_tokens": chunk.usage_metadata.prompt_token_count,
-                "total_tokens": (
-                    chunk.usage_metadata.candidates_token_count
-                    + chunk.usage_metadata.prompt_token_count
-                ),
-            }
+            self.tokens = get_usage_tokens(chunk.usage_metadata)
             return chunk.text
         else:
             return chunk.text
@@ -215,11 +397,15 @@ class VisionAPI:
         temperature: float = 0.0,
         max_tokens: int = 3500,
         stream: bool = False,
+        **kwargs,
     ):
         self.api_key = api_key
         self.stream = stream
 
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_client(
+            "google", genai.Client, api_key=self.api_key, http_client_arg=None
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
         self.model = model
 
         self.config = types.GenerateContentConfig(
@@ -274,13 +460,15 @@ class VisionAPI:
             )
 
         if self.stream:
-            self.response = self.client.models.generate_content_stream(
+            self.response = self.retry_policy.call(
+                self.client.models.generate_content_stream,
                 model=self.model,
                 contents=contents,
                 config=self.config,
             )
         else:
-            self.response = self.client.models.generate_content(
+            self.response = self.retry_policy.call(
+                self.client.models.generate_content,
                 model=self.model,
                 contents=contents,
                 config=self.config,
@@ -298,34 +486,13 @@ class VisionAPI:
 
     def get_tokens(self) -> Union[None, dict]:
         if self.response is not None:
-            prompt_tokens = self.client.models.count_tokens(
-                model=self.model, contents=self.prompt
-            ).total_tokens
-            img_tokens = self.client.models.count_tokens(
-                model=self.model, contents=self.image
-            ).total_tokens
-            output_tokens = self.client.models.count_tokens(
-                model=self.model, contents=self.response.text
-            ).total_tokens
-
-            return {
-                "completion_tokens": output_tokens,
-                "prompt_tokens": prompt_tokens + img_tokens,
-                "total_tokens": output_tokens + prompt_tokens + img_tokens,
-            }
+            return get_usage_tokens(self.response.usage_metadata)
         else:
             return None
 
     def process_stream_chunk(self, chunk: Any) -> str:
         if chunk.usage_metadata.candidates_token_count:
-            self.tokens = {
-                "completion_tokens": chunk.usage_metadata.candidates_token_count,
-                "prompt_tokens": chunk.usage_metadata.prompt_token_count,
-                "total_tokens": (
-                    chunk.usage_metadata.candidates_token_count
-                    + chunk.usage_metadata.prompt_token_count
-                ),
-            }
+            self.tokens = get_usage_tokens(chunk.usage_metadata)
             return chunk.text
         else:
             return chunk.text
@@ -340,7 +507,10 @@ class ImageAPI:
         **kwargs,
     ):
         self.api_key = api_key
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_client(
+            "google", genai.Client, api_key=self.api_key, http_client_arg=None
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
         self.model = model
 
         self.aspect_ratio = aspect_ratio
@@ -357,7 +527,8 @@ class ImageAPI:
     def call_api(self, prompt: Any, image: Any):
         _ = image  # Unused parameter
 
-        self.response = self.client.models.generate_images(
+        self.response = self.retry_policy.call(
+            self.client.models.generate_images,
             model=self.model,
             prompt=prompt,
             config=types.GenerateImagesConfig(
@@ -391,7 +562,9 @@ class AudioAPI:
     def __init__(self, api_key: str, model: str, **kwargs):
         self.api_key = api_key
         self.model = model
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_client(
+            "google", genai.Client, api_key=self.api_key, http_client_arg=None
+        )
 
     def call_api(self, audio: Any):
         _ = audio  # Unused parameter
@@ -408,7 +581,9 @@ class SpeechAPI:
     def __init__(self, api_key: str, model: str, **kwargs):
         self.api_key = api_key
         self.model = model
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_client(
+            "google", genai.Client, api_key=self.api_key, http_client_arg=None
+        )
 
     def call_api(self, text: str) -> bytes:
         _ = text  # Unused parameter
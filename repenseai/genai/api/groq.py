@@ -1,12 +1,112 @@
 from typing import Any, Dict, List, Union
 
-from groq import Groq
+from groq import AsyncGroq, Groq
 
+from repenseai.genai.clients import get_client
+from repenseai.genai.retry import NO_RETRY
 from repenseai.utils.logs import logger
 
 from repenseai.genai.providers import VISION_MODELS
 
 
+class AsyncChatAPI:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "llama-3.1-8b-instant",
+        temperature: float = 0.0,
+        max_tokens: int = 3500,
+        stream: bool = False,
+        **kwargs,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.stream = stream
+        self.max_tokens = max_tokens
+
+        self.response = None
+        self.tokens = None
+
+        self.tool_flag = False
+
+        self.client = get_client(
+            "groq",
+            AsyncGroq,
+            api_key=self.api_key,
+            asynchronous=True,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
+
+    def __process_prompt_list(self, prompt: List[Dict[str, str]]) -> list:
+        if self.model not in VISION_MODELS:
+            for message in prompt:
+                message["content"] = message.get("content", [{}])[0].get("text", "")
+
+            return prompt
+        else:
+            for message in prompt:
+                if message.get("role") == "assistant":
+                    message["content"] = message.get("content", [{}])[0].get("text", "")
+
+            return prompt
+
+    async def call_api(self, prompt: Union[List[Dict[str, str]], str]) -> None:
+        json_data = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": self.stream,
+        }
+
+        if isinstance(prompt, list):
+            json_data["messages"] = self.__process_prompt_list(prompt)
+        else:
+            json_data["messages"] = [{"role": "user", "content": prompt}]
+
+        try:
+            self.response = await self.retry_policy.acall(
+                self.client.chat.completions.create, **json_data
+            )
+
+            if not self.stream:
+                self.tokens = self.get_tokens()
+                return self.get_output()
+
+            return self.response
+
+        except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
+            logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
+
+    def get_response(self) -> Any:
+        return self.response
+
+    def get_output(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.model_dump()["choices"][0]["message"]["content"]
+        else:
+            return None
+
+    def get_tokens(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.model_dump()["usage"]
+        else:
+            return None
+
+    def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
+        if chunk.choices:
+            content = chunk.choices[0].delta.content
+            if content:
+                return content
+            else:
+                if chunk.model_dump().get("x_groq", {}).get("usage"):
+                    self.tokens = chunk.model_dump()["x_groq"]["usage"]
+
+
 class ChatAPI:
     def __init__(
         self,
@@ -28,7 +128,10 @@ class ChatAPI:
 
         self.tool_flag = False
 
-        self.client = Groq(api_key=self.api_key)
+        self.client = get_client(
+            "groq", Groq, api_key=self.api_key, retry_policy=kwargs.get("retry_policy")
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __process_prompt_list(self, prompt: List[Dict[str, str]]) -> list:
         if self.model not in VISION_MODELS:
@@ -57,7 +160,9 @@ class ChatAPI:
             json_data["messages"] = [{"role": "user", "content": prompt}]
 
         try:
-            self.response = self.client.chat.completions.create(**json_data)
+            self.response = self.retry_policy.call(
+                self.client.chat.completions.create, **json_data
+            )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -66,6 +171,9 @@ class ChatAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_response(self) -> Any:
@@ -101,8 +209,9 @@ class VisionAPI:
         temperature: float = 0.0,
         max_tokens: int = 3500,
         stream: bool = False,
+        **kwargs,
     ):
-        self.client = Groq(api_key=api_key)
+        self.client = get_client("groq", Groq, api_key=api_key)
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
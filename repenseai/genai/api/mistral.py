@@ -1,15 +1,107 @@
-import io
-import base64
-
 from typing import Any, Dict, List, Union
+from repenseai.genai.clients import get_client
+from repenseai.genai.retry import NO_RETRY
 from repenseai.genai.providers import VISION_MODELS
 
 from mistralai import Mistral
+from repenseai.utils.image import image_to_data_url
 from repenseai.utils.logs import logger
 
 from PIL import Image
 
 
+class AsyncChatAPI:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "mistral-large-latest",
+        temperature: float = 0.0,
+        max_tokens: int = 3500,
+        stream: bool = False,
+        **kwargs,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.stream = stream
+        self.max_tokens = max_tokens
+
+        self.tool_flag = False
+
+        self.response = None
+        self.tokens = None
+
+        self.client = get_client(
+            "mistral",
+            Mistral,
+            api_key=self.api_key,
+            http_client_arg="async_client",
+            asynchronous=True,
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
+
+    def __process_prompt_list(self, prompt: list) -> list:
+
+        if self.model not in VISION_MODELS:
+            for history in prompt:
+                content = history.get("content", [])
+
+                if content[0].get("type") == "image_url":
+                    prompt.remove(history)
+
+        return prompt
+
+    async def call_api(self, prompt: Union[List[Dict[str, str]], str]) -> None:
+        json_data = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+
+        if isinstance(prompt, list):
+            json_data["messages"] = self.__process_prompt_list(prompt)
+        else:
+            json_data["messages"] = [{"role": "system", "content": prompt}]
+
+        try:
+
+            if self.stream:
+                return await self.retry_policy.acall(
+                    self.client.chat.stream_async, **json_data
+                )
+
+            self.response = await self.retry_policy.acall(
+                self.client.chat.complete_async, **json_data
+            )
+            self.tokens = self.get_tokens()
+
+            return self.get_output()
+
+        except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
+            logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
+
+    def get_output(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.model_dump()["choices"][0]["message"]["content"]
+        else:
+            return None
+
+    def get_tokens(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.model_dump()["usage"]
+        else:
+            return None
+
+    def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
+        if chunk.data.usage:
+            self.tokens = chunk.data.model_dump()["usage"]
+        else:
+            return chunk.data.choices[0].delta.content
+
+
 class ChatAPI:
     def __init__(
         self,
@@ -31,7 +123,10 @@ class ChatAPI:
         self.response = None
         self.tokens = None
 
-        self.client = Mistral(api_key=self.api_key)
+        self.client = get_client(
+            "mistral", Mistral, api_key=self.api_key, http_client_arg="client"
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __process_prompt_list(self, prompt: list) -> list:
 
@@ -59,14 +154,19 @@ class ChatAPI:
         try:
 
             if self.stream:
-                return self.client.chat.stream(**json_data)
+                return self.retry_policy.call(self.client.chat.stream, **json_data)
 
-            self.response = self.client.chat.complete(**json_data)
+            self.response = self.retry_policy.call(
+                self.client.chat.complete, **json_data
+            )
             self.tokens = self.get_tokens()
 
             return self.get_output()
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_output(self) -> Union[None, str]:
@@ -96,8 +196,12 @@ class VisionAPI:
         temperature: float = 0.0,
         max_tokens: int = 3500,
         stream: bool = False,
+        **kwargs,
     ):
-        self.client = Mistral(api_key=api_key)
+        self.client = get_client(
+            "mistral", Mistral, api_key=api_key, http_client_arg="client"
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
@@ -106,46 +210,11 @@ class VisionAPI:
         self.response = None
         self.tokens = None
 
-    def __resize_image(self, image: Image.Image) -> Image.Image:
-        max_size = 1568
-        min_size = 200
-        width, height = image.size
-
-        if max(width, height) > max_size:
-            aspect_ratio = width / height
-            if width > height:
-                new_width = max_size
-                new_height = int(new_width / aspect_ratio)
-            else:
-                new_height = max_size
-                new_width = int(new_height * aspect_ratio)
-            image = image.resize((new_width, new_height))
-        elif min(width, height) < min_size:
-            aspect_ratio = width / height
-            if width < height:
-                new_width = min_size
-                new_height = int(new_width / aspect_ratio)
-            else:
-                new_height = min_size
-                new_width = int(new_height * aspect_ratio)
-            image = image.resize((new_width, new_height))
-
-        return image
-
-    def __process_image(self, image: Any) -> bytearray:
+    def __process_image(self, image: Any) -> str:
         if isinstance(image, str):
-            return image
+            return f"data:image/png;base64,{image}"
         elif isinstance(image, Image.Image):
-            img_byte_arr = io.BytesIO()
-
-            image = self.__resize_image(image)
-            image.save(img_byte_arr, format="PNG")
-
-            img_byte_arr = img_byte_arr.getvalue()
-
-            image_string = base64.b64encode(img_byte_arr).decode("utf-8")
-
-            return image_string
+            return image_to_data_url(image, "mistral")
         else:
             raise Exception("Incorrect image type! Accepted: img_string or Image")
 
@@ -154,7 +223,7 @@ class VisionAPI:
 
         img_dict = {
             "type": "image_url",
-            "image_url": f"data:image/png;base64,{img}",
+            "image_url": img,
         }
 
         return img_dict
@@ -207,9 +276,9 @@ class VisionAPI:
         }
 
         if self.stream:
-            return self.client.chat.stream(**json_data)
+            return self.retry_policy.call(self.client.chat.stream, **json_data)
 
-        self.response = self.client.chat.complete(**json_data)
+        self.response = self.retry_policy.call(self.client.chat.complete, **json_data)
         self.tokens = self.get_tokens()
 
         return self.get_output()
@@ -1,16 +1,114 @@
-import base64
-import io
-
 from typing import Any, Dict, List, Union
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from PIL import Image
 
+from repenseai.genai.clients import get_client
+from repenseai.genai.retry import NO_RETRY
+from repenseai.utils.image import image_to_data_url
 from repenseai.utils.logs import logger
 
 from repenseai.genai.providers import VISION_MODELS
 
 
+class AsyncChatAPI:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "",
+        temperature: float = 0.0,
+        max_tokens: int = 3500,
+        stream: bool = False,
+        **kwargs,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.stream = stream
+        self.max_tokens = max_tokens
+
+        self.tool_flag = False
+
+        self.response = None
+        self.tokens = None
+
+        self.client = get_client(
+            "nvidia",
+            AsyncOpenAI,
+            api_key=api_key,
+            base_url="https://integrate.api.nvidia.com/v1",
+            asynchronous=True,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
+
+    def __process_prompt_list(self, prompt: List[Dict[str, str]]) -> list:
+        if self.model not in VISION_MODELS:
+            for message in prompt:
+                message["content"] = message.get("content", [{}])[0].get("text", "")
+
+            return prompt
+        else:
+            for message in prompt:
+                if message.get("role") == "assistant":
+                    message["content"] = message.get("content", [{}])[0].get("text", "")
+
+            return prompt
+
+    async def call_api(self, prompt: Union[List[Dict[str, str]], str]) -> None:
+        json_data = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": self.stream,
+        }
+
+        if isinstance(prompt, list):
+            json_data["messages"] = self.__process_prompt_list(prompt)
+        else:
+            json_data["messages"] = [{"role": "user", "content": prompt}]
+
+        try:
+            self.response = await self.retry_policy.acall(
+                self.client.chat.completions.create, **json_data
+            )
+
+            if not self.stream:
+                self.tokens = self.get_tokens()
+                return self.get_output()
+
+            return self.response
+
+        except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
+            logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
+
+    def get_output(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.model_dump()["choices"][0]["message"]["content"]
+        else:
+            return None
+
+    def get_tokens(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.model_dump()["usage"]
+        else:
+            return None
+
+    def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
+        if chunk.choices:
+            content = chunk.choices[0].delta.content
+            if content:
+                return content
+            else:
+                self.tokens = chunk.model_dump()["usage"]
+        else:
+            if chunk.model_dump()["usage"]:
+                self.tokens = chunk.model_dump()["usage"]
+
+
 class ChatAPI:
     def __init__(
         self,
@@ -32,10 +130,14 @@ class ChatAPI:
         self.response = None
         self.tokens = None
 
-        self.client = OpenAI(
+        self.client = get_client(
+            "nvidia",
+            OpenAI,
             api_key=api_key,
             base_url="https://integrate.api.nvidia.com/v1",
+            retry_policy=kwargs.get("retry_policy"),
         )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __process_prompt_list(self, prompt: List[Dict[str, str]]) -> list:
         if self.model not in VISION_MODELS:
@@ -64,7 +166,9 @@ class ChatAPI:
             json_data["messages"] = [{"role": "user", "content": prompt}]
 
         try:
-            self.response = self.client.chat.completions.create(**json_data)
+            self.response = self.retry_policy.call(
+                self.client.chat.completions.create, **json_data
+            )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -73,6 +177,9 @@ class ChatAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_output(self) -> Union[None, str]:
@@ -107,12 +214,17 @@ class VisionAPI:
         temperature: float = 0.0,
         max_tokens: int = 3500,
         stream: bool = False,
+        **kwargs,
     ):
 
-        self.client = OpenAI(
+        self.client = get_client(
+            "nvidia",
+            OpenAI,
             api_key=api_key,
             base_url="https://integrate.api.nvidia.com/v1",
+            retry_policy=kwargs.get("retry_policy"),
         )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
         self.model = model
         self.max_tokens = max_tokens
@@ -129,14 +241,7 @@ class VisionAPI:
             else:
                 f"data:image/png;base64,{image}"
         elif isinstance(image, Image.Image):
-            img_byte_arr = io.BytesIO()
-
-            image.save(img_byte_arr, format="PNG")
-            img_byte_arr = img_byte_arr.getvalue()
-
-            image_string = base64.b64encode(img_byte_arr).decode("utf-8")
-
-            return f"data:image/png;base64,{image_string}"
+            return image_to_data_url(image, "nvidia")
         else:
             raise Exception("Incorrect image type! Accepted: img_string or Image")
 
@@ -205,7 +310,9 @@ class VisionAPI:
             if self.stream:
                 json_data["stream_options"] = {"include_usage": True}
 
-            self.response = self.client.chat.completions.create(**json_data)
+            self.response = self.retry_policy.call(
+                self.client.chat.completions.create, **json_data
+            )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -214,6 +321,9 @@ class VisionAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_output(self) -> Union[None, str]:
@@ -1,22 +1,76 @@
-import base64
 import io
 import inspect
 import json
 
+from functools import partial
+
 from pydantic import BaseModel
 
 from typing import Any, Dict, List, Union, Callable
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion
 
 from mcp.types import Tool
+from repenseai.genai.clients import get_client
+from repenseai.genai.prompt_cache import normalize_usage
+from repenseai.genai.retry import NO_RETRY
+from repenseai.genai.tokens import count_text_tokens
 from repenseai.genai.mcp.server import ServerManager
 
 from PIL import Image
 
 from repenseai.utils.audio import get_memory_buffer
+from repenseai.utils.agent import (
+    acall_function,
+    arun_tools,
+    call_function,
+    get_tool_input,
+    run_tools,
+)
+from repenseai.utils.image import image_to_data_url
 from repenseai.utils.logs import logger
 
 
+def get_tool_calls(message: dict) -> list:
+    """
+    Tool calls of an assistant message as {"id", "name", "arguments"}. The
+    arguments are parsed when each call runs, so malformed ones only fail
+    their own call.
+    """
+    calls = []
+
+    for tool in message.get("tool_calls") or []:
+        config = tool.get("function")
+
+        calls.append(
+            {
+                "id": tool.get("id"),
+                "name": config.get("name"),
+                "arguments": config.get("arguments"),
+            }
+        )
+
+    return calls
+
+
+def build_tool_call_message(calls: list, text: str = "") -> dict:
+    return {
+        "role": "assistant",
+        "content": text or None,
+        "tool_calls": [
+            {
+                "id": call.get("id"),
+                "type": "function",
+                "function": {
+                    "name": call.get("name"),
+                    "arguments": call.get("arguments") or "{}",
+                },
+            }
+            for call in calls
+        ],
+    }
+
+
 class AsyncChatAPI:
     def __init__(
         self,
@@ -52,7 +106,14 @@ class AsyncChatAPI:
             self.tools = {tool.__name__: tool for tool in tools}
             self.json_tools = [self.__function_to_json(tool) for tool in tools]
 
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = get_client(
+            "openai",
+            AsyncOpenAI,
+            api_key=self.api_key,
+            asynchronous=True,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __mcp_tool_to_json(self, tool: Tool) -> dict:
 
@@ -136,7 +197,10 @@ class AsyncChatAPI:
         try:
             if self.stream and not self.json_schema:
                 json_data["stream_options"] = {"include_usage": True}
-                json_data.pop("tools")
+
+                # Tool calls are streamed as deltas and assembled by the Task
+                if not json_data["tools"]:
+                    json_data.pop("tools")
 
             if "o1" or "o3" in self.model:
                 json_data.pop("temperature")
@@ -149,9 +213,13 @@ class AsyncChatAPI:
                 json_data.pop("tools")
 
                 self.stream = False
-                self.response = self.client.beta.chat.completions.parse(**json_data)
+                self.response = await self.retry_policy.acall(
+                    self.client.beta.chat.completions.parse, **json_data
+                )
             else:
-                self.response = self.client.chat.completions.create(**json_data)
+                self.response = await self.retry_policy.acall(
+                    self.client.chat.completions.create, **json_data
+                )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -160,6 +228,9 @@ class AsyncChatAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_response(self) -> Any:
@@ -182,7 +253,7 @@ class AsyncChatAPI:
 
     def get_tokens(self) -> Union[None, str]:
         if self.response is not None:
-            return self.response.model_dump()["usage"]
+            return normalize_usage(self.response.model_dump()["usage"])
         else:
             return None
 
@@ -192,45 +263,59 @@ class AsyncChatAPI:
             if content:
                 return content
             else:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
         else:
             if chunk.model_dump()["usage"]:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
 
-    async def process_tool_calls(self, message: dict) -> list:
-        tools = message.get("tool_calls")
-        tool_messages = []
+    def build_tool_call_message(self, calls: list, text: str = "") -> dict:
+        """Assistant message of assembled (streamed) tool calls."""
+        return build_tool_call_message(calls, text)
+
+    def build_tool_results(self, results: list) -> list:
+        return list(results)
+
+    async def run_tool_call(self, call: dict) -> dict:
+        """Run one tool call ({"id", "name", "arguments"}) into a tool message."""
+        tool_name = call.get("name")
 
-        for tool in tools:
-            config = tool.get("function")
-            args = json.loads(config.get("arguments"))
-            tool_name = config.get("name")
+        try:
+            args = get_tool_input(call)
+        except ValueError as e:
+            logger(f"Invalid arguments for tool {tool_name}: {str(e)}")
+            output = f"Error: Invalid arguments for tool '{tool_name}': {e}"
 
-            output = None
+            return {"role": "tool", "tool_call_id": call.get("id"), "content": output}
 
-            # Try to call server tool first
-            if self.server_manager is not None:
-                try:
-                    tool_output = await self.server_manager.call_tool(tool_name, args)
-                    output = tool_output.content
-                except ValueError:
-                    # Tool not found in server, try local tools
-                    pass
+        output = None
 
+        # Try to call server tool first
+        if self.server_manager is not None:
             try:
-                if not output and self.tools:
-                    output = await self.tools[tool_name](**args)
+                tool_output = await self.server_manager.call_tool(tool_name, args)
+                output = tool_output.content
+            except ValueError:
+                # Tool not found in server, try local tools
+                pass
             except Exception as e:
                 logger(f"Error calling tool {tool_name}: {str(e)}")
 
-            if not output:
-                output = f"Error: Tool '{tool_name}' not found or failed to execute"
+        try:
+            if not output and self.tools:
+                output = await acall_function(self.tools[tool_name], args)
+        except Exception as e:
+            logger(f"Error calling tool {tool_name}: {str(e)}")
 
-            tool_messages.append(
-                {"role": "tool", "tool_call_id": tool.get("id"), "content": str(output)}
-            )
+        if not output:
+            output = f"Error: Tool '{tool_name}' not found or failed to execute"
+
+        return {"role": "tool", "tool_call_id": call.get("id"), "content": str(output)}
+
+    async def process_tool_calls(self, message: dict) -> list:
+        calls = get_tool_calls(message)
 
-        return tool_messages
+        # Independent tool calls of the same turn run concurrently
+        return await arun_tools([partial(self.run_tool_call, call) for call in calls])
 
 
 class ChatAPI:
@@ -265,7 +350,13 @@ class ChatAPI:
             self.tools = {tool.__name__: tool for tool in tools}
             self.json_tools = [self.__function_to_json(tool) for tool in tools]
 
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = get_client(
+            "openai",
+            OpenAI,
+            api_key=self.api_key,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __function_to_json(self, func: callable) -> dict:
 
@@ -315,7 +406,8 @@ class ChatAPI:
             },
         }
 
-    def call_api(self, prompt: Union[List[Dict[str, str]], str]) -> Any:
+    def build_request(self, prompt: Union[List[Dict[str, str]], str]) -> dict:
+        """Arguments of the chat completion request for `prompt`."""
         json_data = {
             "model": self.model,
             "temperature": self.temperature,
@@ -329,25 +421,51 @@ class ChatAPI:
         else:
             json_data["messages"] = [{"role": "user", "content": prompt}]
 
-        try:
-            if self.stream and not self.json_schema:
-                json_data["stream_options"] = {"include_usage": True}
+        if self.stream and not self.json_schema:
+            json_data["stream_options"] = {"include_usage": True}
+
+            # Tool calls are streamed as deltas and assembled by the Task
+            if not json_data["tools"]:
                 json_data.pop("tools")
 
-            if "o1" or "o3" in self.model:
-                json_data.pop("temperature")
-                json_data.pop("max_tokens")
+        if "o1" or "o3" in self.model:
+            json_data.pop("temperature")
+            json_data.pop("max_tokens")
 
-            if self.json_schema:
-                json_data["response_format"] = self.json_schema
+        if self.json_schema:
+            json_data["response_format"] = self.json_schema
 
-                json_data.pop("stream")
-                json_data.pop("tools")
+            json_data.pop("stream")
+            json_data.pop("tools")
+
+        return json_data
+
+    def parse_response(self, body: dict) -> Any:
+        """Output of a chat completion returned as JSON (i.e. by a batch job)."""
+        self.response = ChatCompletion.model_validate(body)
+        self.tokens = self.get_tokens()
 
+        output = self.get_output()
+
+        if self.json_schema and not self.tool_flag:
+            content = self.response.choices[0].message.content
+            return json.loads(content)
+
+        return output
+
+    def call_api(self, prompt: Union[List[Dict[str, str]], str]) -> Any:
+        json_data = self.build_request(prompt)
+
+        try:
+            if self.json_schema:
                 self.stream = False
-                self.response = self.client.beta.chat.completions.parse(**json_data)
+                self.response = self.retry_policy.call(
+                    self.client.beta.chat.completions.parse, **json_data
+                )
             else:
-                self.response = self.client.chat.completions.create(**json_data)
+                self.response = self.retry_policy.call(
+                    self.client.chat.completions.create, **json_data
+                )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -356,6 +474,9 @@ class ChatAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_response(self) -> Any:
@@ -378,7 +499,7 @@ class ChatAPI:
 
     def get_tokens(self) -> Union[None, str]:
         if self.response is not None:
-            return self.response.model_dump()["usage"]
+            return normalize_usage(self.response.model_dump()["usage"])
         else:
             return None
 
@@ -388,32 +509,51 @@ class ChatAPI:
             if content:
                 return content
             else:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
         else:
             if chunk.model_dump()["usage"]:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
 
-    def process_tool_calls(self, message: dict) -> list:
-        tools = message.get("tool_calls")
-        tool_messages = []
+    def build_tool_call_message(self, calls: list, text: str = "") -> dict:
+        """Assistant message of assembled (streamed) tool calls."""
+        return build_tool_call_message(calls, text)
 
-        for tool in tools:
+    def build_tool_results(self, results: list) -> list:
+        return list(results)
 
-            config = tool.get("function")
-            args = json.loads(config.get("arguments"))
+    def run_tool_call(self, call: dict) -> dict:
+        """Run one tool call ({"id", "name", "arguments"}) into a tool message."""
+        tool_name = call.get("name")
 
-            output = self.tools[config.get("name")](**args)
+        try:
+            args = get_tool_input(call)
+        except ValueError as e:
+            logger(f"Invalid arguments for tool {tool_name}: {str(e)}")
+            output = f"Error: Invalid arguments for tool '{tool_name}': {e}"
 
-            tool_messages.append(
-                {"role": "tool", "tool_call_id": tool.get("id"), "content": str(output)}
-            )
+            return {"role": "tool", "tool_call_id": call.get("id"), "content": output}
+
+        try:
+            output = call_function(self.tools[tool_name], args)
+        except Exception as e:
+            logger(f"Error calling tool {tool_name}: {str(e)}")
+            output = f"Error: Tool '{tool_name}' failed to execute: {e}"
 
-        return tool_messages
+        return {"role": "tool", "tool_call_id": call.get("id"), "content": str(output)}
+
+    def process_tool_calls(self, message: dict) -> list:
+        calls = get_tool_calls(message)
+
+        # Independent tool calls of the same turn run concurrently
+        return run_tools([partial(self.run_tool_call, call) for call in calls])
 
 
 class AudioAPI:
     def __init__(self, api_key: str, model: str, **kwargs):
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client(
+            "openai", OpenAI, api_key=api_key, retry_policy=kwargs.get("retry_policy")
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
         self.model = model
 
         self.kwargs = kwargs
@@ -434,7 +574,9 @@ class AudioAPI:
         if language := self.kwargs.get("language"):
             parameters["language"] = language
 
-        self.response = self.client.audio.transcriptions.create(**parameters)
+        self.response = self.retry_policy.call(
+            self.client.audio.transcriptions.create, **parameters
+        )
 
         self.tokens = self.get_tokens()
         return self.get_output()
@@ -458,7 +600,10 @@ class AudioAPI:
 class SpeechAPI:
     def __init__(self, api_key: str, model: str, voice: str, **kwargs):
 
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client(
+            "openai", OpenAI, api_key=api_key, retry_policy=kwargs.get("retry_policy")
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
         self.model = model
         self.voice = voice
@@ -520,7 +665,9 @@ class SpeechAPI:
 
             parameters["speed"] = speed
 
-        self.response = self.client.audio.speech.create(**parameters)
+        self.response = self.retry_policy.call(
+            self.client.audio.speech.create, **parameters
+        )
         self.tokens = self.get_tokens(text)
 
         return self.get_output()
@@ -532,7 +679,7 @@ class SpeechAPI:
             return None
 
     def get_tokens(self, text: str) -> int:
-        return round(len(text) / 4)
+        return count_text_tokens(text, "openai", self.model)
 
 
 class VisionAPI:
@@ -546,7 +693,10 @@ class VisionAPI:
         stream: bool = False,
         **kwargs,
     ):
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client(
+            "openai", OpenAI, api_key=api_key, retry_policy=kwargs.get("retry_policy")
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
@@ -564,14 +714,7 @@ class VisionAPI:
             else:
                 f"data:image/png;base64,{image}"
         elif isinstance(image, Image.Image):
-            img_byte_arr = io.BytesIO()
-
-            image.save(img_byte_arr, format="PNG")
-            img_byte_arr = img_byte_arr.getvalue()
-
-            image_string = base64.b64encode(img_byte_arr).decode("utf-8")
-
-            return f"data:image/png;base64,{image_string}"
+            return image_to_data_url(image, "openai")
         else:
             raise Exception("Incorrect image type! Accepted: img_string or Image")
 
@@ -650,9 +793,13 @@ class VisionAPI:
 
                 self.stream = False
 
-                self.response = self.client.beta.chat.completions.parse(**json_data)
+                self.response = self.retry_policy.call(
+                    self.client.beta.chat.completions.parse, **json_data
+                )
             else:
-                self.response = self.client.chat.completions.create(**json_data)
+                self.response = self.retry_policy.call(
+                    self.client.chat.completions.create, **json_data
+                )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -661,6 +808,9 @@ class VisionAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_output(self) -> Union[None, str]:
@@ -679,7 +829,7 @@ class VisionAPI:
 
     def get_tokens(self) -> Union[None, str]:
         if self.response is not None:
-            return self.response.model_dump()["usage"]
+            return normalize_usage(self.response.model_dump()["usage"])
         else:
             return None
 
@@ -689,10 +839,10 @@ class VisionAPI:
             if content:
                 return content
             else:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
         else:
             if chunk.model_dump()["usage"]:
-                self.tokens = chunk.model_dump()["usage"]
+                self.tokens = normalize_usage(chunk.model_dump()["usage"])
 
 
 class ImageAPI:
@@ -1,10 +1,116 @@
-import requests
-
 from typing import Any, Union
 
+from repenseai.genai.clients import get_http_client
+from repenseai.genai.retry import NO_RETRY
 from repenseai.utils.logs import logger
 
 
+class AsyncChatAPI:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "",
+        temperature: float = 0.0,
+        max_tokens: int = 3500,
+        stream: bool = False,
+        **kwargs,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.stream = stream
+        self.max_tokens = max_tokens
+
+        self.tool_flag = False
+
+        self.url = "https://api.perplexity.ai/chat/completions"
+        self.client = get_http_client("perplexity", asynchronous=True)
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
+
+        self.response = None
+        self.tokens = None
+
+        self.__build_headers()
+
+    def __build_headers(self):
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def __process_prompt_list(self, prompt: list) -> list:
+
+        i = 0
+        while i < len(prompt) - 1:
+            if prompt[i]["role"] == "user" and prompt[i + 1]["role"] == "user":
+                if isinstance(prompt[i]["content"], list):
+                    prompt[i]["content"].extend(prompt[i + 1]["content"])
+                else:
+                    prompt[i]["content"] = [prompt[i]["content"]] + (
+                        prompt[i + 1]["content"]
+                        if isinstance(prompt[i + 1]["content"], list)
+                        else [prompt[i + 1]["content"]]
+                    )
+                prompt.pop(i + 1)
+            else:
+                i += 1
+
+        return prompt
+
+    async def call_api(self, prompt: list | str) -> Any:
+
+        json_data = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.tokens,
+            "stream": self.stream,
+            "stream_options": {"include_usage": True},
+            "search_recency_filter": "day",
+        }
+
+        if isinstance(prompt, list):
+            json_data["messages"] = self.__process_prompt_list(prompt)
+        else:
+            json_data["messages"] = [{"role": "user", "content": prompt}]
+
+        try:
+            self.response = await self.retry_policy.acall(
+                self.client.post, url=self.url, headers=self.headers, json=json_data
+            )
+
+            if not self.stream:
+                self.tokens = self.get_tokens()
+                return self.get_output()
+
+            return self.response
+
+        except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
+            logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
+
+    def get_output(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.json()["choices"][0]["message"]["content"]
+        else:
+            return None
+
+    def get_tokens(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.json()["usage"]
+        else:
+            return None
+
+    def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
+        if chunk.choices[0].finish_reason == "stop":
+            self.tokens = chunk.json()["usage"]
+        else:
+            string = chunk.choices[0].delta.content
+
+        return string
+
+
 class ChatAPI:
     def __init__(
         self,
@@ -24,6 +130,8 @@ class ChatAPI:
         self.tool_flag = False
 
         self.url = "https://api.perplexity.ai/chat/completions"
+        self.client = get_http_client("perplexity")
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
         self.response = None
         self.tokens = None
@@ -72,8 +180,8 @@ class ChatAPI:
             json_data["messages"] = [{"role": "user", "content": prompt}]
 
         try:
-            self.response = requests.post(
-                url=self.url, headers=self.headers, json=json_data
+            self.response = self.retry_policy.call(
+                self.client.post, url=self.url, headers=self.headers, json=json_data
             )
 
             if not self.stream:
@@ -83,6 +191,9 @@ class ChatAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_output(self) -> Union[None, str]:
@@ -6,6 +6,8 @@ from typing import Any
 
 from PIL import Image
 
+from repenseai.genai.retry import NO_RETRY
+
 
 class ChatAPI:
     def __init__(self, api_key: str, model: str = ""):
@@ -55,6 +57,7 @@ class ImageAPI:
         self.cfg_scale = cfg_scale
         self.strength = strength
         self.style_preset = style_preset
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
         self.root_url = "https://api.stability.ai/v2beta/stable-image"
 
@@ -250,7 +253,8 @@ class ImageAPI:
         data = self.__build_data(prompt, image)
         files = self.__build_files(image)
 
-        self.response = requests.post(
+        self.response = self.retry_policy.call(
+            requests.post,
             self.url,
             headers={"authorization": f"Bearer {self.api_key}", "accept": "image/*"},
             files=files,
@@ -1,18 +1,216 @@
-import io
-import base64
 import inspect
 import json
 
+from functools import partial
+
 from pydantic import BaseModel
 
 from typing import Any, Dict, List, Union, Callable
 
-from together import Together
+from together import AsyncTogether, Together
+from repenseai.genai.clients import get_client
+from repenseai.genai.retry import NO_RETRY
+from repenseai.utils.agent import acall_tool, arun_tools, call_tool, run_tools
+from repenseai.utils.image import image_to_data_url, resize_image
 from repenseai.utils.logs import logger
 
 from PIL import Image
 
 
+class AsyncChatAPI:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "databricks/dbrx-instruct",
+        temperature: float = 0.0,
+        max_tokens: int = 3500,
+        stream: bool = False,
+        json_schema: BaseModel = None,
+        tools: List[Callable] = None,
+        **kwargs,
+    ):
+
+        self.model = model
+        self.temperature = temperature
+        self.stream = stream
+        self.max_tokens = max_tokens
+
+        self.json_schema = json_schema
+
+        self.tools = None
+        self.json_tools = None
+
+        self.tool_flag = False
+
+        if tools:
+            self.tools = {tool.__name__: tool for tool in tools}
+            self.json_tools = [self.__function_to_json(tool) for tool in tools]
+
+        self.response = None
+        self.tokens = None
+
+        self.client = get_client(
+            "together",
+            AsyncTogether,
+            api_key=api_key,
+            http_client_arg=None,
+            asynchronous=True,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
+
+    def __function_to_json(self, func: callable) -> dict:
+
+        type_map = {
+            str: "string",
+            int: "integer",
+            float: "number",
+            bool: "boolean",
+            list: "array",
+            dict: "object",
+            type(None): "null",
+        }
+
+        try:
+            signature = inspect.signature(func)
+        except ValueError as e:
+            raise ValueError(
+                f"Failed to get signature for function {func.__name__}: {str(e)}"
+            )
+
+        parameters = {}
+        for param in signature.parameters.values():
+            try:
+                param_type = type_map.get(param.annotation, "string")
+            except KeyError as e:
+                raise KeyError(
+                    f"Unknown type annotation {param.annotation} for parameter {param.name}: {str(e)}"
+                )
+            parameters[param.name] = {"type": param_type}
+
+        required = [
+            param.name
+            for param in signature.parameters.values()
+            if param.default == inspect._empty
+        ]
+
+        return {
+            "type": "function",
+            "function": {
+                "name": func.__name__,
+                "description": func.__doc__ or "",
+                "parameters": {
+                    "type": "object",
+                    "properties": parameters,
+                    "required": required,
+                },
+            },
+        }
+
+    async def call_api(self, prompt: Union[List[Dict[str, str]], str]) -> None:
+
+        if self.tools:
+            return "This model does not support tool calls"
+
+        json_data = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": self.stream,
+            "stream_options": {"include_usage": True},
+        }
+
+        if isinstance(prompt, list):
+            json_data["messages"] = prompt
+        else:
+            json_data["messages"] = [{"role": "user", "content": prompt}]
+
+        try:
+            if self.json_schema:
+                json_data["response_format"] = {
+                    "type": "json_object",
+                    "schema": self.json_schema.model_json_schema(),
+                }
+
+            self.response = await self.retry_policy.acall(
+                self.client.chat.completions.create, **json_data
+            )
+
+            if not self.stream:
+                self.tokens = self.get_tokens()
+                return self.get_output()
+
+            return self.response
+
+        except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
+            logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
+
+    def get_response(self) -> Any:
+        return self.response
+
+    def get_output(self) -> Union[None, str]:
+        if self.response is not None:
+            dump = self.response.model_dump()
+
+            if dump["choices"][0]["finish_reason"] == "tool_calls":
+                self.tool_flag = True
+                return dump["choices"][0]["message"]
+
+            self.tool_flag = False
+            content = dump["choices"][0]["message"].get("content")
+
+            if self.json_schema:
+                return json.loads(content)
+
+            return content
+        else:
+            return None
+
+    def get_tokens(self) -> Union[None, str]:
+        if self.response is not None:
+            return self.response.model_dump()["usage"]
+        else:
+            return None
+
+    def process_stream_chunk(self, chunk: Any) -> Union[str, None]:
+        if chunk.choices:
+            content = chunk.choices[0].delta.content
+            if content:
+                return content
+            else:
+                self.tokens = chunk.model_dump()["usage"]
+        else:
+            if chunk.model_dump()["usage"]:
+                self.tokens = chunk.model_dump()["usage"]
+
+    async def process_tool_calls(self, message: dict) -> list:
+        tools = message.get("tool_calls")
+        calls = []
+
+        # Arguments are parsed by each call: malformed ones only fail that call
+        for tool in tools:
+            calls.append(partial(acall_tool, self.tools, tool.get("function")))
+
+        # Independent tool calls of the same turn run concurrently
+        outputs = await arun_tools(calls)
+        tool_messages = []
+
+        for tool, output in zip(tools, outputs):
+            if isinstance(output, Exception):
+                tool_name = tool.get("function").get("name")
+                logger(f"Error calling tool {tool_name}: {str(output)}")
+                output = f"Error: Tool '{tool_name}' failed to execute: {output}"
+
+            tool_messages.append(
+                {"role": "tool", "tool_call_id": tool.get("id"), "content": str(output)}
+            )
+
+        return tool_messages
+
+
 class ChatAPI:
     def __init__(
         self,
@@ -45,7 +243,14 @@ class ChatAPI:
         self.response = None
         self.tokens = None
 
-        self.client = Together(api_key=api_key)
+        self.client = get_client(
+            "together",
+            Together,
+            api_key=api_key,
+            http_client_arg=None,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
     def __function_to_json(self, func: callable) -> dict:
 
@@ -120,7 +325,9 @@ class ChatAPI:
                     "schema": self.json_schema.model_json_schema(),
                 }
 
-            self.response = self.client.chat.completions.create(**json_data)
+            self.response = self.retry_policy.call(
+                self.client.chat.completions.create, **json_data
+            )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -129,6 +336,9 @@ class ChatAPI:
             return self.response
 
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_response(self) -> Any:
@@ -171,14 +381,21 @@ class ChatAPI:
 
     def process_tool_calls(self, message: dict) -> list:
         tools = message.get("tool_calls")
-        tool_messages = []
+        calls = []
 
+        # Arguments are parsed by each call: malformed ones only fail that call
         for tool in tools:
+            calls.append(partial(call_tool, self.tools, tool.get("function")))
 
-            config = tool.get("function")
-            args = json.loads(config.get("arguments"))
+        # Independent tool calls of the same turn run concurrently
+        outputs = run_tools(calls)
+        tool_messages = []
 
-            output = self.tools[config.get("name")](**args)
+        for tool, output in zip(tools, outputs):
+            if isinstance(output, Exception):
+                tool_name = tool.get("function").get("name")
+                logger(f"Error calling tool {tool_name}: {str(output)}")
+                output = f"Error: Tool '{tool_name}' failed to execute: {output}"
 
             tool_messages.append(
                 {"role": "tool", "tool_call_id": tool.get("id"), "content": str(output)}
@@ -195,8 +412,16 @@ class VisionAPI:
         temperature: float = 0.0,
         max_tokens: int = 3500,
         stream: bool = False,
+        **kwargs,
     ):
-        self.client = Together(api_key=api_key)
+        self.client = get_client(
+            "together",
+            Together,
+            api_key=api_key,
+            http_client_arg=None,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
@@ -206,45 +431,13 @@ class VisionAPI:
         self.tokens = None
 
     def resize_image(self, image: Image.Image) -> Image.Image:
-        max_size = 1568
-        min_size = 200
-        width, height = image.size
-
-        if max(width, height) > max_size:
-            aspect_ratio = width / height
-            if width > height:
-                new_width = max_size
-                new_height = int(new_width / aspect_ratio)
-            else:
-                new_height = max_size
-                new_width = int(new_height * aspect_ratio)
-            image = image.resize((new_width, new_height))
-        elif min(width, height) < min_size:
-            aspect_ratio = width / height
-            if width < height:
-                new_width = min_size
-                new_height = int(new_width / aspect_ratio)
-            else:
-                new_height = min_size
-                new_width = int(new_height * aspect_ratio)
-            image = image.resize((new_width, new_height))
-
-        return image
+        return resize_image(image, "together")
 
-    def process_image(self, image: Any) -> bytearray:
+    def process_image(self, image: Any) -> str:
         if isinstance(image, str):
-            return image
+            return f"data:image/png;base64,{image}"
         elif isinstance(image, Image.Image):
-            img_byte_arr = io.BytesIO()
-
-            image = self.resize_image(image)
-            image.save(img_byte_arr, format="PNG")
-
-            img_byte_arr = img_byte_arr.getvalue()
-
-            image_string = base64.b64encode(img_byte_arr).decode("utf-8")
-
-            return image_string
+            return image_to_data_url(image, "together")
         else:
             raise Exception("Incorrect image type! Accepted: img_string or Image")
 
@@ -261,7 +454,7 @@ class VisionAPI:
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{image}",
+                        "url": image,
                         "detail": "high",
                     },
                 },
@@ -273,7 +466,7 @@ class VisionAPI:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{img}",
+                            "url": img,
                             "detail": "high",
                         },
                     },
@@ -298,7 +491,9 @@ class VisionAPI:
         }
 
         try:
-            self.response = self.client.chat.completions.create(**json_data)
+            self.response = self.retry_policy.call(
+                self.client.chat.completions.create, **json_data
+            )
 
             if not self.stream:
                 self.tokens = self.get_tokens()
@@ -306,6 +501,9 @@ class VisionAPI:
 
             return self.response
         except Exception as e:
+            if self.retry_policy is not NO_RETRY:
+                raise
+
             logger(f"Erro na chamada da API - modelo {json_data['model']}: {e}")
 
     def get_output(self) -> Union[None, str]:
@@ -341,7 +539,14 @@ class ImageAPI:
         **kwargs,
     ):
 
-        self.client = Together(api_key=api_key)
+        self.client = get_client(
+            "together",
+            Together,
+            api_key=api_key,
+            http_client_arg=None,
+            retry_policy=kwargs.get("retry_policy"),
+        )
+        self.retry_policy = kwargs.get("retry_policy") or NO_RETRY
 
         self.model = model
         self.aspect_ratio = aspect_ratio
@@ -385,7 +590,7 @@ class ImageAPI:
         if image:
             payload["image_url"] = f"data:image/png;base64,{image}"
 
-        self.response = self.client.images.generate(**payload)
+        self.response = self.retry_policy.call(self.client.images.generate, **payload)
         self.tokens = self.get_tokens()
 
         return self.get_image()
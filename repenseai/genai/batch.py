@@ -0,0 +1,419 @@
+import json
+import os
+import time
+
+import typing as tp
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from repenseai.genai.cache import make_key
+from repenseai.genai.history import snapshot
+from repenseai.utils.logs import logger
+
+
+# Batch endpoints bill half the interactive price
+BATCH_DISCOUNT = 0.5
+
+OPENAI_BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+class OpenAIBatch:
+    """OpenAI Batch API: JSONL upload, batch creation, polling and download."""
+
+    final_statuses = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, client: tp.Any, completion_window: str = "24h") -> None:
+        self.client = client
+        self.completion_window = completion_window
+
+    def prepare(self, body: dict) -> dict:
+        skip = ("stream", "stream_options")
+        body = {k: v for k, v in body.items() if v is not None and k not in skip}
+
+        # Structured outputs: pydantic model to its JSON schema
+        schema = body.get("response_format")
+
+        if hasattr(schema, "model_json_schema"):
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": schema.__name__,
+                    "schema": schema.model_json_schema(),
+                },
+            }
+
+        return body
+
+    def submit(self, requests: dict) -> str:
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": OPENAI_BATCH_ENDPOINT,
+                    "body": body,
+                }
+            )
+            for custom_id, body in requests.items()
+        ]
+
+        file = self.client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+        )
+
+        batch = self.client.batches.create(
+            input_file_id=file.id,
+            endpoint=OPENAI_BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+
+        return batch.id
+
+    def poll(self, batch_id: str) -> tuple:
+        """(status, finished) of a batch."""
+        batch = self.client.batches.retrieve(batch_id)
+        return batch.status, batch.status in self.final_statuses
+
+    def results(self, batch_id: str) -> dict:
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+
+                item = json.loads(line)
+                response = item.get("response") or {}
+
+                if item.get("error") or response.get("status_code", 200) >= 400:
+                    error = item.get("error") or response.get("body", {}).get("error")
+                    results[item["custom_id"]] = {"body": None, "error": str(error)}
+                else:
+                    results[item["custom_id"]] = {
+                        "body": response["body"],
+                        "error": None,
+                    }
+
+        return results
+
+
+class AnthropicBatch:
+    """Anthropic Message Batches API."""
+
+    final_statuses = ("ended",)
+
+    def __init__(self, client: tp.Any) -> None:
+        self.client = client
+
+    def prepare(self, body: dict) -> dict:
+        return {k: v for k, v in body.items() if v is not None}
+
+    def submit(self, requests: dict) -> str:
+        batch = self.client.messages.batches.create(
+            requests=[
+                {"custom_id": custom_id, "params": body}
+                for custom_id, body in requests.items()
+            ]
+        )
+
+        return batch.id
+
+    def poll(self, batch_id: str) -> tuple:
+        """(status, finished) of a batch."""
+        batch = self.client.messages.batches.retrieve(batch_id)
+        status = batch.processing_status
+
+        return status, status in self.final_statuses
+
+    def results(self, batch_id: str) -> dict:
+        results = {}
+
+        for item in self.client.messages.batches.results(batch_id):
+            result = item.result
+
+            if result.type == "succeeded":
+                body = result.message.model_dump(mode="json")
+                results[item.custom_id] = {"body": body, "error": None}
+            else:
+                error = getattr(result, "error", None) or result.type
+                results[item.custom_id] = {"body": None, "error": str(error)}
+
+        return results
+
+
+BATCH_PROVIDERS = {
+    "openai": OpenAIBatch,
+    "anthropic": AnthropicBatch,
+}
+
+
+class BatchJob:
+    """
+    State of a batch run, saved as JSON at `path` (when given) after every
+    step, so an interrupted run picks up the same provider batch instead of
+    submitting the requests again.
+    """
+
+    def __init__(self, path: str | None = None, key: str | None = None) -> None:
+        self.path = path
+        self.key = key
+
+        self.batch_id = None
+        self.status = None
+        self.finished = False
+        self.results = {}
+
+    @classmethod
+    def load(cls, path: str | None, key: str) -> "BatchJob":
+        job = cls(path, key)
+
+        if not path or not os.path.exists(path):
+            return job
+
+        with open(path, "r", encoding="utf-8") as file:
+            state = json.load(file)
+
+        if state.get("key") != key:
+            raise Exception(f"Batch state at {path} belongs to other requests")
+
+        job.batch_id = state.get("batch_id")
+        job.status = state.get("status")
+        job.finished = state.get("finished", False)
+        job.results = state.get("results", {})
+
+        return job
+
+    def save(self) -> None:
+        if not self.path:
+            return
+
+        state = {
+            "key": self.key,
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "finished": self.finished,
+            "results": self.results,
+        }
+
+        # Write then rename: a crash never leaves a truncated state file
+        temp = f"{self.path}.tmp"
+
+        with open(temp, "w", encoding="utf-8") as file:
+            json.dump(state, file, ensure_ascii=False)
+
+        os.replace(temp, self.path)
+
+
+def _run_remote(
+    job: BatchJob,
+    adapter: tp.Any,
+    tasks: list,
+    ids: list,
+    poll_interval: float,
+    timeout: float | None,
+) -> None:
+    if job.batch_id is None:
+        requests = {}
+
+        for custom_id, task in zip(ids, tasks):
+            if not hasattr(task.api, "build_request"):
+                raise Exception(f"Batch mode not supported for {task.agent.provider}")
+
+            body = task.api.build_request(snapshot(task.prompt))
+            requests[custom_id] = adapter.prepare(body)
+
+        job.batch_id = adapter.submit(requests)
+        job.status = "submitted"
+        job.save()
+
+        logger(f"Batch {job.batch_id} submitted with {len(requests)} requests")
+
+    start = time.monotonic()
+
+    while not job.finished:
+        job.status, job.finished = adapter.poll(job.batch_id)
+
+        if job.finished:
+            job.results = adapter.results(job.batch_id)
+            job.save()
+            break
+
+        job.save()
+
+        if timeout is not None and time.monotonic() - start >= timeout:
+            raise Exception(
+                f"Batch {job.batch_id} still {job.status} after {timeout}s; "
+                "run again with the same path to resume"
+            )
+
+        time.sleep(poll_interval)
+
+
+def _run_local(
+    job: BatchJob, tasks: list, contexts: list, ids: list, max_workers: int
+) -> set:
+    def run(task: tp.Any, context: dict) -> dict:
+        response = task.run(context)
+
+        if isinstance(response, dict) and not task.simple_response:
+            return response
+
+        return {
+            "response": response,
+            "tokens": task.api.tokens,
+            "cost": task.agent.calculate_cost(task.api.tokens),
+        }
+
+    pending = [i for i, custom_id in enumerate(ids) if custom_id not in job.results]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run, tasks[i], contexts[i]): i for i in pending}
+
+        for future in as_completed(futures):
+            custom_id = ids[futures[future]]
+
+            try:
+                job.results[custom_id] = {"output": future.result(), "error": None}
+            except Exception as e:
+                job.results[custom_id] = {"output": None, "error": str(e)}
+
+            job.save()
+
+    job.status = "completed"
+    job.finished = True
+    job.save()
+
+    return {ids[i] for i in pending}
+
+
+def _demultiplex(
+    agent: tp.Any, task: tp.Any, context: dict, result: dict | None, ran: bool
+) -> tp.Any:
+    error = result["error"] if result else "missing from the batch results"
+
+    if error:
+        logger(f"Batch request failed - model {agent.model}: {error}")
+
+        if task.simple_response:
+            return None
+
+        return {"response": None, "tokens": None, "cost": 0, "error": error}
+
+    # Local stand-in: the task already ran, unless resumed from disk
+    if "output" in result:
+        output = result["output"]
+
+        if not ran:
+            task.prompt.append({"role": "assistant", "content": output["response"]})
+
+        return output["response"] if task.simple_response else output
+
+    response = task.api.parse_response(result["body"])
+    tokens = task.api.tokens
+
+    if getattr(task.api, "tool_flag", False):
+        # Tool results must be sent back: finish the task interactively
+        task.prompt.append(response)
+        task.prompt += task.api.process_tool_calls(response)
+
+        return task.run(context)
+
+    task.prompt.append({"role": "assistant", "content": response})
+
+    if task.simple_response:
+        return response
+
+    return {
+        "response": response,
+        "tokens": tokens,
+        "cost": agent.calculate_cost(tokens) * BATCH_DISCOUNT,
+    }
+
+
+def run_batch(
+    agent: tp.Any,
+    tasks: list,
+    context: tp.List[dict] | dict | None = None,
+    path: str | None = None,
+    poll_interval: float = 30.0,
+    timeout: float | None = None,
+    local: bool | None = None,
+    client: tp.Any = None,
+    max_workers: int = 8,
+) -> list:
+    """
+    Run many chat tasks as one provider batch job.
+
+    The task prompts are packed into an OpenAI or Anthropic batch (cheaper
+    and outside the interactive rate limits), polled every `poll_interval`
+    seconds and the results are demultiplexed back to their tasks, in order,
+    with the same shape `Task.run` returns. Tool call turns are finished
+    interactively.
+
+    Providers without a batch endpoint (or `local=True`) use a local
+    stand-in that runs the tasks concurrently through the regular API.
+
+    With `path`, the job state is kept on disk: if the run is interrupted
+    (or `timeout` expires) running it again with the same tasks and path
+    resumes the submitted batch.
+
+    Args:
+        agent: Agent of the tasks
+        tasks: Chat tasks to run
+        context: One context for every task, or one per task
+        path: JSON file where the job state is saved
+        poll_interval: Seconds between status checks
+        timeout: Seconds to wait for the batch before giving up
+        local: Force (or forbid) the local stand-in
+        client: Provider SDK client, defaults to the client of the first task
+        max_workers: Concurrent requests of the local stand-in
+
+    Returns:
+        list: The result of each task, in the order of `tasks`
+    """
+    if agent.model_type != "chat":
+        raise Exception("Batch mode only works with chat models")
+
+    if not tasks:
+        return []
+
+    if isinstance(context, list):
+        contexts = context
+    else:
+        contexts = [context or {}] * len(tasks)
+
+    if len(contexts) != len(tasks):
+        raise ValueError("Expected one context per task")
+
+    prompts = [task._build_prompt(ctx) for task, ctx in zip(tasks, contexts)]
+    ids = [f"task-{i}" for i in range(len(tasks))]
+
+    adapter_class = BATCH_PROVIDERS.get(agent.provider)
+
+    if local is None:
+        local = adapter_class is None
+
+    if not local and adapter_class is None:
+        raise Exception(f"Batch API not available for {agent.provider}")
+
+    key = make_key(
+        provider=agent.provider, model=agent.model, local=local, prompts=prompts
+    )
+    job = BatchJob.load(path, key)
+
+    ran = set()
+
+    if local:
+        ran = _run_local(job, tasks, contexts, ids, max_workers)
+    else:
+        adapter = adapter_class(client or tasks[0].api.client)
+        _run_remote(job, adapter, tasks, ids, poll_interval, timeout)
+
+    return [
+        _demultiplex(agent, task, ctx, job.results.get(custom_id), custom_id in ran)
+        for task, ctx, custom_id in zip(tasks, contexts, ids)
+    ]
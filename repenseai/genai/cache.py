@@ -0,0 +1,614 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+import typing as tp
+
+import numpy as np
+
+from collections import OrderedDict
+
+from repenseai.utils.logs import logger
+
+
+def canonicalize(value: tp.Any) -> tp.Any:
+    """
+    Turn a request part into a stable, JSON serializable value.
+
+    Callables (tools) become their qualified name, pydantic models their JSON
+    schema and binary payloads (bytes, PIL images) a sha256 of their content.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    if isinstance(value, dict):
+        return {str(k): canonicalize(v) for k, v in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+
+    if isinstance(value, (bytes, bytearray)):
+        return hashlib.sha256(value).hexdigest()
+
+    if hasattr(value, "model_json_schema"):
+        return canonicalize(value.model_json_schema())
+
+    if hasattr(value, "model_dump"):
+        return canonicalize(value.model_dump())
+
+    if hasattr(value, "tobytes") and hasattr(value, "size"):
+        digest = hashlib.sha256(value.tobytes())
+        digest.update(f"{getattr(value, 'mode', '')}{value.size}".encode())
+        return digest.hexdigest()
+
+    if callable(value):
+        module = getattr(value, "__module__", "")
+        return f"{module}.{getattr(value, '__qualname__', repr(value))}"
+
+    return str(value)
+
+
+def make_key(**parts) -> str:
+    """sha256 of the canonical JSON of the request parts."""
+    payload = json.dumps(canonicalize(parts), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Opt-in cache of completions, with two tiers:
+
+    - an in-memory LRU limited to `maxsize` entries
+    - an optional SQLite file (`path`) that survives between runs
+
+    Entries expire after `ttl` seconds (None keeps them forever). Only plain
+    JSON serializable responses are stored, so tool call turns and streams
+    always reach the provider.
+
+    Example:
+        cache = CompletionCache(path="completions.db")
+        agent = Agent(model="gpt-4o-mini", model_type="chat", cache=cache)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float | None = None,
+        path: str | None = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS completions "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._connection.commit()
+
+    def __expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def __remember(self, key: str, value: dict, created: float) -> None:
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            if key in self._memory:
+                value, created = self._memory[key]
+
+                if not self.__expired(created):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._memory[key]
+
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT value, created FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is not None:
+                    value, created = json.loads(row[0]), row[1]
+
+                    if not self.__expired(created):
+                        self.__remember(key, value, created)
+                        self.hits += 1
+                        return value
+
+                    self._connection.execute(
+                        "DELETE FROM completions WHERE key = ?", (key,)
+                    )
+                    self._connection.commit()
+
+            self.misses += 1
+
+        return None
+
+    def set(self, key: str, value: dict) -> bool:
+        """Store a value. Returns False when it is not JSON serializable."""
+        try:
+            serialized = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return False
+
+        created = time.time()
+
+        with self._lock:
+            self.__remember(key, json.loads(serialized), created)
+
+            if self._connection is not None:
+                try:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO completions VALUES (?, ?, ?)",
+                        (key, serialized, created),
+                    )
+                    self._connection.commit()
+                except sqlite3.Error as e:
+                    logger(f"Error writing to completion cache: {e}")
+
+        return True
+
+    def lookup(self, scope: str, request: tp.Any) -> dict | None:
+        """Cached value of a request made with the given settings (`scope`)."""
+        return self.get(make_key(scope=scope, request=request))
+
+    def store(self, scope: str, request: tp.Any, value: dict) -> bool:
+        return self.set(make_key(scope=scope, request=request), value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM completions")
+                self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._memory),
+        }
+
+
+IMAGE_PART_TYPES = ("image", "image_url", "input_image", "document")
+
+
+def extract_text(request: tp.Any) -> str | None:
+    """
+    Text of a chat request (roles and message contents), used as the input of
+    the semantic cache. Returns None when the request has non text parts, such
+    as images, which the semantic cache does not handle.
+    """
+    parts = []
+
+    def walk(value: tp.Any) -> bool:
+        if value is None:
+            return True
+
+        if isinstance(value, str):
+            parts.append(value)
+            return True
+
+        if isinstance(value, (list, tuple)):
+            return all(walk(item) for item in value)
+
+        if isinstance(value, dict):
+            if value.get("type") in IMAGE_PART_TYPES:
+                return False
+
+            if role := value.get("role"):
+                parts.append(f"{role}:")
+
+            if "content" in value:
+                return walk(value["content"])
+
+            return walk(value.get("text"))
+
+        return False
+
+    if not walk(request):
+        return None
+
+    return "\n".join(parts)
+
+
+# Stored questions checked per lookup for one with the same identifiers
+SEARCH_K = 4
+
+# Words with digits (order numbers, ids, dates): a question only matches a
+# stored one with the same identifiers, however similar the rest is
+IDENTIFIER = re.compile(r"\w*\d\w*")
+
+
+def get_identifiers(text: str) -> tuple:
+    return tuple(sorted(set(IDENTIFIER.findall(text.lower()))))
+
+
+def split_request(request: tp.Any) -> tuple | None:
+    """
+    Split a chat request (the `call_api` arguments) into (context, question).
+
+    `question` is the text of the last user message, the only part the
+    semantic cache matches by similarity. `context` is a key of everything
+    else (system prompt, history, tool results, other arguments), which must
+    match exactly. Returns None when the question has non text parts, such
+    as images, or is missing.
+    """
+    args = list(request) if isinstance(request, tuple) else [request]
+    prompt = args[0] if args else None
+
+    if isinstance(prompt, str):
+        question, history = prompt, []
+    elif isinstance(prompt, list):
+        users = [
+            i
+            for i, message in enumerate(prompt)
+            if isinstance(message, dict) and message.get("role") == "user"
+        ]
+
+        if not users:
+            return None
+
+        last = users[-1]
+        after = last + 1
+
+        question = extract_text(prompt[last].get("content"))
+        history = prompt[:last] + prompt[after:]
+    else:
+        return None
+
+    if question is None:
+        return None
+
+    return make_key(history=history, args=args[1:]), question
+
+
+class HashingEmbedder:
+    """
+    Dependency free text embedder based on the hashing trick.
+
+    Words and character n-grams are hashed into `dim` signed buckets and the
+    result is L2 normalized, so the dot product is a cosine similarity that is
+    robust to small edits (typos, punctuation, casing). For paraphrases, plug
+    in a real embedding model through `SemanticCache(embedder=...)`.
+    """
+
+    def __init__(self, dim: int = 1024, ngram: int = 3) -> None:
+        self.dim = dim
+        self.ngram = ngram
+
+    def __features(self, text: str) -> tp.List[str]:
+        words = "".join(c if c.isalnum() else " " for c in text.lower()).split()
+        features = list(words)
+
+        for word in words:
+            padded = f" {word} "
+
+            for start in range(max(1, len(padded) - self.ngram + 1)):
+                end = start + self.ngram
+                features.append(padded[start:end])
+
+        return features
+
+    def __call__(self, texts: tp.List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for feature in self.__features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8)
+                value = int.from_bytes(digest.digest(), "little")
+
+                sign = 1.0 if value & 1 else -1.0
+                vectors[row, (value >> 1) % self.dim] += sign
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        return vectors / norms
+
+
+class VectorIndex:
+    """Brute force inner product index over normalized vectors."""
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self.vectors = np.zeros((16, dim), dtype=np.float32)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, vector: np.ndarray) -> int:
+        if self.count == len(self.vectors):
+            grown = np.zeros((len(self.vectors) * 2, self.dim), dtype=np.float32)
+            grown[: self.count] = self.vectors[: self.count]
+            self.vectors = grown
+
+        self.vectors[self.count] = vector
+        self.count += 1
+
+        return self.count - 1
+
+    def search(self, vector: np.ndarray, k: int = 1) -> tp.List[tp.Tuple[int, float]]:
+        if not self.count:
+            return []
+
+        scores = self.vectors[: self.count] @ vector
+        return self._top(np.arange(self.count), scores, k)
+
+    @staticmethod
+    def _top(ids: np.ndarray, scores: np.ndarray, k: int) -> list:
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+
+        best = best[np.argsort(-scores[best])]
+
+        return [(int(ids[i]), float(scores[i])) for i in best]
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted file index: vectors are bucketed by their nearest k-means
+    centroid and a search only scans the `n_probe` closest buckets.
+
+    Until `train_size` vectors are stored it behaves like VectorIndex, then
+    the centroids are trained once over the stored vectors.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        n_lists: int = 64,
+        n_probe: int = 4,
+        train_size: int | None = None,
+        iterations: int = 10,
+    ) -> None:
+        super().__init__(dim)
+
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size or n_lists * 16
+        self.iterations = iterations
+
+        self.centroids = None
+        self.lists = []
+
+    def __nearest(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def train(self) -> None:
+        data = self.vectors[: self.count]
+        rng = np.random.default_rng(0)
+
+        self.n_lists = min(self.n_lists, self.count)
+        centroids = data[rng.choice(self.count, self.n_lists, replace=False)]
+
+        for _ in range(self.iterations):
+            self.centroids = centroids
+            assignment = self.__nearest(data)
+
+            for i in range(self.n_lists):
+                members = data[assignment == i]
+
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[i] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        self.centroids = centroids
+        assignment = self.__nearest(data)
+
+        self.lists = [
+            list(np.flatnonzero(assignment == i)) for i in range(self.n_lists)
+        ]
+
+    def add(self, vector: np.ndarray) -> int:
+        index = super().add(vector)
+
+        if self.centroids is not None:
+            self.lists[int(self.__nearest(vector[None, :])[0])].append(index)
+        elif self.count >= self.train_size:
+            self.train()
+
+        return index
+
+    def search(self, vector: np.ndarray, k: int = 1) -> tp.List[tp.Tuple[int, float]]:
+        if self.centroids is None:
+            return super().search(vector, k)
+
+        probes = np.argsort(-(self.centroids @ vector))[: self.n_probe]
+        ids = np.array([i for probe in probes for i in self.lists[probe]], dtype=int)
+
+        if not len(ids):
+            return []
+
+        return self._top(ids, self.vectors[ids] @ vector, k)
+
+
+class SemanticCache:
+    """
+    Cache that also answers near-duplicate requests.
+
+    Only the last user message of each request is embedded: the rest of the
+    conversation (system prompt, history, tool results) is hashed into the
+    scope, so a shared system prompt can not make different questions
+    collide. Vectors are stored in a local index per scope (provider, model,
+    generation settings and that context). A lookup returns the cached value
+    of the most similar stored question when its cosine similarity is at
+    least `threshold` and it has the same identifiers (words with digits,
+    i.e. order numbers). Questions with images are skipped.
+
+    Args:
+        threshold: Minimum cosine similarity for a hit
+        embedder: Callable mapping a list of texts to a (n, dim) array of
+            L2 normalized vectors. Defaults to HashingEmbedder
+        index: "flat" for brute force search or "ivf" for an IVFIndex
+        ttl: Seconds after which an entry is ignored, None keeps it forever
+        maxsize: Entries kept per scope, and scopes kept overall; the oldest
+            (least recently used scopes) are dropped beyond it
+        index_options: Extra arguments for the index (i.e. n_lists, n_probe)
+
+    Example:
+        cache = SemanticCache(threshold=0.92)
+        agent = Agent(model="gpt-4o-mini", model_type="chat", cache=cache)
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        embedder: tp.Callable[[tp.List[str]], np.ndarray] | None = None,
+        index: str = "flat",
+        ttl: float | None = None,
+        maxsize: int = 100_000,
+        index_options: dict | None = None,
+    ) -> None:
+        if index not in ("flat", "ivf"):
+            raise ValueError(f"Unknown index type: {index}")
+
+        self.threshold = threshold
+        self.embedder = embedder or HashingEmbedder()
+        self.index = index
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.index_options = index_options or {}
+
+        self.hits = 0
+        self.misses = 0
+        self.similarity = 0.0
+
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __embed(self, text: str) -> np.ndarray:
+        return np.asarray(self.embedder([text]), dtype=np.float32)[0]
+
+    def __build_index(self, dim: int) -> VectorIndex:
+        if self.index == "ivf":
+            return IVFIndex(dim, **self.index_options)
+
+        return VectorIndex(dim)
+
+    def __rebuild(self, scope: dict) -> None:
+        start = len(scope["entries"]) - int(self.maxsize * 0.9)
+        keep = scope["entries"][start:]
+        index = self.__build_index(len(keep[0][0]))
+
+        for vector, *_ in keep:
+            index.add(vector)
+
+        scope["entries"] = keep
+        scope["index"] = index
+
+    def lookup(self, scope: str, request: tp.Any) -> dict | None:
+        parts = split_request(request)
+
+        with self._lock:
+            entries = None if parts is None else self._scopes.get((scope, parts[0]))
+
+            if entries is None:
+                self.misses += 1
+                return None
+
+        context, question = parts
+        identifiers = get_identifiers(question)
+        vector = self.__embed(question)
+
+        with self._lock:
+            for index, score in entries["index"].search(vector, k=SEARCH_K):
+                _, value, created, stored = entries["entries"][index]
+
+                if score < self.threshold:
+                    break
+
+                if self.ttl is not None and time.time() - created > self.ttl:
+                    continue
+
+                if stored != identifiers:
+                    continue
+
+                if (scope, context) in self._scopes:
+                    self._scopes.move_to_end((scope, context))
+
+                self.hits += 1
+                self.similarity += score
+                return value
+
+            self.misses += 1
+
+        return None
+
+    def store(self, scope: str, request: tp.Any, value: dict) -> bool:
+        parts = split_request(request)
+
+        if parts is None:
+            return False
+
+        context, question = parts
+        vector = self.__embed(question)
+
+        with self._lock:
+            if (scope, context) not in self._scopes:
+                self._scopes[(scope, context)] = {
+                    "index": self.__build_index(len(vector)),
+                    "entries": [],
+                }
+
+            self._scopes.move_to_end((scope, context))
+
+            if len(self._scopes) > self.maxsize:
+                self._scopes.popitem(last=False)
+
+            entries = self._scopes[(scope, context)]
+            entries["index"].add(vector)
+            entries["entries"].append(
+                (vector, value, time.time(), get_identifiers(question))
+            )
+
+            if len(entries["entries"]) > self.maxsize:
+                self.__rebuild(entries)
+
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes = OrderedDict()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": sum(len(scope["entries"]) for scope in self._scopes.values()),
+            "mean_similarity": self.similarity / self.hits if self.hits else 0.0,
+        }
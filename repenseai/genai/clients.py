@@ -0,0 +1,297 @@
+import asyncio
+import threading
+import weakref
+
+import typing as tp
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _close(client: tp.Any) -> None:
+    close = getattr(client, "close", None)
+
+    if callable(close) and not asyncio.iscoroutinefunction(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+async def _aclose(client: tp.Any) -> None:
+    # httpx.AsyncClient has aclose(), the async SDKs a coroutine close()
+    for name in ("aclose", "close"):
+        close = getattr(client, name, None)
+
+        if asyncio.iscoroutinefunction(close):
+            try:
+                await close()
+            except Exception:
+                pass
+
+            return
+
+    _close(client)
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of provider SDK clients.
+
+    Clients are keyed by (provider, client class, api_key, base_url, region),
+    so every Agent / ChatAPI instance that talks to the same endpoint with the
+    same credentials reuses one keep-alive, connection-pooled client instead
+    of paying the TLS handshake on every Task.
+
+    Async clients are additionally scoped to the running event loop, since
+    httpx.AsyncClient connections can not be shared across loops.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 600.0,
+        http2: bool = True,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.http2 = http2
+
+        self._clients = {}
+        self._loop_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def configure(self, **settings) -> None:
+        """
+        Update pool settings. Only clients created afterwards are affected,
+        so call this before the first Agent is built (or after close()).
+
+        Args:
+            max_connections: Maximum number of connections per client
+            max_keepalive_connections: Idle connections kept open per client
+            keepalive_expiry: Seconds an idle connection is kept alive
+            timeout: Default request timeout in seconds
+            http2: Use HTTP/2 when the optional `h2` package is installed
+        """
+        for key, value in settings.items():
+            if not hasattr(self, key) or key.startswith("_"):
+                raise ValueError(f"Unknown client registry setting: {key}")
+
+            setattr(self, key, value)
+
+    def get_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def build_http_client(self, asynchronous: bool = False) -> tp.Any:
+        client_class = httpx.AsyncClient if asynchronous else httpx.Client
+
+        return client_class(
+            limits=self.get_limits(),
+            timeout=self.timeout,
+            http2=self.http2 and HTTP2_AVAILABLE,
+            follow_redirects=True,
+        )
+
+    def __get_scope(self, asynchronous: bool) -> dict:
+        if not asynchronous:
+            return self._clients
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._clients
+
+        return self._loop_clients.setdefault(loop, {})
+
+    def __get_or_create(
+        self, key: tuple, factory: tp.Callable, asynchronous: bool = False
+    ) -> tp.Any:
+        with self._lock:
+            scope = self.__get_scope(asynchronous)
+            client = scope.get(key)
+
+            if client is None:
+                client = factory()
+                scope[key] = client
+
+        return client
+
+    def get_client(
+        self,
+        provider: str,
+        client_class: tp.Callable,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        region: str | None = None,
+        http_client_arg: str | None = "http_client",
+        asynchronous: bool = False,
+        retry_policy: tp.Any = None,
+        **kwargs,
+    ) -> tp.Any:
+        """
+        Return the shared SDK client for the given key, building it on first use.
+
+        Args:
+            provider: Provider name, used as part of the key
+            client_class: SDK client class (i.e. OpenAI, AsyncAnthropic)
+            api_key: API key passed to the SDK client
+            base_url: Base url passed to the SDK client
+            region: Region, only used as part of the key
+            http_client_arg: Name of the SDK argument that receives the pooled
+                httpx client, or None when the SDK manages its own pool
+            asynchronous: Whether the SDK expects an httpx.AsyncClient
+            retry_policy: RetryPolicy the caller wraps its calls with. The SDK
+                built-in retries (`max_retries`) are then turned off, so the
+                attempts of both do not multiply
+        """
+        key = (
+            provider,
+            client_class.__qualname__,
+            api_key,
+            base_url,
+            region,
+            asynchronous,
+            retry_policy is not None,
+        )
+
+        def factory():
+            arguments = dict(kwargs)
+
+            if api_key is not None:
+                arguments["api_key"] = api_key
+            if base_url is not None:
+                arguments["base_url"] = base_url
+            if http_client_arg is not None:
+                arguments[http_client_arg] = self.build_http_client(asynchronous)
+            if retry_policy is not None:
+                arguments["max_retries"] = 0
+
+            return client_class(**arguments)
+
+        return self.__get_or_create(key, factory, asynchronous)
+
+    def get_http_client(
+        self,
+        provider: str,
+        base_url: str | None = None,
+        asynchronous: bool = False,
+    ) -> tp.Any:
+        """Return a shared pooled httpx client for REST-only providers."""
+        key = (provider, "httpx", None, base_url, None, asynchronous, False)
+
+        return self.__get_or_create(
+            key, lambda: self.build_http_client(asynchronous), asynchronous
+        )
+
+    def get_boto3_client(
+        self, service: str, region: str = "us-east-1", retry_policy: tp.Any = None
+    ) -> tp.Any:
+        """
+        Return a shared boto3 client. boto3 clients are thread-safe. With a
+        `retry_policy`, botocore makes a single attempt per call.
+        """
+        import boto3
+        from botocore.config import Config
+
+        def factory():
+            config = Config(max_pool_connections=self.max_connections)
+
+            if retry_policy is not None:
+                config = config.merge(Config(retries={"total_max_attempts": 1}))
+
+            return boto3.client(service, region_name=region, config=config)
+
+        key = ("aws", service, None, None, region, False, retry_policy is not None)
+
+        return self.__get_or_create(key, factory)
+
+    def __drain(self) -> tuple:
+        with self._lock:
+            clients = list(self._clients.values())
+            loop_clients = [
+                (loop, list(scope.values()))
+                for loop, scope in self._loop_clients.items()
+            ]
+
+            self._clients = {}
+            self._loop_clients = weakref.WeakKeyDictionary()
+
+        return clients, loop_clients
+
+    def close(self) -> None:
+        """
+        Drop every cached client so the next call builds fresh ones. Only
+        sync clients are closed: use `aclose` to also close the async ones.
+        """
+        clients, _ = self.__drain()
+
+        for client in clients:
+            _close(client)
+
+    async def aclose(self) -> None:
+        """
+        Drop every cached client, closing the sync ones and awaiting the
+        close of the async SDK / httpx clients. Clients of an event loop
+        running in another thread are closed on that loop.
+        """
+        clients, loop_clients = self.__drain()
+        current = asyncio.get_running_loop()
+
+        for client in clients:
+            await _aclose(client)
+
+        for loop, scope in loop_clients:
+            for client in scope:
+                if loop is current or not loop.is_running():
+                    await _aclose(client)
+                else:
+                    future = asyncio.run_coroutine_threadsafe(_aclose(client), loop)
+                    await asyncio.wrap_future(future)
+
+
+registry = ClientRegistry()
+
+
+def configure_clients(**settings) -> None:
+    registry.configure(**settings)
+
+
+def get_client(provider: str, client_class: tp.Callable, **kwargs) -> tp.Any:
+    return registry.get_client(provider, client_class, **kwargs)
+
+
+def get_http_client(provider: str, **kwargs) -> tp.Any:
+    return registry.get_http_client(provider, **kwargs)
+
+
+def get_boto3_client(
+    service: str, region: str = "us-east-1", retry_policy: tp.Any = None
+) -> tp.Any:
+    return registry.get_boto3_client(service, region, retry_policy)
+
+
+def close_clients() -> tp.Any:
+    """
+    Close every shared client. Called from a running event loop, the close
+    is scheduled on it and the task is returned so it can be awaited.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(registry.aclose())
+
+    return loop.create_task(registry.aclose())
@@ -0,0 +1,39 @@
+import typing as tp
+
+
+def copy_message(message: tp.Any) -> tp.Any:
+    """
+    Copy of a message a provider may rewrite: a new dict with a new content
+    list. The parts themselves (text, base64 images, tool payloads) are
+    shared, not copied.
+    """
+    if not isinstance(message, dict):
+        return message
+
+    view = dict(message)
+
+    if isinstance(content := view.get("content"), list):
+        view["content"] = list(content)
+
+    return view
+
+
+def snapshot(messages: tp.Any) -> tp.Any:
+    """
+    View of a conversation to send to a provider.
+
+    Providers turn the Task prompt into their own format by replacing
+    messages, content lists and parts, never by changing a part in place.
+    So copying the list, the messages and their content lists is enough to
+    keep the Task prompt intact: the cost grows with the number of messages,
+    not with the size of the history (i.e. embedded images).
+    """
+    if not isinstance(messages, list):
+        return messages
+
+    return [copy_message(message) for message in messages]
+
+
+def snapshot_args(args: tuple) -> tuple:
+    """`call_api` arguments with every prompt list snapshotted."""
+    return tuple(snapshot(arg) for arg in args)
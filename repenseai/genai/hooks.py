@@ -0,0 +1,393 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
+
+import typing as tp
+
+from contextlib import contextmanager
+
+from repenseai.utils.logs import logger
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_hooks = []
+_hooks_lock = threading.Lock()
+
+_current = contextvars.ContextVar("repenseai_span", default=None)
+_ids = itertools.count(1)
+
+
+class Hook:
+    """
+    Base class of span hooks. Override `on_start` and / or `on_end`.
+
+    Hooks are registered globally with `add_hook`, or per object with the
+    `hooks` argument of Agent, Task, Workflow, ParallelTask and
+    ServerManager; the spans of a Task run inside a Workflow also go to the
+    Workflow hooks.
+    """
+
+    def on_start(self, span: "Span") -> None:
+        pass
+
+    def on_end(self, span: "Span") -> None:
+        pass
+
+
+class Span:
+    """
+    One timed operation: `name` (i.e. "api.call"), `attributes` (provider,
+    model, tokens, cost, ...), wall clock `start` / `end`, `duration` in
+    seconds, `error` and the ids linking it to its parent span.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        attributes: dict | None = None,
+        parent: "Span | None" = None,
+        hooks: tp.Sequence[tp.Any] = (),
+    ) -> None:
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.hooks = hooks
+
+        self.span_id = f"{os.getpid():x}-{next(_ids):x}"
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+
+        self.start = time.time()
+        self.end = None
+        self.duration = None
+        self.error = None
+
+        self._start = time.perf_counter()
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+        self.end = self.start + self.duration
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "trace_id": self.trace_id,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in when nobody listens: instrumentation costs a few attribute lookups."""
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def add_hook(hook: tp.Any) -> None:
+    """Register a hook for every span of the process."""
+    with _hooks_lock:
+        if hook not in _hooks:
+            _hooks.append(hook)
+
+
+def remove_hook(hook: tp.Any) -> None:
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def get_current_span() -> Span | None:
+    return _current.get()
+
+
+def _merge(*groups: tp.Sequence[tp.Any] | None) -> tuple:
+    merged = []
+
+    for group in groups:
+        for hook in group or ():
+            if not any(hook is other for other in merged):
+                merged.append(hook)
+
+    return tuple(merged)
+
+
+def _emit(hooks: tp.Sequence[tp.Any], method: str, span: Span) -> None:
+    for hook in hooks:
+        try:
+            if hasattr(hook, method):
+                getattr(hook, method)(span)
+            elif method == "on_end" and callable(hook):
+                # Plain callables get finished spans
+                hook(span)
+        except Exception as e:
+            logger(f"Error in span hook {hook}: {e}")
+
+
+@contextmanager
+def span(name: str, hooks: tp.Sequence[tp.Any] | None = None, **attributes):
+    """
+    Time the enclosed block as a span, child of the current span.
+
+    The span goes to the global hooks, the hooks of its parent spans and
+    `hooks`. Without any hook nothing is recorded.
+
+    Example:
+        with span("api.call", provider="openai") as current:
+            ...
+            current.set(cost=0.01)
+    """
+    parent = _current.get()
+
+    active = _merge(_hooks, parent.hooks if parent else None, hooks)
+
+    if not active:
+        yield NOOP_SPAN
+        return
+
+    current = Span(name, attributes, parent, active)
+    token = _current.set(current)
+
+    _emit(active, "on_start", current)
+
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current.reset(token)
+
+        _emit(active, "on_end", current)
+
+
+def span_tokens(tokens: tp.Any) -> dict:
+    """Span attributes of a token usage dict."""
+    if not isinstance(tokens, dict):
+        return {}
+
+    return {
+        key: tokens[key]
+        for key in (
+            "prompt_tokens",
+            "completion_tokens",
+            "total_tokens",
+            "cached_tokens",
+        )
+        if isinstance(tokens.get(key), (int, float))
+    }
+
+
+class InMemoryCollector(Hook):
+    """Keeps finished spans in a list, for tests and notebooks."""
+
+    def __init__(self) -> None:
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def get_spans(self, name: str | None = None) -> tp.List[Span]:
+        with self._lock:
+            return [s for s in self.spans if name is None or s.name == name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+def _labels(values: dict) -> str:
+    if not values:
+        return ""
+
+    parts = []
+
+    for key, value in values.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+        parts.append(f'{key}="{value}"')
+
+    return "{" + ",".join(parts) + "}"
+
+
+class PrometheusExporter(Hook):
+    """
+    Aggregates finished spans into Prometheus metrics, rendered in the text
+    exposition format by `render()` (serve it on a /metrics endpoint):
+
+    - repenseai_span_duration_seconds: histogram by span name, provider, model
+    - repenseai_span_errors_total: failed spans
+    - repenseai_tokens_total: prompt / completion / cached tokens of API calls
+    - repenseai_cost_dollars_total: cost of API calls
+    """
+
+    def __init__(self, buckets: tp.Sequence[float] = DURATION_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+
+        self.durations = {}
+        self.errors = {}
+        self.tokens = {}
+        self.cost = {}
+
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        attributes = span.attributes
+
+        key = (
+            span.name,
+            attributes.get("provider", ""),
+            attributes.get("model", ""),
+        )
+
+        with self._lock:
+            if key not in self.durations:
+                self.durations[key] = [[0] * len(self.buckets), 0, 0.0]
+
+            histogram = self.durations[key]
+
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    histogram[0][i] += 1
+
+            histogram[1] += 1
+            histogram[2] += span.duration
+
+            if span.error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+            # Tasks repeat the totals of their API calls: count these only once
+            if span.name != "api.call":
+                return
+
+            for kind in ("prompt", "completion", "cached"):
+                if value := attributes.get(f"{kind}_tokens"):
+                    token_key = key[1:] + (kind,)
+                    self.tokens[token_key] = self.tokens.get(token_key, 0) + value
+
+            if cost := attributes.get("cost"):
+                self.cost[key[1:]] = self.cost.get(key[1:], 0.0) + cost
+
+    def render(self) -> str:
+        lines = [
+            "# HELP repenseai_span_duration_seconds Duration of repenseai spans",
+            "# TYPE repenseai_span_duration_seconds histogram",
+        ]
+
+        with self._lock:
+            for (name, provider, model), histogram in sorted(self.durations.items()):
+                labels = {"span": name, "provider": provider, "model": model}
+
+                for bound, count in zip(self.buckets, histogram[0]):
+                    bucket = _labels({**labels, "le": bound})
+                    lines.append(
+                        f"repenseai_span_duration_seconds_bucket{bucket} {count}"
+                    )
+
+                bucket = _labels({**labels, "le": "+Inf"})
+                lines.append(
+                    f"repenseai_span_duration_seconds_bucket{bucket} {histogram[1]}"
+                )
+                lines.append(
+                    f"repenseai_span_duration_seconds_count{_labels(labels)} {histogram[1]}"
+                )
+                lines.append(
+                    f"repenseai_span_duration_seconds_sum{_labels(labels)} {histogram[2]}"
+                )
+
+            lines += [
+                "# HELP repenseai_span_errors_total Failed repenseai spans",
+                "# TYPE repenseai_span_errors_total counter",
+            ]
+
+            for (name, provider, model), count in sorted(self.errors.items()):
+                labels = {"span": name, "provider": provider, "model": model}
+                lines.append(f"repenseai_span_errors_total{_labels(labels)} {count}")
+
+            lines += [
+                "# HELP repenseai_tokens_total Tokens used by API calls",
+                "# TYPE repenseai_tokens_total counter",
+            ]
+
+            for (provider, model, kind), count in sorted(self.tokens.items()):
+                labels = {"provider": provider, "model": model, "type": kind}
+                lines.append(f"repenseai_tokens_total{_labels(labels)} {count}")
+
+            lines += [
+                "# HELP repenseai_cost_dollars_total Cost of API calls in dollars",
+                "# TYPE repenseai_cost_dollars_total counter",
+            ]
+
+            for (provider, model), cost in sorted(self.cost.items()):
+                labels = {"provider": provider, "model": model}
+                lines.append(f"repenseai_cost_dollars_total{_labels(labels)} {cost}")
+
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryExporter(Hook):
+    """
+    Mirrors spans as OpenTelemetry spans, keeping their parent / child
+    structure. Needs the optional `opentelemetry-api` package; configure the
+    SDK (provider, exporter) as usual.
+    """
+
+    def __init__(self, tracer: tp.Any = None) -> None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError(
+                "OpenTelemetryExporter needs opentelemetry: "
+                "pip install opentelemetry-api opentelemetry-sdk"
+            )
+
+        self.trace = trace
+        self.tracer = tracer or trace.get_tracer("repenseai")
+
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        with self._lock:
+            parent = self.spans.get(span.parent_id)
+
+        context = self.trace.set_span_in_context(parent) if parent else None
+
+        otel_span = self.tracer.start_span(
+            span.name, context=context, start_time=int(span.start * 1e9)
+        )
+
+        with self._lock:
+            self.spans[span.span_id] = otel_span
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            otel_span = self.spans.pop(span.span_id, None)
+
+        if otel_span is None:
+            return
+
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(f"repenseai.{key}", value)
+
+        if span.error:
+            otel_span.set_status(self.trace.Status(self.trace.StatusCode.ERROR))
+            otel_span.set_attribute("error.message", span.error)
+
+        otel_span.end(end_time=int(span.end * 1e9))
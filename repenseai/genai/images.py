@@ -0,0 +1,228 @@
+import asyncio
+import base64
+import hashlib
+import threading
+
+import typing as tp
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from repenseai.genai.clients import get_http_client
+
+
+class ImageCache:
+    """
+    Content-addressed LRU cache of downloaded images.
+
+    Urls point to a sha256 digest of the downloaded bytes, and each distinct
+    image is stored (and base64 encoded) once, however many urls or
+    conversation turns reference it. Eviction is least recently used, bounded
+    both by number of images and by total size in bytes.
+
+    By default a cached url is trusted for the lifetime of the entry. With
+    `revalidate=True` every use sends a conditional request (`If-None-Match`
+    with the stored ETag), so changed images are picked up while unchanged
+    ones still skip the download.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        max_bytes: int = 256 * 1024 * 1024,
+        revalidate: bool = False,
+    ) -> None:
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.revalidate = revalidate
+
+        self.urls = {}
+        self.images = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> dict | None:
+        """The cached entry of an url ({"content", "etag", ...}) or None."""
+        with self._lock:
+            digest = self.urls.get(url)
+
+            if digest is None or digest not in self.images:
+                self.urls.pop(url, None)
+                return None
+
+            self.images.move_to_end(digest)
+            return self.images[digest]
+
+    def set(self, url: str, content: bytes, etag: str | None = None) -> dict:
+        digest = hashlib.sha256(content).hexdigest()
+
+        with self._lock:
+            entry = self.images.get(digest)
+
+            if entry is None:
+                entry = {"digest": digest, "content": content, "base64": None}
+                self.images[digest] = entry
+                self.size += len(content)
+
+            entry["etag"] = etag or entry.get("etag")
+
+            self.images.move_to_end(digest)
+            self.urls[url] = digest
+
+            self.__evict()
+
+        return entry
+
+    def __evict(self) -> None:
+        while self.images and (
+            len(self.images) > self.maxsize or self.size > self.max_bytes
+        ):
+            _, entry = self.images.popitem(last=False)
+            self.size -= len(entry["content"])
+
+        if len(self.urls) > 4 * self.maxsize:
+            self.urls = {k: v for k, v in self.urls.items() if v in self.images}
+
+    def encode(self, entry: dict) -> str:
+        """Base64 of a cached image, encoded on first use only."""
+        if entry["base64"] is None:
+            entry["base64"] = base64.standard_b64encode(entry["content"]).decode(
+                "utf-8"
+            )
+
+        return entry["base64"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.urls = {}
+            self.images = OrderedDict()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "images": len(self.images),
+            "urls": len(self.urls),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+image_cache = ImageCache()
+
+
+def _conditional_headers(entry: dict | None, cache: ImageCache) -> dict:
+    if entry is not None and cache.revalidate and entry.get("etag"):
+        return {"If-None-Match": entry["etag"]}
+
+    return {}
+
+
+def _settle(url: str, response: tp.Any, entry: dict | None, cache: ImageCache):
+    if response.status_code == 304 and entry is not None:
+        cache.hits += 1
+        return entry
+
+    response.raise_for_status()
+    cache.misses += 1
+
+    return cache.set(url, response.content, response.headers.get("etag"))
+
+
+def fetch_image_entry(url: str, cache: ImageCache | None = None) -> dict:
+    """Download an image through the cache and the shared http client."""
+    cache = cache or image_cache
+    entry = cache.get(url)
+
+    if entry is not None and not cache.revalidate:
+        cache.hits += 1
+        return entry
+
+    client = get_http_client("images")
+    response = client.get(url, headers=_conditional_headers(entry, cache))
+
+    return _settle(url, response, entry, cache)
+
+
+async def afetch_image_entry(url: str, cache: ImageCache | None = None) -> dict:
+    """Async version of `fetch_image_entry`."""
+    cache = cache or image_cache
+    entry = cache.get(url)
+
+    if entry is not None and not cache.revalidate:
+        cache.hits += 1
+        return entry
+
+    client = get_http_client("images", asynchronous=True)
+    response = await client.get(url, headers=_conditional_headers(entry, cache))
+
+    return _settle(url, response, entry, cache)
+
+
+def fetch_image(url: str, cache: ImageCache | None = None) -> bytes:
+    return fetch_image_entry(url, cache)["content"]
+
+
+def fetch_image_base64(url: str, cache: ImageCache | None = None) -> str:
+    cache = cache or image_cache
+    return cache.encode(fetch_image_entry(url, cache))
+
+
+async def afetch_image(url: str, cache: ImageCache | None = None) -> bytes:
+    return (await afetch_image_entry(url, cache))["content"]
+
+
+async def afetch_image_base64(url: str, cache: ImageCache | None = None) -> str:
+    cache = cache or image_cache
+    return cache.encode(await afetch_image_entry(url, cache))
+
+
+def get_image_urls(prompt: list) -> list:
+    """Distinct `image_url` urls of a list of messages, in order."""
+    urls = []
+
+    for message in prompt:
+        content = message.get("content") if isinstance(message, dict) else None
+
+        if not isinstance(content, list):
+            continue
+
+        for part in content:
+            if not isinstance(part, dict):
+                continue
+
+            url = (part.get("image_url") or {}).get("url")
+
+            if url and url not in urls:
+                urls.append(url)
+
+    return urls
+
+
+def prefetch_images(
+    urls: tp.List[str], cache: ImageCache | None = None, max_workers: int = 8
+) -> dict:
+    """Download the images concurrently. Returns {url: cache entry}."""
+    urls = list(dict.fromkeys(urls))
+
+    if len(urls) <= 1:
+        return {url: fetch_image_entry(url, cache) for url in urls}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        entries = executor.map(lambda url: fetch_image_entry(url, cache), urls)
+        return dict(zip(urls, entries))
+
+
+async def aprefetch_images(urls: tp.List[str], cache: ImageCache | None = None) -> dict:
+    """Async version of `prefetch_images`, with one task per image."""
+    urls = list(dict.fromkeys(urls))
+
+    entries = await asyncio.gather(*[afetch_image_entry(url, cache) for url in urls])
+
+    return dict(zip(urls, entries))
@@ -1,21 +1,114 @@
 from typing import Optional, Dict, Any, List
 import asyncio
+import concurrent.futures
 import logging
-from contextlib import AsyncExitStack
+import time
+from datetime import timedelta
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
 from mcp.types import Tool
 
+from repenseai.genai.hooks import span
+
+
+TRANSPORTS = ("stdio", "sse", "streamable_http")
+
+
+@asynccontextmanager
+async def streamable_http_client(url: str, headers: dict | None, timeout: float):
+    try:
+        from mcp.client.streamable_http import streamablehttp_client
+    except ImportError:
+        raise ImportError(
+            "The streamable HTTP transport requires a newer mcp package: "
+            "pip install -U mcp"
+        )
+
+    async with streamablehttp_client(
+        url, headers=headers, timeout=timedelta(seconds=timeout)
+    ) as (
+        read,
+        write,
+        _,
+    ):
+        yield read, write
+
 
 class Server:
+    """
+    An MCP server, either a local process reached over stdio (`command` and
+    `args`) or a remote service reached over HTTP (`url`).
+
+    Remote servers use the SSE transport when the url ends with `/sse` and
+    streamable HTTP otherwise; `transport` overrides the guess. Each session
+    keeps one HTTP client (and its keep-alive connections) open, so a remote
+    server used through a `ServerPool` is shared by every task without
+    reconnecting.
+
+    With `workers > 1` the server is connected `workers` times, each with its
+    own session (and process, for stdio), and every tool call is routed to
+    the least busy one, so slow tools (database lookups, ...) run in parallel
+    instead of queueing behind a single session. Use `metrics()` to watch the
+    queues.
+
+    When the server dies during a call, a `ServerPool` restarts it and raises,
+    since the tool may already have run. Set `retry_on_crash=True` for
+    servers whose tools are idempotent to run the call again instead.
+    """
+
     def __init__(
-        self, name: str, command: str, args: List[str], env: str | None = None
+        self,
+        name: str,
+        command: str | None = None,
+        args: List[str] | None = None,
+        env: str | None = None,
+        workers: int = 1,
+        url: str | None = None,
+        transport: str | None = None,
+        headers: Dict[str, str] | None = None,
+        timeout: float = 5.0,
+        sse_read_timeout: float = 300.0,
+        retry_on_crash: bool = False,
     ):
+        if workers < 1:
+            raise ValueError("An MCP server needs at least one worker")
+
+        if transport is None:
+            if url is None:
+                transport = "stdio"
+            elif url.rstrip("/").endswith("/sse"):
+                transport = "sse"
+            else:
+                transport = "streamable_http"
+
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown MCP transport: {transport}")
+
+        if transport == "stdio" and command is None:
+            raise ValueError("A stdio MCP server needs a command")
+
+        if transport != "stdio" and url is None:
+            raise ValueError(f"A {transport} MCP server needs an url")
+
         self.name = name
-        self.server_params = StdioServerParameters(
-            command=command,
-            args=args,
-            env=env,
+        self.workers = workers
+        self.transport = transport
+        self.url = url
+        self.headers = headers
+        self.timeout = timeout
+        self.sse_read_timeout = sse_read_timeout
+        self.retry_on_crash = retry_on_crash
+        self.connections: List["PooledConnection"] = []
+        self.server_params = (
+            StdioServerParameters(
+                command=command,
+                args=args or [],
+                env=env,
+            )
+            if transport == "stdio"
+            else None
         )
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
@@ -25,13 +118,31 @@ class Server:
         self.write = None
         self.is_connected = False
 
+    def get_transport(self):
+        """Async context manager that yields the (read, write) streams."""
+        match self.transport:
+            case "sse":
+                return sse_client(
+                    self.url,
+                    headers=self.headers,
+                    timeout=self.timeout,
+                    sse_read_timeout=self.sse_read_timeout,
+                )
+            case "streamable_http":
+                return streamable_http_client(self.url, self.headers, self.timeout)
+            case _:
+                return stdio_client(self.server_params)
+
     async def connect(self):
         if self.is_connected:
             return
 
+        if self.workers > 1:
+            return await self.__connect_workers()
+
         try:
             stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(self.server_params)
+                self.get_transport()
             )
 
             self.stdio, self.write = stdio_transport
@@ -48,6 +159,31 @@ class Server:
             await self.cleanup()
             raise
 
+    async def __connect_workers(self):
+        self.connections = [PooledConnection(self) for _ in range(self.workers)]
+
+        results = await asyncio.gather(
+            *[connection.start() for connection in self.connections],
+            return_exceptions=True,
+        )
+
+        if errors := [result for result in results if isinstance(result, Exception)]:
+            logging.error(f"Error connecting to server {self.name}: {str(errors[0])}")
+            await self.__stop_workers()
+            raise errors[0]
+
+        self.session = self.connections[0].session
+        self.is_connected = True
+
+    async def __stop_workers(self):
+        await asyncio.gather(
+            *[connection.stop() for connection in self.connections],
+            return_exceptions=True,
+        )
+
+        self.connections = []
+        self.session = None
+
     async def list_tools(self):
         if not self.is_connected:
             await self.connect()
@@ -61,12 +197,33 @@ class Server:
     async def call_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
         if not self.is_connected:
             await self.connect()
-        return await self.session.call_tool(tool_name, tool_args)
+
+        if not self.connections:
+            return await self.session.call_tool(tool_name, tool_args)
+
+        alive = [connection for connection in self.connections if connection.is_alive]
+
+        if not alive:
+            raise ConnectionError(f"No worker of server {self.name} is running")
+
+        connection = least_busy(alive)
+
+        with connection.track():
+            return await connection.session.call_tool(tool_name, tool_args)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and call statistics of the worker sessions."""
+        return worker_metrics(self.connections)
 
     async def cleanup(self):
         if not self.is_connected:
             return
 
+        if self.connections:
+            await self.__stop_workers()
+            self.is_connected = False
+            return
+
         # Simplesmente limpe usando o loop atual
         try:
             await self.exit_stack.aclose()
@@ -78,8 +235,9 @@ class Server:
 
 
 class ServerManager:
-    def __init__(self, servers: List[Server] = None):
+    def __init__(self, servers: List[Server] = None, hooks: list | None = None):
         self.servers = servers or []
+        self.hooks = hooks
         self.tool_to_server_map = {}
         self.all_tools = []
         self.all_tools_list = []
@@ -145,7 +303,13 @@ class ServerManager:
             raise ValueError(f"Tool '{tool_name}' not found in any server")
 
         server = self.tool_to_server_map[tool_name]
-        return await server.call_tool(tool_name, args)
+
+        with span("mcp.call", self.hooks, server=server.name, tool=tool_name):
+            return await server.call_tool(tool_name, args)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Worker metrics of every server, by server name."""
+        return {server.name: server.metrics() for server in self.servers}
 
     async def cleanup(self):
         """Clean up all server connections."""
@@ -156,3 +320,426 @@ class ServerManager:
 
         if cleanup_tasks:
             await asyncio.gather(*cleanup_tasks, return_exceptions=True)
+
+
+class PooledConnection:
+    """
+    A warm connection to one MCP server, owned by a dedicated asyncio task.
+
+    The stdio transport and the ClientSession are entered and exited by the
+    same background task (anyio cancel scopes can not be exited from another
+    task), while any task can use `session` concurrently.
+    """
+
+    def __init__(self, server: Server):
+        self.server = server
+        self.session: Optional[ClientSession] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stop_event: Optional[asyncio.Event] = None
+        self.lock = asyncio.Lock()
+        self.last_seen = 0.0
+        self.restarts = 0
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.busy_time = 0.0
+
+    @property
+    def is_alive(self) -> bool:
+        return (
+            self.session is not None and self.task is not None and not self.task.done()
+        )
+
+    @contextmanager
+    def track(self):
+        """Count a call as in flight on this connection while it runs."""
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        start = time.monotonic()
+
+        try:
+            yield self
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.calls += 1
+            self.busy_time += time.monotonic() - start
+            self.last_seen = time.monotonic()
+
+    async def __run(self, ready: asyncio.Future):
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(
+                    self.server.get_transport()
+                )
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+
+                self.session = session
+                self.last_seen = time.monotonic()
+                ready.set_result(session)
+
+                await self.stop_event.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logging.error(f"MCP server {self.server.name} stopped: {str(e)}")
+        finally:
+            self.session = None
+
+    async def start(self):
+        ready = asyncio.get_running_loop().create_future()
+        self.stop_event = asyncio.Event()
+        self.task = asyncio.create_task(
+            self.__run(ready), name=f"mcp-server-{self.server.name}"
+        )
+
+        await ready
+
+    async def stop(self):
+        if self.task is None:
+            return
+
+        self.stop_event.set()
+
+        # The owner task exits the transport itself; cancel it if it hangs
+        done, _ = await asyncio.wait({self.task}, timeout=5.0)
+
+        if not done:
+            self.task.cancel()
+
+        self.task = None
+        self.session = None
+
+    async def ping(self, timeout: float) -> bool:
+        if not self.is_alive:
+            return False
+
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            self.last_seen = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+
+def least_busy(connections: List[PooledConnection]) -> PooledConnection:
+    """
+    The connection with the fewest calls in flight.
+
+    Running connections win ties, so a new worker is only spawned when every
+    running one is busy; the first connection wins the remaining ties.
+    """
+    return min(
+        connections,
+        key=lambda connection: (connection.in_flight, not connection.is_alive),
+    )
+
+
+def worker_metrics(connections: List[PooledConnection]) -> Dict[str, Any]:
+    calls = sum(connection.calls for connection in connections)
+    busy_time = sum(connection.busy_time for connection in connections)
+
+    return {
+        "workers": len(connections),
+        "alive": sum(connection.is_alive for connection in connections),
+        "in_flight": [connection.in_flight for connection in connections],
+        "queue_depth": sum(connection.in_flight for connection in connections),
+        "peak_queue_depth": max(
+            (connection.peak_in_flight for connection in connections), default=0
+        ),
+        "calls": calls,
+        "errors": sum(connection.errors for connection in connections),
+        "mean_latency": busy_time / calls if calls else 0.0,
+    }
+
+
+class ServerPool(ServerManager):
+    """
+    Long-lived pool of MCP servers shared by many AsyncAgents / AsyncTasks.
+
+    - Servers are started lazily, on the first tool listing or call, and stay
+      warm until `stop()` is called: AsyncTask does not clean up a pool.
+    - A server idle for more than `health_check_interval` seconds is pinged
+      before being used; a dead server is restarted (up to `max_restarts`
+      consecutive failures) and its tool catalogue is refreshed.
+    - A server dying during a call is restarted and the call raises a
+      ConnectionError, unless the server has `retry_on_crash=True`.
+    - The tool catalogue is cached, `invalidate_tools()` forces a refresh.
+    - Servers with `workers > 1` get up to that many sessions: calls go to
+      the least busy one and extra workers are only spawned under load.
+
+    Example:
+        pool = ServerPool([Server(name="bmi", command="python", args=[...])])
+
+        agent = AsyncAgent(model="gpt-4o", model_type="chat", server=pool)
+        ...
+        await pool.stop()
+    """
+
+    persistent = True
+
+    def __init__(
+        self,
+        servers: List[Server] = None,
+        health_check_interval: float = 30.0,
+        health_check_timeout: float = 5.0,
+        max_restarts: int = 3,
+        hooks: list | None = None,
+    ):
+        super().__init__(servers, hooks)
+
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.max_restarts = max_restarts
+
+        self.connections: Dict[str, List[PooledConnection]] = {}
+        self.loop = None
+
+    def __check_loop(self):
+        loop = asyncio.get_running_loop()
+
+        if loop is not self.loop:
+            # Connections belong to the loop that created them
+            self.__release()
+            self.loop = loop
+
+    def __release(self) -> Optional[concurrent.futures.Future]:
+        """
+        Detach the connections of the previous loop and stop them on it: the
+        stop is scheduled there when it runs in another thread, and driven
+        from a helper thread when it is suspended. A loop closed by
+        asyncio.run has already cancelled them, which closed their transports.
+        """
+        connections = [c for workers in self.connections.values() for c in workers]
+        loop = self.loop
+
+        self.connections = {}
+        self.initialized = False
+
+        started = [c for c in connections if c.task is not None]
+
+        if not started or loop is None:
+            return None
+
+        if loop.is_closed():
+            if any(not c.task.done() for c in started):
+                logging.warning("MCP servers of a closed event loop were left running")
+
+            return None
+
+        stop = self.__stop_workers(started)
+
+        if loop.is_running():
+            return asyncio.run_coroutine_threadsafe(stop, loop)
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(loop.run_until_complete, stop)
+        executor.shutdown(wait=False)
+
+        return future
+
+    def __get_workers(self, server: Server) -> List[PooledConnection]:
+        self.__check_loop()
+
+        if server.name not in self.connections:
+            self.connections[server.name] = [
+                PooledConnection(server) for _ in range(server.workers)
+            ]
+
+        return self.connections[server.name]
+
+    def invalidate_tools(self):
+        """Drop the cached tool catalogue, so it is listed again on next use."""
+        self.initialized = False
+
+    async def __ensure(self, connection: PooledConnection) -> ClientSession:
+        server = connection.server
+
+        async with connection.lock:
+            idle = time.monotonic() - connection.last_seen
+
+            if connection.is_alive and idle < self.health_check_interval:
+                return connection.session
+
+            if await connection.ping(self.health_check_timeout):
+                return connection.session
+
+            if connection.task is not None:
+                logging.warning(f"MCP server {server.name} is unhealthy, restarting")
+                await connection.stop()
+                self.initialized = False
+
+            while True:
+                try:
+                    await connection.start()
+                    connection.restarts = 0
+                    return connection.session
+                except Exception as e:
+                    connection.restarts += 1
+
+                    if connection.restarts >= self.max_restarts:
+                        connection.restarts = 0
+                        raise ConnectionError(
+                            f"Could not start MCP server {server.name}: {str(e)}"
+                        )
+
+    async def get_session(self, server: Server) -> ClientSession:
+        """Return a healthy session of the server, starting it if needed."""
+        return await self.__ensure(least_busy(self.__get_workers(server)))
+
+    async def initialize(self):
+        """Start the servers (lazily) and cache their tool catalogue."""
+        self.__check_loop()
+
+        if self.initialized:
+            return
+
+        async def list_tools(server: Server):
+            session = await self.get_session(server)
+            return (await session.list_tools()).tools
+
+        results = await asyncio.gather(
+            *[list_tools(server) for server in self.servers], return_exceptions=True
+        )
+
+        tool_to_server_map = {}
+        all_tools = []
+
+        for server, tools in zip(self.servers, results):
+            if isinstance(tools, Exception):
+                logging.error(f"Failed to list tools of {server.name}: {str(tools)}")
+                continue
+
+            server.tools = tools
+            server.tools_list = [tool.name for tool in tools]
+
+            for tool in tools:
+                all_tools.append(tool)
+                tool_to_server_map[tool.name] = server
+
+        self.tool_to_server_map = tool_to_server_map
+        self.all_tools = all_tools
+        self.all_tools_list = [tool.name for tool in all_tools]
+        self.initialized = True
+
+    async def start(self):
+        """Eagerly start every server and list their tools."""
+        self.invalidate_tools()
+        await self.initialize()
+
+    async def __call_worker(
+        self, server: Server, tool_name: str, args: Dict[str, Any]
+    ) -> Any:
+        # Picked and counted before any await, so concurrent calls spread out
+        connection = least_busy(self.__get_workers(server))
+
+        with connection.track():
+            session = await self.__ensure(connection)
+
+            try:
+                return await session.call_tool(tool_name, args)
+            except Exception as e:
+                if connection.is_alive:
+                    raise
+
+                # The server died during the call: restart it for the next ones
+                session = await self.__ensure(connection)
+
+                # The tool may have run already: only idempotent ones run again
+                if not server.retry_on_crash:
+                    raise ConnectionError(
+                        f"MCP server {server.name} died during a call to {tool_name}"
+                    ) from e
+
+                return await session.call_tool(tool_name, args)
+
+    async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        """Call a tool on a warm server, restarting it if it crashed."""
+        if not self.initialized:
+            await self.initialize()
+
+        if tool_name not in self.tool_to_server_map:
+            raise ValueError(f"Tool '{tool_name}' not found in any server")
+
+        server = self.tool_to_server_map[tool_name]
+
+        with span("mcp.call", self.hooks, server=server.name, tool=tool_name):
+            return await self.__call_worker(server, tool_name, args)
+
+    async def health_check(self) -> Dict[str, bool]:
+        """Ping every started server. Returns {server name: healthy}."""
+        self.__check_loop()
+
+        async def check(connections: List[PooledConnection]) -> bool:
+            started = [c for c in connections if c.task is not None]
+            results = await asyncio.gather(
+                *[c.ping(self.health_check_timeout) for c in started]
+            )
+            return bool(results) and all(results)
+
+        names = list(self.connections)
+        results = await asyncio.gather(
+            *[check(self.connections[name]) for name in names]
+        )
+
+        return dict(zip(names, results))
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Worker metrics of every server of the pool, by server name."""
+        return {
+            server.name: worker_metrics(self.connections.get(server.name, []))
+            for server in self.servers
+        }
+
+    async def __stop_workers(self, connections: List[PooledConnection]):
+        async def stop(connection: PooledConnection):
+            async with connection.lock:
+                await connection.stop()
+
+        await asyncio.gather(
+            *[stop(connection) for connection in connections], return_exceptions=True
+        )
+
+    async def restart(self, name: str):
+        """Restart one server and refresh the tool catalogue."""
+        server = next((s for s in self.servers if s.name == name), None)
+
+        if server is None:
+            raise ValueError(f"Server '{name}' not found in the pool")
+
+        await self.__stop_workers(self.__get_workers(server))
+
+        self.invalidate_tools()
+        await self.get_session(server)
+
+    async def stop(self):
+        """Stop every server of the pool, from any event loop."""
+        if self.loop is not asyncio.get_running_loop():
+            if (future := self.__release()) is not None:
+                await asyncio.wrap_future(future)
+
+            return
+
+        await self.__stop_workers(
+            [c for connections in self.connections.values() for c in connections]
+        )
+
+        self.connections = {}
+        self.initialized = False
+
+    async def cleanup(self):
+        """Same as stop(), for code written against ServerManager."""
+        await self.stop()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import threading
+
+from copy import copy
+
+import typing as tp
+
+from concurrent.futures import ThreadPoolExecutor
+
+from repenseai.genai.tokens import is_system_message, is_tool_result, trim_messages
+from repenseai.utils.logs import logger
+
+
+SUMMARY_WORKERS = 4
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for the assistant that will continue it. "
+    "Keep every fact, decision, name, number and open question; drop "
+    "pleasantries. Answer with the summary only.\n\n{conversation}"
+)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n\n"
+SUMMARY_ACK = "Understood, I will continue from this summary."
+
+_summary_executor = None
+_summary_executor_lock = threading.Lock()
+
+
+def get_summary_executor() -> ThreadPoolExecutor:
+    """Shared pool summarizing conversations in the background."""
+    global _summary_executor
+
+    with _summary_executor_lock:
+        if _summary_executor is None:
+            _summary_executor = ThreadPoolExecutor(
+                max_workers=SUMMARY_WORKERS, thread_name_prefix="repenseai-summary"
+            )
+
+    return _summary_executor
+
+
+def starts_turn(message: tp.Any) -> bool:
+    """A user message that is not a tool result opens a new turn."""
+    return (
+        isinstance(message, dict)
+        and message.get("role") == "user"
+        and not is_tool_result(message)
+    )
+
+
+def split_turns(messages: list) -> tp.Tuple[list, tp.List[list]]:
+    """
+    Leading system messages, and the rest of the conversation split in turns:
+    a user message followed by the assistant answers, tool calls and tool
+    results up to the next user message.
+    """
+    system = 0
+
+    while system < len(messages) and is_system_message(messages[system]):
+        system += 1
+
+    turns = []
+
+    for message in messages[system:]:
+        if not turns or starts_turn(message):
+            turns.append([])
+
+        turns[-1].append(message)
+
+    return messages[:system], turns
+
+
+class BaseMemory:
+    """
+    Memory policy of a Task: `compact` gets the prompt after each run and
+    returns what to keep for the next one.
+    """
+
+    def compact(self, prompt: list, agent: tp.Any = None) -> list:
+        return prompt
+
+    async def acompact(self, prompt: list, agent: tp.Any = None) -> list:
+        return self.compact(prompt, agent)
+
+    def clone(self) -> "BaseMemory":
+        """Same policy for another conversation (i.e. a cloned Task)."""
+        return copy(self)
+
+
+class WindowMemory(BaseMemory):
+    """Keeps the system messages and the last `max_turns` turns."""
+
+    def __init__(self, max_turns: int = 10) -> None:
+        if max_turns < 1:
+            raise ValueError("max_turns must be at least 1")
+
+        self.max_turns = max_turns
+
+    def compact(self, prompt: list, agent: tp.Any = None) -> list:
+        system, turns = split_turns(prompt)
+        keep = self.max_turns
+
+        if len(turns) <= keep:
+            return prompt
+
+        return system + [m for turn in turns[-keep:] for m in turn]
+
+
+class TokenWindowMemory(BaseMemory):
+    """
+    Keeps the system messages and the most recent turns that fit in
+    `max_tokens`, counted for the Task agent model.
+    """
+
+    def __init__(self, max_tokens: int) -> None:
+        self.max_tokens = max_tokens
+
+    def compact(self, prompt: list, agent: tp.Any = None) -> list:
+        provider = getattr(agent, "provider", None)
+        model = getattr(agent, "model", None)
+
+        return trim_messages(prompt, self.max_tokens, provider, model)
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content")
+
+    if isinstance(content, str):
+        parts = [content]
+    else:
+        parts = []
+
+        for part in content or []:
+            if not isinstance(part, dict):
+                parts.append(str(part))
+            elif part.get("type") == "text":
+                parts.append(part.get("text") or "")
+            elif part.get("type") == "tool_use":
+                parts.append(
+                    f"[tool call {part.get('name')}({json.dumps(part.get('input'))})]"
+                )
+            elif part.get("type") == "tool_result":
+                parts.append(f"[tool result: {part.get('content')}]")
+            elif part.get("type") in ("image", "image_url"):
+                parts.append("[image]")
+
+    for call in message.get("tool_calls") or []:
+        function = call.get("function") or {}
+        parts.append(f"[tool call {function.get('name')}({function.get('arguments')})]")
+
+    if message.get("role") == "tool":
+        return f"tool result: {' '.join(parts)}"
+
+    return f"{message.get('role')}: {' '.join(parts)}"
+
+
+def format_conversation(messages: list) -> str:
+    """Plain text transcript of messages, to be summarized."""
+    return "\n\n".join(
+        _message_text(message) for message in messages if isinstance(message, dict)
+    )
+
+
+class SummaryMemory(BaseMemory):
+    """
+    Keeps the last `keep_turns` turns verbatim and replaces the older ones
+    with a summary written by `agent` (a cheap model, i.e. gpt-4o-mini).
+
+    Summarization starts once the conversation has more than
+    `summarize_after` turns. With `background=True` it runs in a worker
+    thread and the summary is swapped in at the first run after it is
+    ready, so no turn waits for it. Previous summaries are summarized again
+    with the turns that follow them, keeping a single rolling summary.
+
+    Example:
+        summarizer = Agent(model="gpt-4o-mini", model_type="chat")
+        task = Task(agent=agent, memory=SummaryMemory(summarizer))
+    """
+
+    def __init__(
+        self,
+        agent: tp.Any,
+        keep_turns: int = 4,
+        summarize_after: int = 8,
+        background: bool = True,
+        prompt: str = SUMMARY_PROMPT,
+    ) -> None:
+        if summarize_after < keep_turns:
+            raise ValueError("summarize_after must be at least keep_turns")
+
+        self.agent = agent
+        self.keep_turns = keep_turns
+        self.summarize_after = summarize_after
+        self.background = background
+        self.prompt = prompt
+
+        self.summary = None
+        self._job = None
+        self._lock = threading.Lock()
+
+    def clone(self) -> "SummaryMemory":
+        memory = copy(self)
+
+        memory.summary = None
+        memory._job = None
+        memory._lock = threading.Lock()
+
+        return memory
+
+    def summarize(self, messages: list) -> str:
+        """Summary of `messages`, written by the summarizer agent."""
+        # Imported here: tasks.api imports this module
+        from repenseai.genai.tasks.api import Task
+
+        task = Task(user=self.prompt, agent=self.agent, simple_response=True)
+
+        return task.run({"conversation": format_conversation(messages)})
+
+    def __summarize(self, messages: list) -> tuple:
+        return messages, self.summarize(messages)
+
+    def __apply(self, prompt: list, messages: list, summary: str) -> list:
+        """Replace `messages`, when still at the start of the conversation."""
+        system, turns = split_turns(prompt)
+        conversation = [m for turn in turns for m in turn]
+
+        count = len(messages)
+
+        if len(conversation) < count or any(
+            a is not b for a, b in zip(conversation, messages)
+        ):
+            # The prompt changed meanwhile (i.e. trimmed): drop the summary
+            return prompt
+
+        if not isinstance(summary, str) or not summary:
+            return prompt
+
+        self.summary = summary
+
+        return (
+            system
+            + [
+                {"role": "user", "content": SUMMARY_PREFIX + summary},
+                {"role": "assistant", "content": SUMMARY_ACK},
+            ]
+            + conversation[count:]
+        )
+
+    def __collect(self, prompt: list) -> list:
+        with self._lock:
+            job = self._job
+
+            if job is None or not job.done():
+                return prompt
+
+            self._job = None
+
+        try:
+            messages, summary = job.result()
+        except Exception as e:
+            logger(f"Error summarizing the conversation: {e}")
+            return prompt
+
+        return self.__apply(prompt, messages, summary)
+
+    def __old_messages(self, prompt: list) -> list | None:
+        """Messages to summarize, None while the conversation is short."""
+        _, turns = split_turns(prompt)
+
+        if len(turns) <= self.summarize_after:
+            return None
+
+        old = len(turns) - self.keep_turns
+
+        return [m for turn in turns[:old] for m in turn]
+
+    def compact(self, prompt: list, agent: tp.Any = None) -> list:
+        prompt = self.__collect(prompt)
+
+        if (messages := self.__old_messages(prompt)) is None:
+            return prompt
+
+        if not self.background:
+            try:
+                return self.__apply(prompt, messages, self.summarize(messages))
+            except Exception as e:
+                logger(f"Error summarizing the conversation: {e}")
+                return prompt
+
+        with self._lock:
+            if self._job is None:
+                self._job = get_summary_executor().submit(self.__summarize, messages)
+
+        return prompt
+
+    async def acompact(self, prompt: list, agent: tp.Any = None) -> list:
+        if self.background:
+            return self.compact(prompt, agent)
+
+        # The summary call blocks: keep it off the event loop
+        return await asyncio.to_thread(self.compact, prompt, agent)
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Block until a background summary, if any, is ready."""
+        with self._lock:
+            job = self._job
+
+        if job is not None:
+            try:
+                job.result(timeout)
+            except Exception:
+                pass
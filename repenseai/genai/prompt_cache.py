@@ -0,0 +1,222 @@
+import json
+
+import typing as tp
+
+from repenseai.genai.tokens import count_text_tokens, count_tokens
+
+
+# Anthropic only caches prefixes from ~1024 tokens (2048 on Haiku): shorter
+# breakpoints are ignored, so they are not worth sending
+MIN_CACHE_TOKENS = 1024
+
+# Anthropic accepts at most 4 cache_control breakpoints per request
+MAX_BREAKPOINTS = 4
+
+# Price of cached prompt tokens relative to the input price, by provider.
+# A model price dict can override them with "cached_input" / "cache_write"
+# (dollars per million tokens, like "input" and "output").
+CACHE_PRICES = {
+    "anthropic": {"read": 0.1, "write": 1.25},
+    "openai": {"read": 0.5, "write": 1.0},
+    "google": {"read": 0.25, "write": 1.0},
+    "deepseek": {"read": 0.25, "write": 1.0},
+    "x": {"read": 0.25, "write": 1.0},
+}
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def _mark_block(block: tp.Any) -> tp.Any:
+    if isinstance(block, str):
+        return {"type": "text", "text": block, "cache_control": EPHEMERAL}
+
+    return {**block, "cache_control": EPHEMERAL}
+
+
+def _can_mark(block: tp.Any) -> bool:
+    if isinstance(block, str):
+        return bool(block)
+
+    if not isinstance(block, dict):
+        return False
+
+    # Thinking blocks and empty text cannot hold a breakpoint
+    if block.get("type") in ("thinking", "redacted_thinking"):
+        return False
+
+    return block.get("type") != "text" or bool(block.get("text"))
+
+
+def _mark_message(message: dict) -> dict | None:
+    """Copy of `message` with a breakpoint on its last block, or None."""
+    content = message.get("content")
+
+    if isinstance(content, str):
+        if not content:
+            return None
+
+        return {**message, "content": [_mark_block(content)]}
+
+    if not isinstance(content, list):
+        return None
+
+    for index in range(len(content) - 1, -1, -1):
+        if _can_mark(content[index]):
+            if "cache_control" in content[index]:
+                # Already a breakpoint, set by the caller
+                return None
+
+            content = list(content)
+            content[index] = _mark_block(content[index])
+
+            return {**message, "content": content}
+
+    return None
+
+
+def _count_breakpoints(json_data: dict) -> tp.Iterator[int]:
+    """Breakpoints set by the caller, which count towards the limit."""
+    for tool in json_data.get("tools") or []:
+        yield int("cache_control" in tool)
+
+    system = json_data.get("system")
+
+    for block in system if isinstance(system, list) else []:
+        yield int(isinstance(block, dict) and "cache_control" in block)
+
+    for message in json_data.get("messages") or []:
+        content = message.get("content") if isinstance(message, dict) else None
+
+        for block in content if isinstance(content, list) else []:
+            yield int(isinstance(block, dict) and "cache_control" in block)
+
+
+def add_cache_control(json_data: dict, min_tokens: int = MIN_CACHE_TOKENS) -> dict:
+    """
+    Anthropic messages request with `cache_control` breakpoints on its
+    stable prefixes, so the next calls read them from the prompt cache:
+
+    - the last tool: the tool catalogue, shared by every conversation
+    - the system prompt, when there is one
+    - the message before the last one: the history / previous turns
+    - the last message: the whole prompt, read back by the next turn of a
+      conversation or of a tool call loop
+
+    Prefixes shorter than `min_tokens` (estimated) are left alone. The
+    prompt is not modified: marked messages and tools are copies.
+    """
+    json_data = dict(json_data)
+    breakpoints = sum(_count_breakpoints(json_data))
+
+    model = json_data.get("model")
+
+    prefix = 0
+
+    if tools := json_data.get("tools"):
+        prefix += count_text_tokens(json.dumps(tools, default=str), "anthropic", model)
+
+        if prefix >= min_tokens and breakpoints < MAX_BREAKPOINTS:
+            json_data["tools"] = list(tools[:-1]) + [
+                {**tools[-1], "cache_control": EPHEMERAL}
+            ]
+            breakpoints += 1
+
+    if system := json_data.get("system"):
+        prefix += count_tokens(system, "anthropic", model)
+
+        if prefix >= min_tokens and breakpoints < MAX_BREAKPOINTS:
+            if isinstance(system, str):
+                json_data["system"] = [_mark_block(system)]
+            else:
+                system = list(system)
+                system[-1] = _mark_block(system[-1])
+                json_data["system"] = system
+
+            breakpoints += 1
+
+    messages = list(json_data.get("messages") or [])
+    sizes = [count_tokens(message, "anthropic", model) for message in messages]
+
+    for index in (len(messages) - 2, len(messages) - 1):
+        if index < 0 or breakpoints >= MAX_BREAKPOINTS:
+            continue
+
+        if prefix + sum(sizes[: index + 1]) < min_tokens:
+            continue
+
+        if (marked := _mark_message(messages[index])) is not None:
+            messages[index] = marked
+            breakpoints += 1
+
+    json_data["messages"] = messages
+
+    return json_data
+
+
+def get_cached_tokens(tokens: tp.Any) -> tp.Tuple[int, int]:
+    """
+    (cache read, cache write) prompt tokens of a usage dict, whatever the
+    provider shape: the normalized `cached_tokens` / `cache_creation_tokens`,
+    OpenAI `prompt_tokens_details.cached_tokens` or DeepSeek
+    `prompt_cache_hit_tokens`.
+    """
+    if not isinstance(tokens, dict):
+        return 0, 0
+
+    written = tokens.get("cache_creation_tokens") or 0
+
+    if cached := tokens.get("cached_tokens"):
+        return cached, written
+
+    if cached := tokens.get("prompt_cache_hit_tokens"):
+        return cached, written
+
+    details = tokens.get("prompt_tokens_details")
+
+    if isinstance(details, dict) and (cached := details.get("cached_tokens")):
+        return cached, written
+
+    return 0, written
+
+
+def normalize_usage(usage: tp.Any) -> tp.Any:
+    """Usage dict of an OpenAI compatible API, with a top level `cached_tokens`."""
+    if not isinstance(usage, dict):
+        return usage
+
+    cached, _ = get_cached_tokens(usage)
+
+    return {**usage, "cached_tokens": cached}
+
+
+def tokens_cost(tokens: dict, price: tp.Any, provider: str | None = None) -> float:
+    """
+    Cost in dollars of a usage dict. Prompt tokens read from the provider
+    cache (and written to it, on Anthropic) are priced with CACHE_PRICES.
+    """
+    cached, written = get_cached_tokens(tokens)
+
+    rates = CACHE_PRICES.get(provider, {"read": 1.0, "write": 1.0})
+
+    if isinstance(price, dict):
+        input_price = price["input"]
+        output_price = price["output"]
+
+        read_price = price.get("cached_input", input_price * rates["read"])
+        write_price = price.get("cache_write", input_price * rates["write"])
+    else:
+        input_price = output_price = price
+
+        read_price = price * rates["read"]
+        write_price = price * rates["write"]
+
+    uncached = max(tokens["prompt_tokens"] - cached - written, 0)
+
+    total = (
+        uncached * input_price
+        + cached * read_price
+        + written * write_price
+        + tokens["completion_tokens"] * output_price
+    )
+
+    return total / 1_000_000
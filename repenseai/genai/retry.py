@@ -0,0 +1,302 @@
+import asyncio
+import email.utils
+import inspect
+import random
+import time
+
+import typing as tp
+
+import httpx
+
+from repenseai.utils.logs import logger
+
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+THROTTLING_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+
+TRANSIENT_NAMES = ("Timeout", "Connect", "Unavailable", "Overloaded")
+
+
+# SDK arguments that bound a single request, with their unit per second:
+# the OpenAI-like SDKs, anthropic and httpx take `timeout`, mistral
+# `timeout_ms`
+TIMEOUT_ARGS = {"timeout": 1, "timeout_ms": 1000}
+
+
+def get_timeout_arg(function: tp.Callable) -> str | None:
+    """Name of the per request timeout argument of an SDK call, if any."""
+    try:
+        parameters = inspect.signature(function).parameters
+    except (TypeError, ValueError):
+        return None
+
+    return next((name for name in TIMEOUT_ARGS if name in parameters), None)
+
+
+def is_http_response(value: tp.Any) -> bool:
+    """Whether a value is a plain HTTP response (httpx / requests)."""
+    return (
+        not isinstance(value, Exception)
+        and isinstance(getattr(value, "status_code", None), int)
+        and hasattr(value, "headers")
+    )
+
+
+def get_status_code(error: Exception) -> int | None:
+    """Best effort HTTP status of an SDK error (openai, anthropic, cohere, ...)."""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+
+        if isinstance(value, int):
+            return value
+
+    response = getattr(error, "response", None)
+
+    if isinstance(response, dict):
+        metadata = response.get("ResponseMetadata", {})
+        return metadata.get("HTTPStatusCode")
+
+    value = getattr(response, "status_code", None)
+
+    return value if isinstance(value, int) else None
+
+
+def get_headers(error: tp.Any) -> tp.Mapping:
+    """Response headers of an SDK error, or of an HTTP response."""
+    if is_http_response(error):
+        return error.headers
+
+    for attr in ("response", "raw_response"):
+        response = getattr(error, attr, None)
+        headers = getattr(response, "headers", None)
+
+        if headers is not None:
+            return headers
+
+    headers = getattr(error, "headers", None)
+
+    return headers if headers is not None else {}
+
+
+def get_retry_after(error: tp.Any) -> float | None:
+    """
+    Seconds requested by the server through `retry-after-ms` / `retry-after`.
+
+    `retry-after` can be either a number of seconds or an HTTP date.
+    """
+    try:
+        headers = get_headers(error)
+
+        if value := headers.get("retry-after-ms"):
+            return float(value) / 1000
+
+        value = headers.get("retry-after")
+    except Exception:
+        return None
+
+    if not value:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+        return max(0.0, date.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether an error is transient: rate limits (429), server errors (5xx),
+    timeouts and dropped connections. Everything else (bad request, auth,
+    invalid model, ...) is fatal and is raised right away.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+
+    if isinstance(
+        error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+    ):
+        return True
+
+    response = getattr(error, "response", None)
+
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+
+        if code in THROTTLING_CODES:
+            return True
+
+    status = get_status_code(error)
+
+    if status is not None:
+        return status in RETRYABLE_STATUS
+
+    return any(
+        name in cls.__name__ for cls in type(error).__mro__ for name in TRANSIENT_NAMES
+    )
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for provider calls.
+
+    Transient errors are retried up to `max_retries` times; the wait before
+    attempt `n` is a random value between 0 and `base_delay * 2 ** n` (capped
+    at `max_delay`), unless the server asks for a specific delay through
+    `Retry-After`, which is always honored. `deadline` is a time budget in
+    seconds for the whole call, including the waits: a retry that would not
+    fit in it is not attempted and the last error is raised. Each attempt
+    gets the remaining budget as its SDK timeout (`timeout` / `timeout_ms`),
+    so a hanging request can not outlive it either; SDK calls without such
+    an argument (i.e. boto3, cohere) are only bounded between attempts.
+
+    Pass it to any Agent to enable it for every call of its provider:
+
+        agent = Agent(
+            model="gpt-4o-mini",
+            model_type="chat",
+            retry_policy=RetryPolicy(max_retries=5, deadline=120),
+        )
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        deadline: float | None = None,
+        retryable: tp.Callable[[Exception], bool] = is_retryable,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retryable = retryable
+
+    def get_delay(self, attempt: int, error: tp.Any = None) -> float:
+        retry_after = get_retry_after(error) if error is not None else None
+
+        if retry_after is not None:
+            return retry_after
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def __with_budget(self, function: tp.Callable, kwargs: dict, start: float) -> dict:
+        if self.deadline is None or (name := get_timeout_arg(function)) is None:
+            return kwargs
+
+        remaining = max(0.0, self.deadline - (time.monotonic() - start))
+        timeout = remaining * TIMEOUT_ARGS[name]
+
+        if isinstance(kwargs.get(name), (int, float)):
+            timeout = min(timeout, kwargs[name])
+
+        if name == "timeout_ms":
+            timeout = int(timeout)
+
+        return {**kwargs, name: timeout}
+
+    def __should_retry(self, result: tp.Any) -> bool:
+        if is_http_response(result):
+            return result.status_code in RETRYABLE_STATUS
+
+        return False
+
+    def __next_delay(self, attempt: int, error: tp.Any, start: float) -> float | None:
+        if attempt >= self.max_retries:
+            return None
+
+        delay = self.get_delay(attempt, error)
+
+        if self.deadline is not None:
+            if time.monotonic() - start + delay > self.deadline:
+                return None
+
+        if is_http_response(error):
+            reason = error.status_code
+        else:
+            reason = get_status_code(error) or type(error).__name__
+
+        logger(f"Attempt {attempt + 1} failed ({reason}): retrying in {delay:.2f}s")
+
+        return delay
+
+    def call(self, function: tp.Callable, *args, **kwargs) -> tp.Any:
+        """Call `function(*args, **kwargs)`, retrying transient failures."""
+        start = time.monotonic()
+        attempt = 0
+
+        while True:
+            budget = self.__with_budget(function, kwargs, start)
+
+            try:
+                result = function(*args, **budget)
+            except Exception as e:
+                if not self.retryable(e):
+                    raise
+
+                delay = self.__next_delay(attempt, e, start)
+
+                if delay is None:
+                    raise
+            else:
+                if not self.__should_retry(result):
+                    return result
+
+                delay = self.__next_delay(attempt, result, start)
+
+                if delay is None:
+                    return result
+
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, function: tp.Callable, *args, **kwargs) -> tp.Any:
+        """Async version of `call`, for coroutine functions."""
+        start = time.monotonic()
+        attempt = 0
+
+        while True:
+            budget = self.__with_budget(function, kwargs, start)
+
+            try:
+                result = await function(*args, **budget)
+            except Exception as e:
+                if not self.retryable(e):
+                    raise
+
+                delay = self.__next_delay(attempt, e, start)
+
+                if delay is None:
+                    raise
+            else:
+                if not self.__should_retry(result):
+                    return result
+
+                delay = self.__next_delay(attempt, result, start)
+
+                if delay is None:
+                    return result
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+NO_RETRY = RetryPolicy(max_retries=0)
@@ -0,0 +1,649 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+
+import typing as tp
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from repenseai.genai.agent import Agent, AsyncAgent
+from repenseai.genai.cache import CompletionCache
+from repenseai.genai.history import snapshot_args
+from repenseai.genai.selection import MetricsStore, ModelSelector
+from repenseai.utils.logs import logger
+
+
+HEDGE_WORKERS = 16
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+# Candidate that answered the last call of the current thread / asyncio task
+_winner = contextvars.ContextVar("router_winner", default=None)
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=HEDGE_WORKERS, thread_name_prefix="repenseai-router"
+            )
+
+    return _hedge_executor
+
+
+class CircuitBreaker:
+    """
+    Per provider circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and the
+    provider is skipped for `reset_timeout` seconds. Then a single trial call
+    is let through (half open): a success closes the circuit again, a failure
+    opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            match self.state:
+                case "closed":
+                    return True
+                case "half_open" if not self.trial:
+                    self.trial = True
+                    return True
+                case _:
+                    return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+            if self.trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+            self.trial = False
+
+
+class LatencyTracker:
+    """Rolling window of call latencies, for percentile based hedging."""
+
+    def __init__(self, window: int = 100) -> None:
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self.samples)
+
+        if not samples:
+            return None
+
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class Candidate:
+    """One (provider, model) the router can send a request to."""
+
+    def __init__(self, agent: tp.Any, weight: float = 1.0) -> None:
+        self.agent = agent
+        self.weight = weight
+
+        self.latency = LatencyTracker()
+
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+        self.wins = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.agent.provider}/{self.agent.model}"
+
+
+def _parse_candidate(candidate: tp.Any) -> tuple:
+    """(provider, model, weight, agent options) of a candidate spec."""
+    if isinstance(candidate, str):
+        return None, candidate, 1.0, {}
+
+    if isinstance(candidate, dict):
+        options = dict(candidate)
+
+        provider = options.pop("provider", None)
+        model = options.pop("model")
+        weight = options.pop("weight", 1.0)
+
+        return provider, model, weight, options
+
+    if isinstance(candidate, (list, tuple)):
+        provider, model, *rest = candidate
+        return provider, model, rest[0] if rest else 1.0, {}
+
+    raise ValueError(f"Invalid router candidate: {candidate}")
+
+
+class BaseRouter:
+    agent_class = Agent
+
+    def __init__(
+        self,
+        candidates: tp.List[tp.Any],
+        model_type: str = "chat",
+        strategy: str = "ordered",
+        hedge: bool = False,
+        hedge_delay: float = 1.0,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 5,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        cache: CompletionCache = None,
+        selector: ModelSelector = None,
+        metrics_store: MetricsStore = None,
+        **kwargs,
+    ) -> None:
+        if strategy not in ("ordered", "weighted"):
+            raise ValueError("strategy must be 'ordered' or 'weighted'")
+
+        if not candidates:
+            raise ValueError("RouterAgent needs at least one candidate")
+
+        self.model_type = model_type
+        self.strategy = strategy
+
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.cache = cache
+        self.rate_limiter = None
+
+        # Candidates record their calls themselves, by (provider, model)
+        self.selector = selector
+        self.candidate_store = metrics_store or getattr(selector, "store", None)
+
+        self.tokens = None
+        self.api = None
+        self.kwargs = kwargs
+
+        self.candidates = [self.__build_candidate(c) for c in candidates]
+        self.breakers = {}
+
+        for candidate in self.candidates:
+            self.get_breaker(candidate.agent.provider)
+
+        self.provider = "router"
+        self.model = ",".join(candidate.name for candidate in self.candidates)
+
+    def __build_candidate(self, candidate: tp.Any) -> Candidate:
+        if hasattr(candidate, "get_api"):
+            # i.e. an Agent configured by the caller
+            return Candidate(candidate)
+
+        provider, model, weight, options = _parse_candidate(candidate)
+
+        if provider is not None:
+            options["provider"] = provider
+
+        options.setdefault("metrics_store", self.candidate_store)
+
+        agent = self.agent_class(
+            model=model, model_type=self.model_type, **{**self.kwargs, **options}
+        )
+
+        return Candidate(agent, weight)
+
+    def get_breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self.breakers:
+            self.breakers[provider] = CircuitBreaker(
+                self.failure_threshold, self.reset_timeout
+            )
+
+        return self.breakers[provider]
+
+    def get_order(self, prompt: tp.Any = None) -> list:
+        """Candidate indexes in the order they should be tried."""
+        if self.selector is not None:
+            return self.selector.rank(
+                [(c.agent.provider, c.agent.model) for c in self.candidates],
+                prompt,
+                [getattr(c.agent, "price", None) for c in self.candidates],
+            )
+
+        indexes = list(range(len(self.candidates)))
+
+        if self.strategy == "weighted":
+            # Weighted shuffle: each candidate leads with a chance proportional to its weight
+            def key(i: int) -> float:
+                return random.random() ** (1 / max(self.candidates[i].weight, 1e-9))
+
+            indexes.sort(key=key, reverse=True)
+
+        return indexes
+
+    def get_hedge_delay(self, candidate: Candidate) -> float:
+        """Seconds to wait for `candidate` before sending a hedged request."""
+        if len(candidate.latency.samples) < self.hedge_min_samples:
+            return self.hedge_delay
+
+        return candidate.latency.percentile(self.hedge_percentile)
+
+    def get_price(self) -> dict:
+        return self.__get_agent().get_price()
+
+    def __get_agent(self) -> tp.Any:
+        winner = _winner.get()
+
+        if winner is not None and winner in self.candidates:
+            return winner.agent
+
+        return self.candidates[0].agent
+
+    def calculate_cost(
+        self,
+        tokens: tp.Union[tp.Dict[str, int], int, None] = None,
+        as_string: str = False,
+    ) -> tp.Union[float, str]:
+        """Cost at the price of the candidate that answered the last call."""
+        if not tokens and self.api:
+            tokens = self.api.tokens
+
+        return self.__get_agent().calculate_cost(tokens, as_string)
+
+    def get_context_window(self) -> int | None:
+        """Smallest context window of the candidates: the prompt must fit all."""
+        windows = [c.agent.get_context_window() for c in self.candidates]
+        windows = [window for window in windows if window]
+
+        return min(windows) if windows else None
+
+    def count_tokens(self, messages: tp.Any, tools: list | None = None) -> int:
+        """Largest token count of `messages` among the candidates."""
+        return max(c.agent.count_tokens(messages, tools) for c in self.candidates)
+
+    def metrics(self) -> dict:
+        return {
+            candidate.name: {
+                "requests": candidate.requests,
+                "failures": candidate.failures,
+                "hedges": candidate.hedges,
+                "wins": candidate.wins,
+                "p50": candidate.latency.percentile(50),
+                "p95": candidate.latency.percentile(95),
+                "circuit": self.get_breaker(candidate.agent.provider).state,
+            }
+            for candidate in self.candidates
+        }
+
+
+class BaseRouterAPI:
+    """
+    Chat / vision API that spreads each call over the router candidates.
+
+    Attributes the Task reads after a call (tokens, response, tool_flag) and
+    the provider specific helpers (tool calls, stream chunks) come from the
+    candidate that answered it. A conversation that stopped on a tool call
+    sticks to that candidate, since the tool messages are provider specific.
+    """
+
+    def __init__(self, router: BaseRouter, apis: list) -> None:
+        self.router = router
+        self.apis = apis
+
+        self.current = 0
+        self.pinned = None
+
+    @property
+    def stream(self) -> bool:
+        return self.apis[self.current].stream
+
+    @stream.setter
+    def stream(self, value: bool) -> None:
+        for api in self.apis:
+            api.stream = value
+
+    @property
+    def tokens(self) -> tp.Any:
+        return self.apis[self.current].tokens
+
+    @tokens.setter
+    def tokens(self, value: tp.Any) -> None:
+        self.apis[self.current].tokens = value
+
+    @property
+    def tool_flag(self) -> bool:
+        return getattr(self.apis[self.current], "tool_flag", False)
+
+    @tool_flag.setter
+    def tool_flag(self, value: bool) -> None:
+        self.apis[self.current].tool_flag = value
+
+    @property
+    def response(self) -> tp.Any:
+        return self.apis[self.current].response
+
+    def __getattr__(self, name: str) -> tp.Any:
+        # Only called for attributes not found on the router API itself
+        if name in ("router", "apis", "current", "pinned"):
+            raise AttributeError(name)
+
+        return getattr(self.apis[self.current], name)
+
+    def _get_order(self, args: tuple) -> list:
+        if self.pinned is not None:
+            return [self.pinned]
+
+        return self.router.get_order(args[0] if args else None)
+
+    def _next(self, order: list) -> int | None:
+        """Pop the next candidate whose circuit lets the call through."""
+        while order:
+            index = order.pop(0)
+            provider = self.router.candidates[index].agent.provider
+
+            if self.pinned is not None or self.router.get_breaker(provider).allow():
+                return index
+
+        return None
+
+    def _should_hedge(self) -> bool:
+        return self.router.hedge and self.pinned is None and not self.stream
+
+    def _record(self, index: int, seconds: float, ok: bool) -> None:
+        candidate = self.router.candidates[index]
+        breaker = self.router.get_breaker(candidate.agent.provider)
+
+        store = getattr(candidate.agent, "metrics_store", None)
+
+        if store is not None and not self.apis[index].stream:
+            tokens = self.apis[index].tokens if ok else None
+            store.record(
+                candidate.agent.provider, candidate.agent.model, seconds, ok, tokens
+            )
+
+        if ok:
+            candidate.latency.add(seconds)
+            breaker.record_success()
+        else:
+            candidate.failures += 1
+            breaker.record_failure()
+
+            logger(f"Router candidate {candidate.name} failed")
+
+    def _win(self, index: int) -> None:
+        candidate = self.router.candidates[index]
+        candidate.wins += 1
+
+        self.current = index
+        self.pinned = index if self.tool_flag else None
+
+        _winner.set(candidate)
+
+    def _no_candidate(self) -> None:
+        logger(f"Erro na chamada da API - router {self.router.model}: no candidate")
+
+
+class RouterAPI(BaseRouterAPI):
+    def __call(self, index: int, args: tuple) -> tuple:
+        candidate = self.router.candidates[index]
+        candidate.requests += 1
+
+        start = time.perf_counter()
+
+        try:
+            response = self.apis[index].call_api(*snapshot_args(args))
+        except Exception as e:
+            logger(f"Erro na chamada da API - modelo {candidate.name}: {e}")
+            response = None
+
+        ok = response is not None
+        self._record(index, time.perf_counter() - start, ok)
+
+        return ok, response
+
+    def call_api(self, *args) -> tp.Any:
+        order = self._get_order(args)
+
+        if not self._should_hedge():
+            while (index := self._next(order)) is not None:
+                ok, response = self.__call(index, args)
+
+                if ok:
+                    self._win(index)
+                    return response
+
+            return self._no_candidate()
+
+        return self.__call_hedged(order, args)
+
+    def __call_hedged(self, order: list, args: tuple) -> tp.Any:
+        executor = get_hedge_executor()
+
+        pending = {}
+        hedged = False
+
+        def launch() -> int | None:
+            index = self._next(order)
+
+            if index is not None:
+                # In a copy of this context, so spans of the call nest properly
+                future = executor.submit(
+                    contextvars.copy_context().run, self.__call, index, args
+                )
+                pending[future] = index
+
+            return index
+
+        if (primary := launch()) is None:
+            return self._no_candidate()
+
+        while pending:
+            timeout = None
+
+            if not hedged and order:
+                timeout = self.router.get_hedge_delay(self.router.candidates[primary])
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Slower than its p95: race it against the next candidate
+                hedged = True
+
+                if (index := launch()) is not None:
+                    self.router.candidates[index].hedges += 1
+
+                continue
+
+            for future in done:
+                index = pending.pop(future)
+                ok, response = future.result()
+
+                if ok:
+                    # The slower request finishes in the background and is dropped
+                    self._win(index)
+                    return response
+
+            if not pending and (index := launch()) is not None:
+                primary = index
+                hedged = False
+
+        return self._no_candidate()
+
+
+class AsyncRouterAPI(BaseRouterAPI):
+    async def __call(self, index: int, args: tuple) -> tuple:
+        candidate = self.router.candidates[index]
+        candidate.requests += 1
+
+        start = time.perf_counter()
+
+        try:
+            response = await self.apis[index].call_api(*snapshot_args(args))
+        except Exception as e:
+            logger(f"Erro na chamada da API - modelo {candidate.name}: {e}")
+            response = None
+
+        ok = response is not None
+        self._record(index, time.perf_counter() - start, ok)
+
+        return ok, response
+
+    async def call_api(self, *args) -> tp.Any:
+        order = self._get_order(args)
+
+        if not self._should_hedge():
+            while (index := self._next(order)) is not None:
+                ok, response = await self.__call(index, args)
+
+                if ok:
+                    self._win(index)
+                    return response
+
+            return self._no_candidate()
+
+        return await self.__call_hedged(order, args)
+
+    async def __call_hedged(self, order: list, args: tuple) -> tp.Any:
+        pending = {}
+        hedged = False
+
+        def launch() -> int | None:
+            index = self._next(order)
+
+            if index is not None:
+                pending[asyncio.ensure_future(self.__call(index, args))] = index
+
+            return index
+
+        if (primary := launch()) is None:
+            return self._no_candidate()
+
+        try:
+            while pending:
+                timeout = None
+
+                if not hedged and order:
+                    candidate = self.router.candidates[primary]
+                    timeout = self.router.get_hedge_delay(candidate)
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    hedged = True
+
+                    if (index := launch()) is not None:
+                        self.router.candidates[index].hedges += 1
+
+                    continue
+
+                for future in done:
+                    index = pending.pop(future)
+                    ok, response = future.result()
+
+                    if ok:
+                        self._win(index)
+                        return response
+
+                if not pending and (index := launch()) is not None:
+                    primary = index
+                    hedged = False
+        finally:
+            # Cancel the losing request
+            for future in pending:
+                future.cancel()
+
+        return self._no_candidate()
+
+
+class RouterAgent(BaseRouter):
+    """
+    Agent that spreads its calls over several (provider, model) candidates.
+
+    Candidates are model names of `TEXT_MODELS` (or `VISION_MODELS`),
+    `(provider, model)` / `(provider, model, weight)` tuples, dicts with
+    `model`, `provider`, `weight` and any Agent option (i.e. `api_key`), or
+    ready Agents. With `strategy="ordered"` they are tried in order, with
+    `"weighted"` the order is shuffled by weight on every call.
+
+    - Failover: a failed call (error or empty response) moves on to the next
+      candidate.
+    - Hedging (`hedge=True`): when the first candidate takes longer than its
+      p95 latency (`hedge_percentile`, or `hedge_delay` until enough calls
+      were seen), the same request is sent to the next one and the first
+      answer wins. Streams are never hedged.
+    - Circuit breakers: a provider that failed `failure_threshold` times in a
+      row is skipped for `reset_timeout` seconds.
+    - Selection (`selector=ModelSelector(...)`): candidates are ordered on
+      every call by the selector, cheapest first among those meeting its
+      latency / error / quality targets, from the metrics the candidates
+      record in the selector store.
+
+    Use it wherever an Agent goes:
+        router = RouterAgent(
+            [("openai", "gpt-4o-mini"), ("anthropic", "claude-3-5-haiku-20241022")],
+            model_type="chat",
+            hedge=True,
+        )
+        Task(user="Hello", agent=router).run()
+    """
+
+    agent_class = Agent
+
+    def get_api(self) -> RouterAPI:
+        self.api = RouterAPI(self, [c.agent.get_api() for c in self.candidates])
+        return self.api
+
+
+class AsyncRouterAgent(BaseRouter):
+    """Async version of `RouterAgent`, for `AsyncTask`."""
+
+    agent_class = AsyncAgent
+
+    def __init__(self, candidates: tp.List[tp.Any], **kwargs) -> None:
+        super().__init__(candidates, **kwargs)
+        self.server_manager = None
+
+    async def get_api(self) -> AsyncRouterAPI:
+        apis = [await c.agent.get_api() for c in self.candidates]
+        self.api = AsyncRouterAPI(self, apis)
+
+        return self.api
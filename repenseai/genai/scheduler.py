@@ -0,0 +1,214 @@
+import asyncio
+import threading
+import time
+
+import typing as tp
+
+from repenseai.genai.tokens import count_tokens
+from repenseai.utils.logs import logger
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that refills continuously.
+
+    `reserve` always succeeds: it takes the amount right away (letting the
+    level go negative) and returns how long the caller must wait before
+    sending. Callers are therefore served in arrival order and never spin.
+    """
+
+    def __init__(self, capacity: float, per_seconds: float = 60.0) -> None:
+        if capacity <= 0:
+            raise ValueError("Token bucket capacity must be positive")
+
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+        self._lock = threading.Lock()
+
+    def __refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take `amount` from the bucket and return the seconds to wait."""
+        amount = min(float(amount), self.capacity)
+
+        with self._lock:
+            self.__refill()
+            self.level -= amount
+
+            if self.level >= 0:
+                return 0.0
+
+            return -self.level / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the fact."""
+        with self._lock:
+            self.__refill()
+            self.level = min(self.capacity, self.level - amount)
+
+    def available(self) -> float:
+        with self._lock:
+            self.__refill()
+            return self.level
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute scheduler for Agent calls.
+
+    Limits are registered per provider and, optionally, per model. A call is
+    charged against every matching bucket (the provider wide one and the
+    model specific one), so both org and model ceilings are respected.
+
+    Before a call the prompt size is counted locally (`repenseai.genai.tokens`)
+    and reserved on the TPM buckets; after the call the real `usage` returned
+    by the provider is used to settle the difference and to calibrate future
+    estimates.
+
+    Example:
+        limiter = RateLimiter()
+        limiter.set_limit("openai", rpm=500, tpm=200_000)
+        limiter.set_limit("openai", "gpt-4o", tpm=30_000)
+
+        agent = Agent(model="gpt-4o", model_type="chat", rate_limiter=limiter)
+    """
+
+    def __init__(self, smoothing: float = 0.2) -> None:
+        self.smoothing = smoothing
+
+        self.limits = {}
+        self.calibration = {}
+        self.completion_tokens = {}
+
+        self._lock = threading.Lock()
+
+    def set_limit(
+        self,
+        provider: str,
+        model: str | None = None,
+        rpm: int | None = None,
+        tpm: int | None = None,
+    ) -> None:
+        """
+        Register limits for a provider, or for one model of a provider.
+
+        Args:
+            provider: Provider name, as in `Agent.provider`
+            model: Model name, or None for a provider wide limit
+            rpm: Requests per minute
+            tpm: Tokens per minute (prompt + completion)
+        """
+        with self._lock:
+            self.limits[(provider, model)] = {
+                "rpm": TokenBucket(rpm) if rpm else None,
+                "tpm": TokenBucket(tpm) if tpm else None,
+            }
+
+    def remove_limit(self, provider: str, model: str | None = None) -> None:
+        with self._lock:
+            self.limits.pop((provider, model), None)
+
+    def __get_buckets(self, provider: str, model: str, kind: str) -> list:
+        buckets = []
+
+        for key in ((provider, None), (provider, model)):
+            if bucket := self.limits.get(key, {}).get(kind):
+                buckets.append(bucket)
+
+        return buckets
+
+    def estimate(self, provider: str, model: str, prompt: tp.Any) -> int:
+        """Estimated prompt + completion tokens for a call."""
+        return self.__calibrate(provider, model, count_tokens(prompt, provider, model))
+
+    def __calibrate(self, provider: str, model: str, raw: int) -> int:
+        ratio = self.calibration.get((provider, model), 1.0)
+        completion = self.completion_tokens.get((provider, model), 0)
+
+        return int(raw * ratio + completion)
+
+    def __reserve(self, provider: str, model: str, prompt: tp.Any) -> tuple:
+        raw = count_tokens(prompt, provider, model)
+        tokens = self.__calibrate(provider, model, raw)
+
+        wait = 0.0
+
+        for bucket in self.__get_buckets(provider, model, "rpm"):
+            wait = max(wait, bucket.reserve(1))
+
+        for bucket in self.__get_buckets(provider, model, "tpm"):
+            wait = max(wait, bucket.reserve(tokens))
+
+        ticket = {
+            "provider": provider,
+            "model": model,
+            "raw": raw,
+            "reserved": tokens,
+        }
+
+        if wait > 0:
+            logger(f"Rate limit reached for {provider}/{model}: waiting {wait:.2f}s")
+
+        return ticket, wait
+
+    def acquire(self, provider: str, model: str, prompt: tp.Any = None) -> dict:
+        """Block until the call fits the limits. Returns a ticket for `record`."""
+        ticket, wait = self.__reserve(provider, model, prompt)
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return ticket
+
+    async def aacquire(self, provider: str, model: str, prompt: tp.Any = None) -> dict:
+        """Async version of `acquire`, sleeping without blocking the loop."""
+        ticket, wait = self.__reserve(provider, model, prompt)
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        return ticket
+
+    def record(self, ticket: dict, usage: dict | None) -> None:
+        """
+        Settle a call with the usage returned by the provider.
+
+        Args:
+            ticket: The value returned by `acquire` / `aacquire`
+            usage: The `tokens` dict of the API (prompt_tokens / completion_tokens)
+        """
+        if not ticket or not isinstance(usage, dict):
+            return
+
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        total = usage.get("total_tokens") or prompt_tokens + completion_tokens
+
+        if not total:
+            return
+
+        provider, model = ticket["provider"], ticket["model"]
+
+        for bucket in self.__get_buckets(provider, model, "tpm"):
+            bucket.adjust(total - ticket["reserved"])
+
+        key = (provider, model)
+        alpha = self.smoothing
+
+        with self._lock:
+            if prompt_tokens and ticket["raw"]:
+                ratio = prompt_tokens / ticket["raw"]
+                previous = self.calibration.get(key, ratio)
+                self.calibration[key] = previous + alpha * (ratio - previous)
+
+            if completion_tokens:
+                previous = self.completion_tokens.get(key, completion_tokens)
+                self.completion_tokens[key] = previous + alpha * (
+                    completion_tokens - previous
+                )
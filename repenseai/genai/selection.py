@@ -0,0 +1,366 @@
+import math
+import sqlite3
+import threading
+import time
+
+import typing as tp
+
+from collections import deque
+
+from repenseai.genai.providers import TEXT_MODELS, VISION_MODELS
+from repenseai.genai.tokens import count_tokens
+from repenseai.utils.logs import logger
+
+
+DEFAULT_COMPLETION_TOKENS = 500
+
+
+def _percentile(samples: list, q: float) -> float | None:
+    if not samples:
+        return None
+
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+
+    return samples[index]
+
+
+class MetricsStore:
+    """
+    Rolling per model call metrics: latency, errors and throughput of the
+    last `window` calls of each (provider, model).
+
+    With `path`, calls are also written to a SQLite file and the last
+    `window` calls of each model are loaded back on start, so what was
+    learned about each model survives restarts. Writes are batched: they are
+    committed every `flush_every` calls or `flush_interval` seconds, and by
+    `flush()` / `close()`. Older rows beyond `window` per model are pruned.
+
+    Example:
+        store = MetricsStore(path="metrics.db")
+        agent = Agent(model="gpt-4o-mini", model_type="chat", metrics_store=store)
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        window: int = 200,
+        flush_every: int = 100,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.window = window
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._connection = None
+
+        self._pending = []
+        self._flushed = time.monotonic()
+
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS calls "
+                "(provider TEXT NOT NULL, model TEXT NOT NULL, latency REAL NOT NULL, "
+                "ok INTEGER NOT NULL, completion_tokens INTEGER, created REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS calls_model "
+                "ON calls (provider, model, created)"
+            )
+            self._connection.commit()
+
+            self.__load()
+
+    def __load(self) -> None:
+        rows = self._connection.execute(
+            "SELECT provider, model, latency, ok, completion_tokens FROM ("
+            "SELECT *, ROW_NUMBER() OVER ("
+            "PARTITION BY provider, model ORDER BY created DESC) AS position "
+            "FROM calls) WHERE position <= ? ORDER BY created",
+            (self.window,),
+        )
+
+        for provider, model, latency, ok, completion_tokens in rows:
+            self.__remember((provider, model), (latency, bool(ok), completion_tokens))
+
+    def __remember(self, key: tuple, sample: tuple) -> None:
+        if key not in self._samples:
+            self._samples[key] = deque(maxlen=self.window)
+
+        self._samples[key].append(sample)
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        latency: float,
+        ok: bool = True,
+        tokens: dict | None = None,
+    ) -> None:
+        """Add one call: its latency in seconds, success and token usage."""
+        completion_tokens = (tokens or {}).get("completion_tokens")
+
+        with self._lock:
+            self.__remember((provider, model), (latency, ok, completion_tokens))
+
+            if self._connection is None:
+                return
+
+            self._pending.append(
+                (provider, model, latency, int(ok), completion_tokens, time.time())
+            )
+
+            if (
+                len(self._pending) >= self.flush_every
+                or time.monotonic() - self._flushed >= self.flush_interval
+            ):
+                self.__flush()
+
+    def __flush(self) -> None:
+        pending, self._pending = self._pending, []
+        self._flushed = time.monotonic()
+
+        if not pending or self._connection is None:
+            return
+
+        try:
+            self._connection.executemany(
+                "INSERT INTO calls VALUES (?, ?, ?, ?, ?, ?)", pending
+            )
+
+            # Only the last `window` calls of a model are ever read back
+            for provider, model in {(row[0], row[1]) for row in pending}:
+                self._connection.execute(
+                    "DELETE FROM calls WHERE provider = ? AND model = ? AND "
+                    "rowid NOT IN (SELECT rowid FROM calls WHERE provider = ? "
+                    "AND model = ? ORDER BY created DESC LIMIT ?)",
+                    (provider, model, provider, model, self.window),
+                )
+
+            self._connection.commit()
+        except sqlite3.Error as e:
+            logger(f"Error writing to metrics store: {e}")
+
+    def flush(self) -> None:
+        """Write the pending calls to the SQLite file."""
+        with self._lock:
+            self.__flush()
+
+    def get_stats(self, provider: str, model: str) -> dict:
+        """
+        Metrics of a model: `calls`, `error_rate`, latency percentiles of the
+        successful calls (`p50`, `p95`, `p99`, in seconds), mean
+        `completion_tokens` and generation `tokens_per_second`.
+        """
+        with self._lock:
+            samples = list(self._samples.get((provider, model), ()))
+
+        latencies = [latency for latency, ok, _ in samples if ok]
+        tokens = [(t, latency) for latency, ok, t in samples if ok and t]
+
+        return {
+            "calls": len(samples),
+            "error_rate": (
+                sum(not ok for _, ok, _ in samples) / len(samples) if samples else 0.0
+            ),
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "completion_tokens": (
+                sum(t for t, _ in tokens) / len(tokens) if tokens else None
+            ),
+            "tokens_per_second": (
+                sum(t for t, _ in tokens) / sum(latency for _, latency in tokens)
+                if tokens
+                else None
+            ),
+        }
+
+    def get_latency(self, provider: str, model: str, q: float = 95) -> float | None:
+        """Latency percentile `q` of the successful calls of a model."""
+        with self._lock:
+            samples = list(self._samples.get((provider, model), ()))
+
+        return _percentile([latency for latency, ok, _ in samples if ok], q)
+
+    def models(self) -> list:
+        """(provider, model) pairs with recorded calls."""
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._pending = []
+
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM calls")
+                self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self.__flush()
+                self._connection.close()
+                self._connection = None
+
+
+def get_model_price(model: str) -> tp.Any:
+    """Catalogue price of a model, None when it is not in `providers.py`."""
+    models = {**VISION_MODELS, **TEXT_MODELS}
+
+    return models.get(model, {}).get("cost")
+
+
+def estimate_cost(price: tp.Any, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in dollars of a call, with the same pricing as `Agent.calculate_cost`."""
+    if isinstance(price, dict):
+        total = prompt_tokens * price["input"] + completion_tokens * price["output"]
+    else:
+        total = (prompt_tokens + completion_tokens) * price
+
+    return total / 1_000_000
+
+
+class ModelSelector:
+    """
+    Picks the cheapest model that meets the declared targets, using the
+    live metrics of a `MetricsStore` and the prices of `providers.py`.
+
+    A model meets the targets when its p`percentile` latency is at most
+    `max_latency` seconds, its error rate at most `max_error_rate` and its
+    declared `quality` score (i.e. from benchmarks) at least `min_quality`.
+    Models with fewer than `min_samples` calls are given the benefit of the
+    doubt, so they get traffic and their metrics fill in. When no model
+    meets the targets, the fastest ones come first.
+
+    Example:
+        selector = ModelSelector(store, max_latency=2.0)
+        model = selector.select(["gpt-4o-mini", "claude-3-5-haiku-20241022"])
+        agent = Agent(model=model, model_type="chat", metrics_store=store)
+    """
+
+    def __init__(
+        self,
+        store: MetricsStore | None = None,
+        max_latency: float | None = None,
+        max_error_rate: float | None = 0.1,
+        min_quality: float | None = None,
+        quality: tp.Dict[str, float] | None = None,
+        percentile: float = 95,
+        min_samples: int = 5,
+        completion_tokens: int = DEFAULT_COMPLETION_TOKENS,
+    ) -> None:
+        self.store = store or MetricsStore()
+
+        self.max_latency = max_latency
+        self.max_error_rate = max_error_rate
+        self.min_quality = min_quality
+        self.quality = quality or {}
+
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.completion_tokens = completion_tokens
+
+    def meets_targets(self, provider: str, model: str, stats: dict) -> bool:
+        if self.min_quality is not None:
+            if self.quality.get(model, -math.inf) < self.min_quality:
+                return False
+
+        if stats["calls"] < self.min_samples:
+            return True
+
+        if (
+            self.max_error_rate is not None
+            and stats["error_rate"] > self.max_error_rate
+        ):
+            return False
+
+        if self.max_latency is not None:
+            latency = self.store.get_latency(provider, model, self.percentile)
+
+            if latency is None or latency > self.max_latency:
+                return False
+
+        return True
+
+    def estimate_cost(
+        self,
+        provider: str,
+        model: str,
+        prompt: tp.Any = None,
+        stats: dict = None,
+        price: tp.Any = None,
+    ) -> float:
+        """
+        Expected cost of sending `prompt` to a model, at `price` or at its
+        catalogue price. Unknown prices cost `math.inf`, so those models
+        come last among the ones meeting the targets.
+        """
+        stats = stats or self.store.get_stats(provider, model)
+        completion_tokens = stats["completion_tokens"] or self.completion_tokens
+
+        if price is None:
+            price = get_model_price(model)
+
+        if price is None:
+            return math.inf
+
+        prompt_tokens = count_tokens(prompt, provider, model)
+
+        return estimate_cost(price, prompt_tokens, completion_tokens)
+
+    def rank(
+        self,
+        candidates: tp.List[tuple],
+        prompt: tp.Any = None,
+        prices: tp.List[tp.Any] | None = None,
+    ) -> list:
+        """
+        Indexes of the (provider, model) `candidates`, best first: those that
+        meet the targets by expected cost, then the others by latency.
+        `prices` overrides the catalogue price of each candidate (i.e. the
+        `price` of its Agent).
+        """
+        prices = prices or [None] * len(candidates)
+        scores = []
+
+        for index, (provider, model) in enumerate(candidates):
+            stats = self.store.get_stats(provider, model)
+
+            if self.meets_targets(provider, model, stats):
+                cost = self.estimate_cost(provider, model, prompt, stats, prices[index])
+                score = (0, cost)
+            else:
+                latency = self.store.get_latency(provider, model, self.percentile)
+                score = (1, latency if latency is not None else math.inf)
+
+            scores.append((score, index))
+
+        return [index for _, index in sorted(scores)]
+
+    def select(
+        self,
+        models: tp.List[str] | None = None,
+        prompt: tp.Any = None,
+        model_type: str = "chat",
+    ) -> str:
+        """Best model among `models` (every model of `model_type` by default)."""
+        catalog = VISION_MODELS if model_type == "vision" else TEXT_MODELS
+
+        if models is None:
+            models = list(catalog)
+
+        if unknown := [model for model in models if model not in catalog]:
+            raise ValueError(
+                f"Unknown {model_type} models: {', '.join(unknown)}. "
+                "Rank (provider, model) pairs with `rank` for other models"
+            )
+
+        candidates = [(catalog[model]["provider"], model) for model in models]
+
+        return models[self.rank(candidates, prompt)[0]]
@@ -0,0 +1,279 @@
+import json
+import time
+
+import typing as tp
+
+from repenseai.genai.tokens import count_text_tokens
+
+
+def _get(value: tp.Any, key: str, default: tp.Any = None) -> tp.Any:
+    if isinstance(value, dict):
+        return value.get(key, default)
+
+    return getattr(value, key, default)
+
+
+def get_tool_call_deltas(chunk: tp.Any) -> list:
+    """
+    Tool call fragments carried by a raw stream chunk, in a provider-agnostic
+    shape: {"index", "id", "name", "arguments"}. `id` and `name` are only set
+    on the first fragment of a call and `arguments` is a piece of its JSON.
+
+    Understands OpenAI-compatible chunks (OpenAI, Groq, Together, DeepSeek,
+    X, ...), Anthropic stream events and Bedrock `converse_stream` events.
+    """
+    deltas = []
+
+    # OpenAI-compatible: choices[0].delta.tool_calls
+    if choices := _get(chunk, "choices"):
+        delta = _get(choices[0], "delta")
+
+        for call in _get(delta, "tool_calls") or []:
+            function = _get(call, "function")
+
+            deltas.append(
+                {
+                    "index": _get(call, "index", 0),
+                    "id": _get(call, "id"),
+                    "name": _get(function, "name"),
+                    "arguments": _get(function, "arguments") or "",
+                }
+            )
+
+        return deltas
+
+    # Anthropic: content_block_start (tool_use) / input_json_delta
+    match _get(chunk, "type"):
+        case "content_block_start":
+            block = _get(chunk, "content_block")
+
+            if _get(block, "type") == "tool_use":
+                deltas.append(
+                    {
+                        "index": _get(chunk, "index", 0),
+                        "id": _get(block, "id"),
+                        "name": _get(block, "name"),
+                        "arguments": "",
+                    }
+                )
+        case "content_block_delta":
+            delta = _get(chunk, "delta")
+
+            if _get(delta, "type") == "input_json_delta":
+                deltas.append(
+                    {
+                        "index": _get(chunk, "index", 0),
+                        "id": None,
+                        "name": None,
+                        "arguments": _get(delta, "partial_json") or "",
+                    }
+                )
+
+    # Bedrock: contentBlockStart.start.toolUse / contentBlockDelta.delta.toolUse
+    if isinstance(chunk, dict):
+        if tool := chunk.get("contentBlockStart", {}).get("start", {}).get("toolUse"):
+            deltas.append(
+                {
+                    "index": chunk["contentBlockStart"].get("contentBlockIndex", 0),
+                    "id": tool.get("toolUseId"),
+                    "name": tool.get("name"),
+                    "arguments": "",
+                }
+            )
+
+        if tool := chunk.get("contentBlockDelta", {}).get("delta", {}).get("toolUse"):
+            deltas.append(
+                {
+                    "index": chunk["contentBlockDelta"].get("contentBlockIndex", 0),
+                    "id": None,
+                    "name": None,
+                    "arguments": tool.get("input") or "",
+                }
+            )
+
+    return deltas
+
+
+def get_tool_call_stops(chunk: tp.Any) -> list:
+    """
+    Indexes of the tool calls a raw stream chunk closes. `None` stands for
+    every open call (end of the message).
+    """
+    if choices := _get(chunk, "choices"):
+        return [None] if _get(choices[0], "finish_reason") else []
+
+    if _get(chunk, "type") == "content_block_stop":
+        return [_get(chunk, "index", 0)]
+
+    if isinstance(chunk, dict):
+        if "contentBlockStop" in chunk:
+            return [chunk["contentBlockStop"].get("contentBlockIndex", 0)]
+
+        if "messageStop" in chunk:
+            return [None]
+
+    return []
+
+
+class ToolCallAssembler:
+    """
+    Rebuilds complete tool calls from streamed deltas.
+
+    Providers stream tool calls one after the other, so a call is complete
+    when the provider closes it or when the next one starts. `add` and
+    `close` return the calls they complete, with `arguments` (the raw JSON)
+    parsed into `input` (None when the JSON is invalid), so they can start
+    running while the rest of the answer is still streaming.
+    """
+
+    def __init__(self) -> None:
+        self.calls = {}
+        self.closed = set()
+
+    def add(self, delta: dict) -> list:
+        index = delta.get("index", 0)
+        completed = []
+
+        if index not in self.calls:
+            completed = self.close()
+            self.calls[index] = {"id": None, "name": None, "arguments": ""}
+
+        call = self.calls[index]
+
+        for key in ("id", "name"):
+            if delta.get(key):
+                call[key] = delta[key]
+
+        call["arguments"] += delta.get("arguments") or ""
+
+        return completed
+
+    def close(self, index: int | None = None) -> list:
+        """Complete one call, or every open call when `index` is None."""
+        completed = []
+
+        for key, call in self.calls.items():
+            if key in self.closed or (index is not None and key != index):
+                continue
+
+            try:
+                call["input"] = json.loads(call["arguments"] or "{}")
+            except ValueError:
+                call["input"] = None
+
+            self.closed.add(key)
+            completed.append(call)
+
+        return completed
+
+    def get_calls(self) -> list:
+        """Every call seen so far, in stream order."""
+        return [self.calls[key] for key in sorted(self.calls)]
+
+
+class StreamTimer:
+    """
+    Latency of one streamed call: time to first token (from the moment the
+    request is sent) and generation speed after the first token.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.end = None
+        self.chunks = 0
+
+    def tick(self) -> None:
+        """Mark that a text or tool call delta was received."""
+        self.chunks += 1
+
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def stop(self) -> None:
+        self.end = time.perf_counter()
+
+    def metrics(
+        self,
+        tokens: dict | None = None,
+        text: str = "",
+        provider: str | None = None,
+        model: str | None = None,
+    ) -> dict:
+        end = self.end or time.perf_counter()
+        ttft = self.first_token - self.start if self.first_token else None
+
+        completion_tokens = (tokens or {}).get("completion_tokens")
+
+        if not completion_tokens:
+            completion_tokens = count_text_tokens(text, provider, model)
+
+        generation = end - (self.first_token or self.start)
+
+        return {
+            "ttft": ttft,
+            "duration": end - self.start,
+            "chunks": self.chunks,
+            "completion_tokens": completion_tokens,
+            "tokens_per_second": (
+                completion_tokens / generation if generation > 0 else None
+            ),
+        }
+
+
+def is_stream(response: tp.Any) -> bool:
+    """Whether an API response is a raw stream rather than a final output."""
+    if response is None or isinstance(response, (str, bytes, dict, list)):
+        return False
+
+    return hasattr(response, "__iter__") or hasattr(response, "__aiter__")
+
+
+def _chunk_events(api: tp.Any, chunk: tp.Any, timer: StreamTimer) -> list:
+    events = []
+
+    if deltas := get_tool_call_deltas(chunk):
+        for delta in deltas:
+            events.append({"type": "tool_call", **delta})
+    else:
+        text = api.process_stream_chunk(chunk)
+
+        if text:
+            events.append({"type": "text", "text": text})
+
+    if events:
+        timer.tick()
+
+    for index in get_tool_call_stops(chunk):
+        events.append({"type": "tool_call_end", "index": index})
+
+    return events
+
+
+def iter_stream(api: tp.Any, response: tp.Any, timer: StreamTimer) -> tp.Iterator:
+    """
+    Yield text and tool call events from a raw provider stream, letting the
+    API parse each chunk (and pick up the final usage) on the way.
+    """
+    try:
+        for chunk in response:
+            yield from _chunk_events(api, chunk, timer)
+    finally:
+        timer.stop()
+
+
+async def aiter_stream(
+    api: tp.Any, response: tp.Any, timer: StreamTimer
+) -> tp.AsyncIterator:
+    """Async version of `iter_stream`, for async or sync raw streams."""
+    try:
+        if hasattr(response, "__aiter__"):
+            async for chunk in response:
+                for event in _chunk_events(api, chunk, timer):
+                    yield event
+        else:
+            for chunk in response:
+                for event in _chunk_events(api, chunk, timer):
+                    yield event
+    finally:
+        timer.stop()
@@ -1,7 +1,204 @@
-from copy import deepcopy
-
-from typing import Any
+import asyncio
+import contextvars
+import time
+
+from copy import copy
+
+from typing import Any, AsyncIterator, Iterator
+from repenseai.genai.cache import make_key
+from repenseai.genai.history import snapshot
+from repenseai.genai.hooks import NOOP_SPAN, span, span_tokens
+from repenseai.genai.memory import BaseMemory
+from repenseai.genai.streaming import (
+    StreamTimer,
+    ToolCallAssembler,
+    aiter_stream,
+    is_stream,
+    iter_stream,
+)
 from repenseai.genai.tasks.base import BaseTask
+from repenseai.genai.template import compile_template
+from repenseai.genai.tokens import trim_messages
+from repenseai.utils.agent import get_tool_executor
+from repenseai.utils.logs import logger
+
+
+CACHEABLE_MODEL_TYPES = ("chat", "vision")
+STREAMING_MODEL_TYPES = ("chat", "vision")
+
+
+def _get_cache(agent: Any, api: Any) -> Any:
+    cache = getattr(agent, "cache", None)
+
+    if cache is None or agent.model_type not in CACHEABLE_MODEL_TYPES:
+        return None
+
+    if getattr(api, "stream", False):
+        return None
+
+    return cache
+
+
+def _cache_scope(agent: Any, api: Any) -> str:
+    return make_key(
+        provider=agent.provider,
+        model=agent.model,
+        model_type=agent.model_type,
+        temperature=getattr(api, "temperature", None),
+        max_tokens=getattr(api, "max_tokens", None),
+        tools=getattr(api, "json_tools", None) or getattr(api, "tools", None),
+        json_schema=getattr(api, "json_schema", None),
+    )
+
+
+def _restore_from_cache(api: Any, hit: dict) -> Any:
+    api.tokens = hit["tokens"]
+    api.tool_flag = False
+
+    return hit["response"]
+
+
+def _stream_done(agent: Any, api: Any, text: str, timer: StreamTimer) -> dict:
+    return {
+        "type": "done",
+        "response": text,
+        "tokens": api.tokens,
+        "cost": agent.calculate_cost(api.tokens),
+        "metrics": timer.metrics(api.tokens, text, agent.provider, agent.model),
+    }
+
+
+def _tool_call_done(call: dict) -> dict:
+    return {
+        "type": "tool_call_done",
+        "id": call.get("id"),
+        "name": call.get("name"),
+        "input": call.get("input"),
+    }
+
+
+def _check_stream_tools(agent: Any, api: Any) -> None:
+    if not hasattr(api, "run_tool_call"):
+        raise Exception(f"Streaming tool calls not supported for {agent.provider}")
+
+
+def _record_metrics(agent: Any, api: Any, start: float, response: Any) -> None:
+    store = getattr(agent, "metrics_store", None)
+
+    # A stream is timed by Task.stream: here it only just opened
+    if store is None or getattr(api, "stream", False):
+        return
+
+    latency = time.perf_counter() - start
+    ok = response is not None
+
+    # A failed call has no usage: api.tokens is the one of the previous call
+    store.record(agent.provider, agent.model, latency, ok, api.tokens if ok else None)
+
+
+def _get_hooks(agent: Any, hooks: list | None) -> tuple:
+    return tuple(getattr(agent, "hooks", None) or ()) + tuple(hooks or ())
+
+
+def _span_attributes(agent: Any) -> dict:
+    return {
+        "provider": agent.provider,
+        "model": agent.model,
+        "model_type": agent.model_type,
+    }
+
+
+def _finish_api_span(
+    current: Any, agent: Any, api: Any, cached: bool, response: Any
+) -> None:
+    if current is NOOP_SPAN:
+        return
+
+    # Stream usage is only known once the stream is consumed
+    tokens = None if getattr(api, "stream", False) else api.tokens
+
+    current.set(cached=cached, ok=response is not None, **span_tokens(tokens))
+
+    if tokens and not cached:
+        current.set(cost=agent.calculate_cost(tokens))
+
+
+def _add_usage(current: Any, response: Any) -> None:
+    """Add the tokens and cost of one API call to the totals of a task span."""
+    if current is NOOP_SPAN or not isinstance(response, dict):
+        return
+
+    usage = span_tokens(response.get("tokens"))
+
+    if isinstance(response.get("cost"), (int, float)):
+        usage["cost"] = response["cost"]
+
+    current.set(
+        **{key: current.attributes.get(key, 0) + value for key, value in usage.items()}
+    )
+
+
+OVERFLOW_POLICIES = (None, "raise", "trim")
+
+
+def _get_tools(api: Any) -> list | None:
+    return getattr(api, "json_tools", None) or None
+
+
+def _completion_budget(api: Any) -> int:
+    return getattr(api, "max_tokens", None) or 0
+
+
+def _prompt_limit(agent: Any, api: Any, max_prompt_tokens: int | None) -> int | None:
+    """Prompt tokens available: the context window minus the reply budget."""
+    if max_prompt_tokens:
+        return max_prompt_tokens
+
+    get_context_window = getattr(agent, "get_context_window", None)
+    window = get_context_window() if get_context_window else None
+
+    if not window:
+        return None
+
+    return window - _completion_budget(api)
+
+
+def _fit_prompt(task: Any) -> None:
+    """Raise or trim the task prompt, per `on_overflow`, when it does not fit."""
+    limit = _prompt_limit(task.agent, task.api, task.max_prompt_tokens)
+
+    if limit is None or not isinstance(task.prompt, list):
+        return
+
+    tools = _get_tools(task.api)
+    tokens = task.agent.count_tokens(task.prompt, tools)
+
+    if tokens <= limit:
+        return
+
+    if task.on_overflow == "trim":
+        agent = task.agent
+        trimmed = trim_messages(task.prompt, limit, agent.provider, agent.model, tools)
+
+        if len(trimmed) < len(task.prompt):
+            logger(f"Prompt trimmed from {len(task.prompt)} to {len(trimmed)} messages")
+
+            task.prompt[:] = trimmed
+            tokens = task.agent.count_tokens(task.prompt, tools)
+
+    if tokens > limit:
+        raise ValueError(
+            f"Prompt has {tokens} tokens, over the {limit} available for {task.agent.model}"
+        )
+
+
+def _store_in_cache(
+    cache: Any, scope: str, request: tuple, api: Any, response: Any
+) -> None:
+    if response is None or getattr(api, "tool_flag", False):
+        return
+
+    cache.store(scope, request, {"response": response, "tokens": api.tokens})
 
 
 class Task(BaseTask):
@@ -16,8 +213,16 @@ class Task(BaseTask):
         audio_key: str = "audio",
         speech_key: str = "speech",
         base_image_key: str = "base_image",
+        hooks: list | None = None,
+        on_overflow: str | None = None,
+        max_prompt_tokens: int | None = None,
+        memory: BaseMemory | None = None,
+        strict_template: bool = False,
     ) -> None:
 
+        if on_overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"on_overflow must be one of {OVERFLOW_POLICIES}")
+
         self.user = user
         self.history = history
 
@@ -28,19 +233,22 @@ class Task(BaseTask):
         self.audio_key = audio_key
         self.speech_key = speech_key
         self.base_image_key = base_image_key
+        self.hooks = hooks
+
+        self.on_overflow = on_overflow
+        self.max_prompt_tokens = max_prompt_tokens
+        self.memory = memory
+        self.strict_template = strict_template
 
         self.prompt = None
+        self.cached = False
+        self.metrics = None
         self.api = self.agent.get_api()
 
-    def __replace_tokens(self, text: str, tokens: dict) -> str:
-        for key, value in tokens.items():
-            text = text.replace("{" + key + "}", str(value))
-
-        return text
-
     def __build_prompt(self, **kwargs):
         if self.user:
-            content = self.__replace_tokens(self.user, kwargs)
+            template = compile_template(self.user)
+            content = template.render(kwargs, strict=self.strict_template)
             self.prompt = [
                 {"role": "user", "content": [{"type": "text", "text": content}]}
             ]
@@ -52,10 +260,95 @@ class Task(BaseTask):
 
         return self.prompt
 
+    def _build_prompt(self, context: dict | None = None) -> list:
+        """Prompt of the task for `context`, built on first use."""
+        if not self.prompt:
+            self.__build_prompt(**(context or {}))
+
+        return self.prompt
+
+    def count_tokens(self, context: dict | None = None) -> int:
+        """Prompt tokens of the next call (prompt and tools), counted locally."""
+        prompt = self._build_prompt(context)
+
+        return self.agent.count_tokens(prompt, _get_tools(self.api))
+
+    def fits_context(self, context: dict | None = None) -> bool:
+        """Whether the prompt and the reply budget fit the context window."""
+        limit = _prompt_limit(self.agent, self.api, self.max_prompt_tokens)
+
+        return limit is None or self.count_tokens(context) <= limit
+
+    def estimate_cost(
+        self, context: dict | None = None, completion_tokens: int | None = None
+    ) -> float:
+        """
+        Predicted cost of the next call, before sending it. The reply is
+        assumed to use `completion_tokens`, by default the whole `max_tokens`.
+        """
+        if completion_tokens is None:
+            completion_tokens = _completion_budget(self.api)
+
+        return self.agent.calculate_cost(
+            {
+                "prompt_tokens": self.count_tokens(context),
+                "completion_tokens": completion_tokens,
+            }
+        )
+
+    def _call_api(self, *args) -> Any:
+        hooks = _get_hooks(self.agent, self.hooks)
+
+        with span("api.call", hooks, **_span_attributes(self.agent)) as current:
+            response = self.__request(*args)
+            _finish_api_span(current, self.agent, self.api, self.cached, response)
+
+        return response
+
+    def __request(self, *args) -> Any:
+        cache = _get_cache(self.agent, self.api)
+
+        if cache is not None:
+            scope = _cache_scope(self.agent, self.api)
+
+            if (hit := cache.lookup(scope, args)) is not None:
+                self.cached = True
+                return _restore_from_cache(self.api, hit)
+
+        rate_limiter = getattr(self.agent, "rate_limiter", None)
+
+        if rate_limiter is not None:
+            ticket = rate_limiter.acquire(
+                self.agent.provider, self.agent.model, args[0]
+            )
+
+        start = time.perf_counter()
+
+        try:
+            response = self.api.call_api(*args)
+        except Exception:
+            _record_metrics(self.agent, self.api, start, None)
+            raise
+
+        # A failed call keeps its reservation: api.tokens is stale
+        if rate_limiter is not None and response is not None:
+            if not getattr(self.api, "stream", False):
+                rate_limiter.record(ticket, self.api.tokens)
+
+        _record_metrics(self.agent, self.api, start, response)
+
+        if cache is not None:
+            _store_in_cache(cache, scope, args, self.api, response)
+
+        return response
+
     def __process_chat_or_search(self) -> dict:
-        prompt = deepcopy(self.prompt)
+        if self.on_overflow:
+            _fit_prompt(self)
 
-        response = self.api.call_api(prompt)
+        prompt = snapshot(self.prompt)
+
+        response = self._call_api(prompt)
 
         final_response = {
             "response": response,
@@ -69,11 +362,11 @@ class Task(BaseTask):
         return final_response
 
     def __process_vision(self, context: dict) -> dict:
-        prompt = deepcopy(self.prompt)
+        prompt = snapshot(self.prompt)
 
         image = context.get(self.vision_key)
 
-        response = self.api.call_api(prompt, image)
+        response = self._call_api(prompt, image)
 
         return {
             "response": response,
@@ -84,7 +377,7 @@ class Task(BaseTask):
     def __process_audio(self, context: dict) -> dict:
         audio = context.get(self.audio_key)
 
-        response = self.api.call_api(audio)
+        response = self._call_api(audio)
 
         return {
             "response": response,
@@ -94,7 +387,7 @@ class Task(BaseTask):
 
     def __process_speech(self, context: dict) -> dict:
         speech = context.get(self.speech_key)
-        response = self.api.call_api(speech)
+        response = self._call_api(speech)
 
         return {
             "response": response,
@@ -106,7 +399,7 @@ class Task(BaseTask):
         image = context.get(self.base_image_key)
         user = self.prompt[-1]["content"][0]["text"]
 
-        response = self.api.call_api(user, image)
+        response = self._call_api(user, image)
 
         return {
             "response": response,
@@ -115,47 +408,183 @@ class Task(BaseTask):
         }
 
     def _process_api_call(self, context: dict) -> dict:
+        self.cached = False
+
         match self.agent.model_type:
             case "chat" | "search":
-                return self.__process_chat_or_search()
+                response = self.__process_chat_or_search()
             case "vision":
-                return self.__process_vision(context)
+                response = self.__process_vision(context)
             case "audio":
-                return self.__process_audio(context)
+                response = self.__process_audio(context)
             case "speech":
-                return self.__process_speech(context)
+                response = self.__process_speech(context)
             case "image":
-                return self.__process_image(context)
+                response = self.__process_image(context)
+            case _:
+                return None
+
+        if self.cached:
+            response["cost"] = 0
+
+        return response
 
     def run(self, context: dict | None = None) -> str:
         if not context:
             context = {}
 
-        try:
+        hooks = _get_hooks(self.agent, self.hooks)
+
+        with span("task.run", hooks, **_span_attributes(self.agent)) as current:
             if not self.prompt:
-                self.__build_prompt(**context)
+                with span("prompt.build"):
+                    self.__build_prompt(**context)
 
             response = self._process_api_call(context)
+            _add_usage(current, response)
 
             if self.agent.model_type == "chat":
 
                 while self.api.tool_flag:
-                    tools_response = self.api.process_tool_calls(response["response"])
+                    with span("tool.calls"):
+                        tools_response = self.api.process_tool_calls(
+                            response["response"]
+                        )
 
                     self.prompt.append(response["response"])
                     self.prompt += tools_response
 
                     response = self._process_api_call(context)
+                    _add_usage(current, response)
 
             self.prompt.append({"role": "assistant", "content": response["response"]})
 
-            if self.simple_response:
-                return response["response"]
+            if self.memory is not None:
+                self.prompt = self.memory.compact(self.prompt, self.agent)
+
+        if self.simple_response:
+            return response["response"]
+
+        return response
 
-            return response
+    def stream(self, context: dict | None = None) -> Iterator[dict]:
+        """
+        Run the task streaming the answer, whatever the provider.
 
-        except Exception as e:
-            raise e
+        Yields events as they arrive:
+            {"type": "text", "text": ...}
+            {"type": "tool_call", "index", "id", "name", "arguments"}
+            {"type": "tool_call_done", "id", "name", "input"}
+            {"type": "tool_results", "results": [...]}
+        and finally
+            {"type": "done", "response", "tokens", "cost", "metrics"}
+
+        Tool calls are assembled from the streamed deltas and each one starts
+        running as soon as its arguments are complete; the follow-up turn is
+        streamed once every tool of the turn has returned.
+
+        `metrics` (also kept in `self.metrics`) has the time to first token
+        (`ttft`), the total `duration` and the generation `tokens_per_second`
+        of the last streamed call.
+        """
+        if not context:
+            context = {}
+
+        if self.agent.model_type not in STREAMING_MODEL_TYPES:
+            raise Exception(f"Streaming not available for {self.agent.model_type}")
+
+        if not self.prompt:
+            self.__build_prompt(**context)
+
+        running = []
+
+        try:
+            while True:
+                stream = self.api.stream
+                self.api.stream = True
+
+                timer = StreamTimer()
+
+                try:
+                    response = self._process_api_call(context)["response"]
+                finally:
+                    self.api.stream = stream
+
+                if not is_stream(response):
+                    # i.e. structured outputs, which providers never stream
+                    timer.tick()
+                    timer.stop()
+
+                    if getattr(self.api, "tool_flag", False):
+                        self.prompt.append(response)
+                        self.prompt += self.api.process_tool_calls(response)
+                        continue
+
+                    text = response
+                    yield {"type": "text", "text": text}
+                    break
+
+                text = ""
+                assembler = ToolCallAssembler()
+                running = []
+
+                def start(calls: list) -> Iterator[dict]:
+                    for call in calls:
+                        _check_stream_tools(self.agent, self.api)
+                        future = get_tool_executor().submit(
+                            contextvars.copy_context().run, self.api.run_tool_call, call
+                        )
+                        running.append((call, future))
+
+                        yield _tool_call_done(call)
+
+                for event in iter_stream(self.api, response, timer):
+                    match event["type"]:
+                        case "text":
+                            text += event["text"]
+                            yield event
+                        case "tool_call":
+                            yield from start(assembler.add(event))
+                            yield event
+                        case "tool_call_end":
+                            yield from start(assembler.close(event["index"]))
+
+                yield from start(assembler.close())
+
+                if not running:
+                    break
+
+                calls = [call for call, _ in running]
+                results = [future.result() for _, future in running]
+
+                self.prompt.append(self.api.build_tool_call_message(calls, text))
+                self.prompt += self.api.build_tool_results(results)
+
+                yield {"type": "tool_results", "results": results}
+        finally:
+            # The consumer stopped early: do not leave tools running
+            for _, future in running:
+                future.cancel()
+
+        self.prompt.append({"role": "assistant", "content": text})
+
+        if self.memory is not None:
+            self.prompt = self.memory.compact(self.prompt, self.agent)
+
+        done = _stream_done(self.agent, self.api, text, timer)
+        self.metrics = done["metrics"]
+
+        yield done
+
+    def clone(self) -> "Task":
+        """Return a copy that shares the configuration but not the conversation."""
+        task = copy(self)
+
+        task.prompt = None
+        task.api = self.agent.get_api()
+        task.memory = self.memory.clone() if self.memory else None
+
+        return task
 
     def add_user_message(self, message: str) -> None:
         if not self.prompt:
@@ -181,24 +610,36 @@ class AsyncTask(BaseTask):
         user: str = "",
         simple_response: bool = False,
         history: list | None = None,
+        hooks: list | None = None,
+        on_overflow: str | None = None,
+        max_prompt_tokens: int | None = None,
+        memory: BaseMemory | None = None,
+        strict_template: bool = False,
     ) -> None:
 
+        if on_overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"on_overflow must be one of {OVERFLOW_POLICIES}")
+
         self.user = user
         self.history = history
         self.agent = agent
         self.simple_response = simple_response
+        self.hooks = hooks
+
+        self.on_overflow = on_overflow
+        self.max_prompt_tokens = max_prompt_tokens
+        self.memory = memory
+        self.strict_template = strict_template
 
         self.prompt = None
+        self.cached = False
+        self.metrics = None
         self.api = None
 
-    def __replace_tokens(self, text: str, tokens: dict) -> str:
-        for key, value in tokens.items():
-            text = text.replace("{" + key + "}", str(value))
-        return text
-
     def __build_prompt(self, **kwargs):
         if self.user:
-            content = self.__replace_tokens(self.user, kwargs)
+            template = compile_template(self.user)
+            content = template.render(kwargs, strict=self.strict_template)
             self.prompt = [
                 {"role": "user", "content": [{"type": "text", "text": content}]}
             ]
@@ -210,13 +651,209 @@ class AsyncTask(BaseTask):
 
         return self.prompt
 
-    async def __process_chat(self) -> dict:
-        prompt = deepcopy(self.prompt)
+    def _build_prompt(self, context: dict | None = None) -> list:
+        """Prompt of the task for `context`, built on first use."""
+        if not self.prompt:
+            self.__build_prompt(**(context or {}))
+
+        return self.prompt
+
+    def count_tokens(self, context: dict | None = None) -> int:
+        """Prompt tokens of the next call (prompt and tools), counted locally."""
+        prompt = self._build_prompt(context)
+
+        return self.agent.count_tokens(prompt, _get_tools(self.api))
+
+    def fits_context(self, context: dict | None = None) -> bool:
+        """Whether the prompt and the reply budget fit the context window."""
+        limit = _prompt_limit(self.agent, self.api, self.max_prompt_tokens)
+
+        return limit is None or self.count_tokens(context) <= limit
+
+    def estimate_cost(
+        self, context: dict | None = None, completion_tokens: int | None = None
+    ) -> float:
+        """
+        Predicted cost of the next call, before sending it. The reply is
+        assumed to use `completion_tokens`, by default the whole `max_tokens`.
+        """
+        if completion_tokens is None:
+            completion_tokens = _completion_budget(self.api)
+
+        return self.agent.calculate_cost(
+            {
+                "prompt_tokens": self.count_tokens(context),
+                "completion_tokens": completion_tokens,
+            }
+        )
+
+    def clone(self) -> "AsyncTask":
+        """Return a copy that shares the configuration but not the conversation."""
+        task = copy(self)
+
+        task.prompt = None
+        task.api = None
+        task.memory = self.memory.clone() if self.memory else None
+
+        return task
+
+    async def _acall_api(self, *args) -> Any:
+        hooks = _get_hooks(self.agent, self.hooks)
+
+        with span("api.call", hooks, **_span_attributes(self.agent)) as current:
+            response = await self.__request(*args)
+            _finish_api_span(current, self.agent, self.api, self.cached, response)
+
+        return response
+
+    async def __request(self, *args) -> Any:
+        cache = _get_cache(self.agent, self.api)
+
+        if cache is not None:
+            scope = _cache_scope(self.agent, self.api)
+
+            if (hit := cache.lookup(scope, args)) is not None:
+                self.cached = True
+                return _restore_from_cache(self.api, hit)
+
+        rate_limiter = getattr(self.agent, "rate_limiter", None)
+
+        if rate_limiter is not None:
+            ticket = await rate_limiter.aacquire(
+                self.agent.provider, self.agent.model, args[0]
+            )
+
+        start = time.perf_counter()
+
+        try:
+            response = await self.api.call_api(*args)
+        except Exception:
+            _record_metrics(self.agent, self.api, start, None)
+            raise
+
+        # A failed call keeps its reservation: api.tokens is stale
+        if rate_limiter is not None and response is not None:
+            if not getattr(self.api, "stream", False):
+                rate_limiter.record(ticket, self.api.tokens)
+
+        _record_metrics(self.agent, self.api, start, response)
+
+        if cache is not None:
+            _store_in_cache(cache, scope, args, self.api, response)
+
+        return response
+
+    async def stream(self, context: dict | None = None) -> AsyncIterator[dict]:
+        """Async version of `Task.stream`, for chat models."""
+        if not context:
+            context = {}
+
+        if not self.prompt:
+            self.__build_prompt(**context)
 
         if not self.api:
             self.api = await self.agent.get_api()
 
-        response = await self.api.call_api(prompt)
+        running = []
+
+        try:
+            while True:
+                stream = self.api.stream
+                self.api.stream = True
+
+                timer = StreamTimer()
+
+                try:
+                    response = (await self._process_api_call(context))["response"]
+                finally:
+                    self.api.stream = stream
+
+                if not is_stream(response):
+                    timer.tick()
+                    timer.stop()
+
+                    if self.api.tool_flag:
+                        self.prompt.append(response)
+                        self.prompt += await self.api.process_tool_calls(response)
+                        continue
+
+                    text = response
+                    yield {"type": "text", "text": text}
+                    break
+
+                text = ""
+                assembler = ToolCallAssembler()
+                running = []
+
+                def start(calls: list) -> list:
+                    events = []
+
+                    for call in calls:
+                        _check_stream_tools(self.agent, self.api)
+                        task = asyncio.create_task(self.api.run_tool_call(call))
+                        running.append((call, task))
+
+                        events.append(_tool_call_done(call))
+
+                    return events
+
+                async for event in aiter_stream(self.api, response, timer):
+                    match event["type"]:
+                        case "text":
+                            text += event["text"]
+                            yield event
+                        case "tool_call":
+                            for done in start(assembler.add(event)):
+                                yield done
+
+                            yield event
+                        case "tool_call_end":
+                            for done in start(assembler.close(event["index"])):
+                                yield done
+
+                for done in start(assembler.close()):
+                    yield done
+
+                if not running:
+                    break
+
+                calls = [call for call, _ in running]
+                results = await asyncio.gather(*[task for _, task in running])
+
+                self.prompt.append(self.api.build_tool_call_message(calls, text))
+                self.prompt += self.api.build_tool_results(results)
+
+                yield {"type": "tool_results", "results": results}
+        finally:
+            # The consumer stopped early: do not leave tools running
+            for _, task in running:
+                task.cancel()
+
+        self.prompt.append({"role": "assistant", "content": text})
+
+        if self.memory is not None:
+            self.prompt = await self.memory.acompact(self.prompt, self.agent)
+
+        server_manager = getattr(self.agent, "server_manager", None)
+
+        if server_manager and not getattr(server_manager, "persistent", False):
+            await server_manager.cleanup()
+
+        done = _stream_done(self.agent, self.api, text, timer)
+        self.metrics = done["metrics"]
+
+        yield done
+
+    async def __process_chat(self) -> dict:
+        if not self.api:
+            self.api = await self.agent.get_api()
+
+        if self.on_overflow:
+            _fit_prompt(self)
+
+        prompt = snapshot(self.prompt)
+
+        response = await self._acall_api(prompt)
 
         final_response = {
             "response": response,
@@ -227,41 +864,59 @@ class AsyncTask(BaseTask):
         return final_response
 
     async def _process_api_call(self, context: dict) -> dict:
+        self.cached = False
+
         match self.agent.model_type:
             case "chat":
-                return await self.__process_chat()
+                response = await self.__process_chat()
             case _:
                 raise NotImplementedError(
                     f"Model type {self.agent.model_type} not implemented for async"
                 )
 
+        if self.cached:
+            response["cost"] = 0
+
+        return response
+
     async def run(self, context: dict | None = None) -> str:
         if not context:
             context = {}
 
-        try:
+        hooks = _get_hooks(self.agent, self.hooks)
+
+        with span("task.run", hooks, **_span_attributes(self.agent)) as current:
             if not self.prompt:
-                self.__build_prompt(**context)
+                with span("prompt.build"):
+                    self.__build_prompt(**context)
 
             response = await self._process_api_call(context)
+            _add_usage(current, response)
 
             while self.api.tool_flag:
-                tools_response = await self.api.process_tool_calls(response["response"])
+                with span("tool.calls"):
+                    tools_response = await self.api.process_tool_calls(
+                        response["response"]
+                    )
 
                 self.prompt.append(response["response"])
                 self.prompt += tools_response
 
                 response = await self._process_api_call(context)
+                _add_usage(current, response)
 
             self.prompt.append({"role": "assistant", "content": response["response"]})
 
-            if hasattr(self.agent, "server_manager") and self.agent.server_manager:
-                await self.agent.server_manager.cleanup()
+            if self.memory is not None:
+                self.prompt = await self.memory.acompact(self.prompt, self.agent)
+
+            server_manager = getattr(self.agent, "server_manager", None)
 
-            if self.simple_response:
-                return response["response"]
+            # Persistent managers (ServerPool) keep their servers warm
+            if server_manager and not getattr(server_manager, "persistent", False):
+                await server_manager.cleanup()
 
-            return response
+        if self.simple_response:
+            return response["response"]
 
-        except Exception as e:
-            raise e
+        return response
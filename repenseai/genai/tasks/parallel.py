@@ -1,17 +1,33 @@
-from typing import List
+from typing import Any, AsyncIterator, List, Tuple
+import asyncio
 import concurrent.futures
+import contextvars
 
+from repenseai.genai.hooks import span
 from repenseai.genai.tasks.base import BaseTask
 from repenseai.utils.logs import logger
 
 
+def _replicate_task(task: BaseTask, count: int) -> List[BaseTask]:
+    """
+    Replicate a single task for a list of contexts.
+
+    Tasks that keep conversation state (Task / AsyncTask) are cloned, so each
+    context builds its own prompt instead of reusing the first one.
+    """
+    if count <= 1 or not hasattr(task, "clone"):
+        return [task for _ in range(count)]
+
+    return [task] + [task.clone() for _ in range(count - 1)]
+
+
 class ParallelTask(BaseTask):
     """
     A Workflow step that executes multiple tasks in parallel.
 
     It initializes with a list of tasks and executes all of them in parallel
-    using a thread pool. Results from all tasks are merged into a single
-    dictionary and returned.
+    using a thread pool. Results are returned in the same order as the tasks
+    (or contexts); a task that raises yields None in its position.
 
     This implementation doesn't use async functions and relies on
     concurrent.futures for parallel execution.
@@ -20,14 +36,20 @@ class ParallelTask(BaseTask):
     def __init__(
         self,
         tasks: BaseTask | List[BaseTask],
+        max_workers: int | None = None,
+        hooks: list | None = None,
     ):
         """
         Initialize the ParallelTask with a list of tasks.
 
         Args:
             tasks: List of BaseTask objects to execute in parallel
+            max_workers: Maximum number of threads, defaults to the executor default
+            hooks: Span hooks of this step and of the tasks it runs
         """
         self.tasks = tasks
+        self.max_workers = max_workers
+        self.hooks = hooks
 
     def _execute_task(self, task, context):
         """Helper method to execute a single task with the given context."""
@@ -35,47 +57,182 @@ class ParallelTask(BaseTask):
 
     def run(self, context: List[dict] | dict | None = None) -> list:
         """
-        Execute all tasks in parallel and merge their results.
+        Execute all tasks in parallel.
 
         Args:
-            context: Dictionary containing data for task execution
+            context: Dictionary shared by all tasks, or a list with one
+                dictionary per task
 
         Returns:
-            If merge_strategy is 'update': A merged dictionary with results from all tasks
-            If merge_strategy is 'return_all': A list of individual task results
+            A list with the result of each task, in input order
         """
         if not context:
             context = {}
 
-        if not isinstance(self.tasks, list):
-            self.tasks = [
-                self.tasks
-                for _ in range(len(context) if isinstance(context, list) else 1)
-            ]
+        tasks = self.tasks
+        if not isinstance(tasks, list):
+            tasks = _replicate_task(
+                tasks, len(context) if isinstance(context, list) else 1
+            )
+
+        results = []
+
+        with span("parallel.run", self.hooks, tasks=len(tasks)):
+            results = self.__run(tasks, context)
+
+        return results
 
+    def __run(self, tasks: List[BaseTask], context: List[dict] | dict) -> list:
         results = []
 
         # Use ThreadPoolExecutor to run tasks in parallel
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            # Submit all tasks to the executor
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+            # Submit all tasks to the executor, in this context so their spans
+            # are children of the parallel step
+            def submit(task, ctx):
+                return executor.submit(
+                    contextvars.copy_context().run, self._execute_task, task, ctx
+                )
 
             if isinstance(context, list):
-                future_to_task = {
-                    executor.submit(self._execute_task, task, context[i]): task
-                    for i, task in enumerate(self.tasks)
-                }
+                futures = [submit(task, context[i]) for i, task in enumerate(tasks)]
             else:
-                future_to_task = {
-                    executor.submit(self._execute_task, task, context): task
-                    for task in self.tasks
-                }
+                futures = [submit(task, context) for task in tasks]
 
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_task):
+            # Collect results in submission order
+            for future in futures:
                 try:
-                    result = future.result()
-                    results.append(result)
+                    results.append(future.result())
                 except Exception as e:
                     logger(f"Task generated an exception: {e}")
+                    results.append(None)
+
+        return results
+
+
+class AsyncParallelTask(BaseTask):
+    """
+    An async Workflow step that executes multiple tasks concurrently.
+
+    Tasks are fanned out over asyncio, with at most `max_concurrency` of them
+    in flight at the same time. `run` returns the results in input order,
+    while `stream` yields `(index, result)` pairs as soon as each one
+    completes. A task that raises or exceeds `timeout` yields None.
+
+    Cancelling `run` (or closing `stream`) cancels every pending task.
+    """
+
+    def __init__(
+        self,
+        tasks: BaseTask | List[BaseTask],
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+        hooks: list | None = None,
+    ):
+        """
+        Initialize the AsyncParallelTask.
+
+        Args:
+            tasks: A task to replicate for every context, or a list of tasks
+            max_concurrency: Maximum number of tasks running at once
+            timeout: Per task timeout in seconds
+            hooks: Span hooks of this step and of the tasks it runs
+        """
+        self.tasks = tasks
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.hooks = hooks
+
+    def _build_jobs(self, context: List[dict] | dict) -> List[Tuple[BaseTask, dict]]:
+        if isinstance(context, list):
+            if isinstance(self.tasks, list):
+                tasks = self.tasks
+            else:
+                tasks = _replicate_task(self.tasks, len(context))
+
+            return [(task, context[i]) for i, task in enumerate(tasks)]
+
+        tasks = self.tasks if isinstance(self.tasks, list) else [self.tasks]
+        return [(task, context) for task in tasks]
+
+    async def _execute_task(
+        self,
+        index: int,
+        task: BaseTask,
+        context: dict,
+        semaphore: asyncio.Semaphore | None,
+    ) -> Tuple[int, Any]:
+        """Helper method to execute a single task, honoring limits."""
+
+        async def execute():
+            return await asyncio.wait_for(
+                task.run(context.copy() if context else {}), self.timeout
+            )
+
+        try:
+            if semaphore is None:
+                return index, await execute()
+
+            async with semaphore:
+                return index, await execute()
+
+        except asyncio.TimeoutError:
+            logger(f"Task {index} timed out after {self.timeout} seconds")
+        except Exception as e:
+            logger(f"Task generated an exception: {e}")
+
+        return index, None
+
+    async def stream(
+        self, context: List[dict] | dict | None = None
+    ) -> AsyncIterator[Tuple[int, Any]]:
+        """
+        Execute all tasks and yield `(index, result)` as they complete.
+
+        Args:
+            context: Dictionary shared by all tasks, or a list with one
+                dictionary per task
+        """
+        if not context:
+            context = {}
+
+        semaphore = None
+        if self.max_concurrency:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        pending = [
+            asyncio.ensure_future(self._execute_task(i, task, ctx, semaphore))
+            for i, (task, ctx) in enumerate(self._build_jobs(context))
+        ]
+
+        try:
+            for future in asyncio.as_completed(pending):
+                yield await future
+        finally:
+            for future in pending:
+                if not future.done():
+                    future.cancel()
+
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run(self, context: List[dict] | dict | None = None) -> list:
+        """
+        Execute all tasks concurrently.
+
+        Args:
+            context: Dictionary shared by all tasks, or a list with one
+                dictionary per task
+
+        Returns:
+            A list with the result of each task, in input order
+        """
+        if not context:
+            context = {}
+
+        results = [None] * len(self._build_jobs(context))
+
+        with span("parallel.run", self.hooks, tasks=len(results)):
+            async for index, result in self.stream(context):
+                results[index] = result
 
         return results
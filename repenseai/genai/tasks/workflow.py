@@ -1,3 +1,13 @@
+import asyncio
+import contextlib
+import contextvars
+import inspect
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Set
+
+from repenseai.genai.hooks import span
 from repenseai.genai.tasks.base import BaseTask
 from repenseai.utils import logs
 
@@ -8,8 +18,9 @@ class AsyncWorkflow(BaseTask):
     Steps are executed in sequence, but each step can be an async task.
     """
 
-    def __init__(self, steps):
+    def __init__(self, steps, hooks: list | None = None):
         self.steps = steps
+        self.hooks = hooks
 
     async def run(self, context: dict | None = None):
         """
@@ -24,43 +35,395 @@ class AsyncWorkflow(BaseTask):
         if not context:
             context = {}
 
-        for step in self.steps:
-            try:
-                if isinstance(step[0], BaseTask):
-                    if step[1] is None:
-                        await step[0].run(context)
-                    else:
-                        context[step[1]] = await step[0].run(context)
-                else:
-                    context[step[1]] = await step[0](context)
+        with span("workflow.run", self.hooks, steps=len(self.steps)):
+            for step in self.steps:
+                try:
+                    with span("workflow.step", step=str(step[1])):
+                        if isinstance(step[0], BaseTask):
+                            if step[1] is None:
+                                await step[0].run(context)
+                            else:
+                                context[step[1]] = await step[0].run(context)
+                        else:
+                            context[step[1]] = await step[0](context)
 
-            except Exception as e:
-                logs.logger(f"step {step[1]} -> Error: {e}")
+                except Exception as e:
+                    logs.logger(f"step {step[1]} -> Error: {e}")
 
         return context
 
 
 class Workflow(BaseTask):
 
-    def __init__(self, steps):
+    def __init__(self, steps, hooks: list | None = None):
         self.steps = steps
+        self.hooks = hooks
 
     def run(self, context: dict | None = None):
 
         if not context:
             context = {}
 
-        for step in self.steps:
-            try:
-                if isinstance(step[0], BaseTask):
-                    if step[1] is None:
-                        step[0].run(context)
-                    else:
-                        context[step[1]] = step[0].run(context)
+        with span("workflow.run", self.hooks, steps=len(self.steps)):
+            for step in self.steps:
+                try:
+                    with span("workflow.step", step=str(step[1])):
+                        if isinstance(step[0], BaseTask):
+                            if step[1] is None:
+                                step[0].run(context)
+                            else:
+                                context[step[1]] = step[0].run(context)
+                        else:
+                            context[step[1]] = step[0](context)
+
+                except Exception as e:
+                    logs.logger(f"step {step[1]} -> Erro: {e}")
+
+        return context
+
+
+class Step:
+    """
+    A DAG workflow step: a task (or a function of the context) that reads
+    the context keys in `reads` and stores its result in `writes`.
+
+    `reads=None` means the step may read anything, so it waits for every
+    step declared before it. `writes=None` discards the result.
+    """
+
+    def __init__(
+        self,
+        task: Any,
+        writes: str | None = None,
+        reads: List[str] | None = None,
+        name: str | None = None,
+    ):
+        self.task = task
+        self.writes = writes
+        self.reads = list(reads) if reads is not None else None
+        self.name = name or writes or getattr(task, "__name__", type(task).__name__)
+
+    def __repr__(self) -> str:
+        return f"Step({self.name!r}, writes={self.writes!r}, reads={self.reads!r})"
+
+
+def _to_step(step: Any) -> Step:
+    if isinstance(step, Step):
+        return step
+
+    # (task, writes) or (task, writes, reads) tuples
+    return Step(*step)
+
+
+def build_graph(steps: List[Step]) -> List[Set[int]]:
+    """
+    Dependencies of each step: the indexes of the steps writing the keys it
+    reads. Keys nobody writes come from the initial context.
+
+    Raises:
+        ValueError: when two steps write the same key or the steps form a cycle
+    """
+    writers = {}
+
+    for index, step in enumerate(steps):
+        if step.writes is None:
+            continue
+
+        if step.writes in writers:
+            other = steps[writers[step.writes]].name
+            raise ValueError(
+                f"Steps {other} and {step.name} both write '{step.writes}'"
+            )
+
+        writers[step.writes] = index
+
+    dependencies = []
+
+    for index, step in enumerate(steps):
+        if step.reads is None:
+            dependencies.append(set(range(index)))
+        else:
+            dependencies.append(
+                {writers[key] for key in step.reads if key in writers} - {index}
+            )
+
+    # Kahn's algorithm: whatever cannot be ordered is part of a cycle
+    remaining = {index: set(deps) for index, deps in enumerate(dependencies)}
+    ready = [index for index, deps in remaining.items() if not deps]
+
+    while ready:
+        done = ready.pop()
+        del remaining[done]
+
+        for index, deps in remaining.items():
+            if done in deps:
+                deps.discard(done)
+
+                if not deps:
+                    ready.append(index)
+
+    if remaining:
+        names = ", ".join(steps[index].name for index in sorted(remaining))
+        raise ValueError(f"Workflow has a dependency cycle between steps: {names}")
+
+    return dependencies
+
+
+def critical_path(
+    steps: List[Step], dependencies: List[Set[int]], durations: Dict[int, float]
+) -> dict:
+    """
+    Longest chain of dependent steps by duration: the lower bound of the
+    workflow time however many steps run at once.
+    """
+    finish = {}
+    previous = {}
+
+    # The graph has no cycles: every pass places at least one step
+    pending = list(range(len(steps)))
+
+    while pending:
+        for index in list(pending):
+            if not dependencies[index] <= finish.keys():
+                continue
+
+            before = max(dependencies[index], key=finish.get, default=None)
+
+            start = finish[before] if before is not None else 0.0
+            finish[index] = start + durations.get(index, 0.0)
+            previous[index] = before
+
+            pending.remove(index)
+
+    path = []
+    index = max(finish, key=finish.get, default=None)
+
+    while index is not None:
+        path.append(steps[index].name)
+        index = previous[index]
+
+    return {
+        "critical_path": path[::-1],
+        "critical_path_duration": max(finish.values(), default=0.0),
+        "steps": {steps[index].name: durations.get(index) for index in finish},
+        "sequential_duration": sum(durations.values()),
+    }
+
+
+class _DagBase(BaseTask):
+    def __init__(self, steps: List[Any], hooks: list | None = None):
+        self.steps = [_to_step(step) for step in steps]
+        self.dependencies = build_graph(self.steps)
+        self.hooks = hooks
+
+        self.report = None
+
+    def _ready(self, done: Set[int], started: Set[int], failed: Set[int]) -> list:
+        """Steps whose dependencies are done; those of failed steps are skipped."""
+        ready = []
+        index = 0
+
+        while index < len(self.steps):
+            dependencies = self.dependencies[index]
+
+            if index in started or not dependencies <= done:
+                index += 1
+                continue
+
+            if dependencies & failed:
+                # Its inputs are missing: skip it, then look again from the start
+                logs.logger(f"step {self.steps[index].name} -> Skipped")
+
+                started.add(index)
+                failed.add(index)
+                done.add(index)
+
+                ready, index = [], 0
+                continue
+
+            ready.append(index)
+            index += 1
+
+        return ready
+
+    def _store(self, context: dict, index: int, result: Any) -> None:
+        step = self.steps[index]
+
+        if step.writes is not None:
+            context[step.writes] = result
+
+    def _finish(self, durations: dict, failed: set, start: float) -> dict:
+        self.report = critical_path(self.steps, self.dependencies, durations)
+        self.report["duration"] = time.perf_counter() - start
+        self.report["failed"] = [self.steps[index].name for index in sorted(failed)]
+
+        return self.report
+
+
+class DagWorkflow(_DagBase):
+    """
+    Workflow that runs its steps as a dependency graph: each step starts as
+    soon as the steps writing the keys it reads are done, so independent
+    steps run at the same time in a thread pool.
+
+    Every step gets a copy of the context as it was when it started. A step
+    that fails is logged and the steps depending on it are skipped. After a
+    run, `report` holds the duration of each step and the critical path.
+
+    Example:
+        workflow = DagWorkflow([
+            Step(summary_task, writes="summary", reads=["text"]),
+            Step(keywords_task, writes="keywords", reads=["text"]),
+            Step(title_task, writes="title", reads=["summary", "keywords"]),
+        ])
+        context = workflow.run({"text": "..."})
+    """
+
+    def __init__(
+        self,
+        steps: List[Any],
+        max_workers: int | None = None,
+        hooks: list | None = None,
+    ):
+        super().__init__(steps, hooks)
+        self.max_workers = max_workers
+
+    def __run_step(self, index: int, context: dict) -> tuple:
+        step = self.steps[index]
+        start = time.perf_counter()
+
+        with span("workflow.step", step=step.name):
+            if isinstance(step.task, BaseTask):
+                result = step.task.run(context)
+            else:
+                result = step.task(context)
+
+        return result, time.perf_counter() - start
+
+    def run(self, context: dict | None = None) -> dict:
+        if not context:
+            context = {}
+
+        start = time.perf_counter()
+
+        done, started, failed = set(), set(), set()
+        durations = {}
+        pending = {}
+
+        with span("workflow.run", self.hooks, steps=len(self.steps)):
+            with ThreadPoolExecutor(self.max_workers) as executor:
+                while len(done) < len(self.steps):
+                    for index in self._ready(done, started, failed):
+                        started.add(index)
+
+                        future = executor.submit(
+                            contextvars.copy_context().run,
+                            self.__run_step,
+                            index,
+                            context.copy(),
+                        )
+                        pending[future] = index
+
+                    if not pending:
+                        break
+
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                    for future in finished:
+                        index = pending.pop(future)
+                        done.add(index)
+
+                        try:
+                            result, durations[index] = future.result()
+                            self._store(context, index, result)
+                        except Exception as e:
+                            failed.add(index)
+                            logs.logger(f"step {self.steps[index].name} -> Erro: {e}")
+
+        self._finish(durations, failed, start)
+
+        return context
+
+
+class AsyncDagWorkflow(_DagBase):
+    """
+    Async version of DagWorkflow: independent steps run concurrently on the
+    event loop, at most `max_concurrency` at a time.
+    """
+
+    def __init__(
+        self,
+        steps: List[Any],
+        max_concurrency: int | None = None,
+        hooks: list | None = None,
+    ):
+        super().__init__(steps, hooks)
+        self.max_concurrency = max_concurrency
+
+    async def __run_step(self, index: int, context: dict, semaphore: Any) -> tuple:
+        step = self.steps[index]
+
+        async with semaphore:
+            start = time.perf_counter()
+
+            with span("workflow.step", step=step.name):
+                if isinstance(step.task, BaseTask):
+                    result = await step.task.run(context)
                 else:
-                    context[step[1]] = step[0](context)
+                    result = step.task(context)
+
+                    if inspect.isawaitable(result):
+                        result = await result
+
+        return result, time.perf_counter() - start
+
+    async def run(self, context: dict | None = None) -> dict:
+        if not context:
+            context = {}
+
+        start = time.perf_counter()
+
+        if self.max_concurrency:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+        else:
+            semaphore = contextlib.nullcontext()
+
+        done, started, failed = set(), set(), set()
+        durations = {}
+        pending = {}
+
+        with span("workflow.run", self.hooks, steps=len(self.steps)):
+            try:
+                while len(done) < len(self.steps):
+                    for index in self._ready(done, started, failed):
+                        started.add(index)
+
+                        job = asyncio.create_task(
+                            self.__run_step(index, context.copy(), semaphore)
+                        )
+                        pending[job] = index
+
+                    if not pending:
+                        break
+
+                    finished, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+
+                    for job in finished:
+                        index = pending.pop(job)
+                        done.add(index)
+
+                        try:
+                            result, durations[index] = job.result()
+                            self._store(context, index, result)
+                        except Exception as e:
+                            failed.add(index)
+                            logs.logger(f"step {self.steps[index].name} -> Error: {e}")
+            finally:
+                for job in pending:
+                    job.cancel()
 
-            except Exception as e:
-                logs.logger(f"step {step[1]} -> Erro: {e}")
+        self._finish(durations, failed, start)
 
         return context
@@ -0,0 +1,90 @@
+import functools
+import re
+
+import typing as tp
+
+
+# A placeholder is any text between braces, i.e. {name} or {user-id}
+PLACEHOLDER = re.compile(r"\{([^{}]+)\}")
+
+TEMPLATE_CACHE_SIZE = 256
+
+
+class PromptTemplate:
+    """
+    Prompt with `{key}` placeholders, parsed once.
+
+    `render` builds the text in a single pass and only formats the context
+    values the template references, so large values (lists, images,
+    DataFrames) passed along a Workflow are never turned into strings when
+    the prompt does not use them. Placeholders missing from the context are
+    kept as they are, like literal braces (i.e. JSON examples).
+
+    Example:
+        template = PromptTemplate("Translate {text} to {language}")
+        template.render({"text": "Olá", "language": "English"})
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+        self.literals = []
+        self.keys = []
+
+        start = 0
+
+        for match in PLACEHOLDER.finditer(text):
+            end = match.start()
+
+            self.literals.append(text[start:end])
+            self.keys.append(match.group(1))
+            start = match.end()
+
+        self.literals.append(text[start:])
+
+        # Referenced keys, in order of first use
+        self.fields = tuple(dict.fromkeys(self.keys))
+
+    def missing(self, context: tp.Mapping | None = None) -> list:
+        """Placeholders of the template that `context` does not fill."""
+        context = context or {}
+
+        return [key for key in self.fields if key not in context]
+
+    def render(self, context: tp.Mapping | None = None, strict: bool = False) -> str:
+        """
+        Text with the placeholders replaced by the `context` values. With
+        `strict=True` a placeholder missing from the context raises a
+        ValueError instead of being kept (literal braces count as
+        placeholders, so strict templates should not contain them).
+        """
+        context = context or {}
+
+        if strict and (missing := self.missing(context)):
+            raise ValueError(f"Missing template keys: {', '.join(missing)}")
+
+        values = {}
+
+        for key in self.fields:
+            if key in context:
+                value = context[key]
+                values[key] = value if isinstance(value, str) else str(value)
+            else:
+                values[key] = "{" + key + "}"
+
+        parts = [self.literals[0]]
+
+        for key, literal in zip(self.keys, self.literals[1:]):
+            parts.append(values[key])
+            parts.append(literal)
+
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return f"PromptTemplate({self.text!r})"
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(text: str) -> PromptTemplate:
+    """Parsed template of a text, shared by every task using the same text."""
+    return PromptTemplate(text)
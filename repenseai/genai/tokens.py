@@ -0,0 +1,231 @@
+import functools
+import json
+
+import typing as tp
+
+
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_IMAGE = 765
+
+# Tokens the provider adds to prime the reply
+TOKENS_PER_REPLY = 3
+
+# Characters per token of the provider tokenizers on English / Portuguese
+# text, measured against the usage they report. Used when no local
+# tokenizer is available.
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+CHARS_PER_TOKEN = {
+    "anthropic": 3.5,
+    "google": 4.0,
+    "openai": 4.0,
+    "deepseek": 3.8,
+    "mistral": 3.6,
+    "cohere": 4.0,
+}
+
+# Context window (prompt + completion tokens) by model name prefix; the
+# longest matching prefix wins.
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_047_576,
+    "o1": 200_000,
+    "o1-mini": 128_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+    "claude": 200_000,
+    "gemini": 1_048_576,
+    "gemini-1.5-pro": 2_097_152,
+    "deepseek": 64_000,
+    "sabia-3": 128_000,
+    "sabiazinho-3": 32_000,
+    "mistral-large": 128_000,
+    "mistral-small": 32_000,
+    "pixtral": 128_000,
+    "command-r": 128_000,
+    "llama": 128_000,
+    "meta-llama": 128_000,
+    "qwen2-vl": 32_768,
+    "mistral-7b": 32_768,
+    "grok-2": 131_072,
+    "grok-2-vision": 32_768,
+    "grok-3": 131_072,
+    "grok-vision-beta": 8_192,
+    "amazon.nova-pro": 300_000,
+    "amazon.nova-lite": 300_000,
+    "amazon.nova-micro": 128_000,
+    "palmyra-med": 32_768,
+    "sonar": 128_000,
+    "sonar-pro": 200_000,
+}
+
+
+def get_context_window(model: str) -> int | None:
+    """Context window of a model in tokens, None when unknown."""
+    name = model.lower().split("/")[-1]
+
+    matches = [prefix for prefix in CONTEXT_WINDOWS if name.startswith(prefix)]
+
+    if not matches:
+        return None
+
+    return CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(provider: str | None, model: str | None) -> tp.Any:
+    """
+    Local tokenizer of a model: tiktoken for OpenAI models, when the
+    optional `tiktoken` package is installed. None otherwise.
+    """
+    if provider != "openai":
+        return None
+
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Recent models all share the GPT-4o tokenizer
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_text_tokens(
+    text: str, provider: str | None = None, model: str | None = None
+) -> int:
+    """Tokens of a text for a provider / model."""
+    if not text:
+        return 0
+
+    if (encoding := get_encoding(provider, model)) is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    chars_per_token = CHARS_PER_TOKEN.get(provider, DEFAULT_CHARS_PER_TOKEN)
+
+    return int(len(text) / chars_per_token) + 1
+
+
+def _count(item: tp.Any, count_text: tp.Callable[[str], int]) -> int:
+    if item is None:
+        return 0
+
+    if isinstance(item, str):
+        return count_text(item)
+
+    if isinstance(item, (bytes, bytearray)):
+        return TOKENS_PER_IMAGE
+
+    if isinstance(item, list):
+        return sum(_count(part, count_text) for part in item)
+
+    if isinstance(item, dict):
+        if item.get("type") in ("image", "image_url", "input_image"):
+            return TOKENS_PER_IMAGE
+
+        tokens = TOKENS_PER_MESSAGE if "role" in item else 0
+
+        for key, value in item.items():
+            if key in ("content", "text", "thinking"):
+                tokens += _count(value, count_text)
+            elif key in ("tool_calls", "input", "arguments"):
+                tokens += count_text(json.dumps(value, default=str))
+
+        return tokens
+
+    return count_text(str(item))
+
+
+def count_tokens(
+    messages: tp.Any,
+    provider: str | None = None,
+    model: str | None = None,
+    tools: list | None = None,
+) -> int:
+    """
+    Prompt tokens of `messages` (a prompt string or a list of messages) and
+    of the `tools` definitions, counted locally before sending them.
+
+    OpenAI models are counted exactly with tiktoken when it is installed;
+    other providers use calibrated characters per token estimates.
+    """
+    count_text = functools.partial(count_text_tokens, provider=provider, model=model)
+
+    tokens = _count(messages, count_text)
+
+    if isinstance(messages, list) and messages:
+        tokens += TOKENS_PER_REPLY
+
+    if tools:
+        tokens += count_text(json.dumps(tools, default=str))
+
+    return tokens
+
+
+def is_system_message(message: tp.Any) -> bool:
+    return isinstance(message, dict) and message.get("role") in ("system", "developer")
+
+
+def is_tool_result(message: tp.Any) -> bool:
+    if not isinstance(message, dict):
+        return False
+
+    if message.get("role") == "tool":
+        return True
+
+    content = message.get("content")
+
+    return isinstance(content, list) and any(
+        isinstance(part, dict) and part.get("type") == "tool_result" for part in content
+    )
+
+
+def trim_messages(
+    messages: list,
+    max_tokens: int,
+    provider: str | None = None,
+    model: str | None = None,
+    tools: list | None = None,
+) -> list:
+    """
+    Drop the oldest messages until the prompt fits in `max_tokens`.
+
+    Leading system messages and the last message are always kept, and the
+    kept conversation starts with a user message that is not a tool result,
+    so tool calls stay paired with their results. The result can still be
+    too long when what is always kept does not fit.
+    """
+    count_text = functools.partial(count_text_tokens, provider=provider, model=model)
+
+    total = count_tokens(messages, provider, model, tools)
+
+    if total <= max_tokens:
+        return messages
+
+    sizes = [_count(message, count_text) for message in messages]
+
+    system = 0
+
+    while system < len(messages) - 1 and is_system_message(messages[system]):
+        system += 1
+
+    start = system
+
+    while start < len(messages) - 1:
+        first = messages[start]
+
+        starts_turn = (
+            isinstance(first, dict)
+            and first.get("role") == "user"
+            and not is_tool_result(first)
+        )
+
+        if total <= max_tokens and starts_turn:
+            break
+
+        total -= sizes[start]
+        start += 1
+
+    return messages[:system] + messages[start:]
@@ -1,6 +1,22 @@
+import asyncio
+import contextvars
 import inspect
+import json
+import threading
+
+import typing as tp
+
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from repenseai.genai.hooks import span
+
+
+TOOL_WORKERS = 16
+
+_tool_executor = None
+_tool_executor_lock = threading.Lock()
+
 
 def debug_print(debug: bool, *args: str) -> None:
     if not debug:
@@ -75,3 +91,97 @@ def function_to_json(func) -> dict:
             },
         },
     }
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for sync tool calls, created on first use."""
+    global _tool_executor
+
+    with _tool_executor_lock:
+        if _tool_executor is None:
+            _tool_executor = ThreadPoolExecutor(
+                max_workers=TOOL_WORKERS, thread_name_prefix="repenseai-tool"
+            )
+
+    return _tool_executor
+
+
+def run_tools(calls: tp.List[tp.Callable[[], tp.Any]]) -> tp.List[tp.Any]:
+    """
+    Run independent sync tool calls concurrently on the shared worker pool.
+
+    Results keep the order of `calls`; a call that raises returns its
+    exception instead, so one failing tool does not affect the others.
+    """
+
+    def run(call):
+        try:
+            return call()
+        except Exception as e:
+            return e
+
+    if len(calls) <= 1:
+        return [run(call) for call in calls]
+
+    # Each call runs in the caller context, so its spans keep their parent
+    executor = get_tool_executor()
+    futures = [executor.submit(contextvars.copy_context().run, run, c) for c in calls]
+
+    return [future.result() for future in futures]
+
+
+async def arun_tools(
+    calls: tp.List[tp.Callable[[], tp.Awaitable[tp.Any]]],
+) -> tp.List[tp.Any]:
+    """Async version of `run_tools`, running the coroutines with asyncio.gather."""
+    return list(
+        await asyncio.gather(*(call() for call in calls), return_exceptions=True)
+    )
+
+
+def call_function(function: tp.Callable, args: dict) -> tp.Any:
+    """Call a local tool, timed as a `tool.call` span."""
+    with span("tool.call", tool=getattr(function, "__name__", str(function))):
+        return function(**args)
+
+
+async def acall_function(function: tp.Callable, args: dict) -> tp.Any:
+    """
+    Call a local tool from async code: coroutine functions are awaited and
+    sync functions run in a worker thread so they do not block the loop.
+    """
+    with span("tool.call", tool=getattr(function, "__name__", str(function))):
+        if inspect.iscoroutinefunction(function):
+            return await function(**args)
+
+        output = await asyncio.to_thread(function, **args)
+
+        if inspect.isawaitable(output):
+            output = await output
+
+        return output
+
+
+def get_tool_input(call: dict) -> dict:
+    """
+    Arguments of a tool call: its parsed `input`, or its JSON `arguments`.
+    Raises ValueError when the model wrote malformed arguments, including a
+    streamed call whose `input` could not be parsed (None, i.e. truncated).
+    """
+    if "input" in call:
+        if call["input"] is None:
+            raise ValueError(f"malformed arguments: {call.get('arguments')!r}")
+
+        return call["input"]
+
+    return json.loads(call.get("arguments") or "{}")
+
+
+def call_tool(tools: dict, call: dict) -> tp.Any:
+    """Parse and run one tool call ({"name", "arguments"}) with local `tools`."""
+    return call_function(tools[call.get("name")], get_tool_input(call))
+
+
+async def acall_tool(tools: dict, call: dict) -> tp.Any:
+    """Async version of `call_tool`."""
+    return await acall_function(tools[call.get("name")], get_tool_input(call))
@@ -1,7 +1,44 @@
 import io
 import base64
+import hashlib
+import math
+import threading
 
-from PIL import Image
+from collections import OrderedDict
+
+from PIL import Image, features
+
+
+# Largest useful resolution of each provider: bigger images are downscaled
+# by the provider anyway, so sending them only costs bandwidth and CPU.
+IMAGE_LIMITS = {
+    "default": {"max_side": 2048, "formats": ("PNG", "JPEG")},
+    "openai": {
+        "max_side": 2048,
+        "short_side": 768,
+        "formats": ("PNG", "JPEG", "WEBP"),
+    },
+    "anthropic": {
+        "max_side": 1568,
+        "max_pixels": 1_150_000,
+        "formats": ("PNG", "JPEG", "WEBP"),
+    },
+    "aws": {"max_side": 1568, "max_pixels": 1_150_000, "formats": ("PNG", "JPEG")},
+    "google": {"max_side": 3072, "formats": ("PNG", "JPEG", "WEBP")},
+    "mistral": {"max_side": 1568, "formats": ("PNG", "JPEG", "WEBP")},
+    "together": {"max_side": 1568, "formats": ("PNG", "JPEG")},
+}
+
+MEDIA_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+GRAPHIC_COLORS = 256
+COLOR_SAMPLE_SIZE = 256
+PREPARED_CACHE_SIZE = 64
+
+_buffers = threading.local()
+
+_prepared = OrderedDict()
+_prepared_lock = threading.Lock()
 
 
 def display_base64_image(base64_str: str) -> None:
@@ -16,3 +53,212 @@ def display_bytes_image(image_bytes: bytes) -> None:
 
     image = Image.open(io.BytesIO(image_bytes))
     image.show()
+
+
+def get_image_limits(provider: str | None = None) -> dict:
+    return IMAGE_LIMITS.get(provider, IMAGE_LIMITS["default"])
+
+
+def get_target_size(size: tuple, provider: str | None = None) -> tuple:
+    """
+    Size of an image once fitted to the provider limits (aspect kept).
+    Images are only ever downscaled: upscaling a small image sends more
+    bytes without adding detail.
+    """
+    limits = get_image_limits(provider)
+    width, height = size
+
+    scale = min(1.0, limits["max_side"] / max(width, height))
+
+    if (short_side := limits.get("short_side")) and min(
+        width, height
+    ) * scale > short_side:
+        scale = short_side / min(width, height)
+
+    if max_pixels := limits.get("max_pixels"):
+        scale = min(scale, math.sqrt(max_pixels / (width * height)))
+
+    if scale >= 1.0:
+        return size
+
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def resize_image(image: Image.Image, provider: str | None = None) -> Image.Image:
+    """Downscale an image to the largest resolution the provider uses."""
+    size = get_target_size(image.size, provider)
+
+    if size == image.size:
+        return image
+
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def has_transparency(image: Image.Image) -> bool:
+    if image.mode in ("RGBA", "LA", "PA"):
+        return image.getchannel("A").getextrema()[0] < 255
+
+    return image.mode == "P" and "transparency" in image.info
+
+
+def is_graphic(image: Image.Image) -> bool:
+    """
+    Whether an image looks like a screenshot, chart or document rather than
+    a photo, i.e. has few distinct colors. Those compress better (and stay
+    legible) as PNG.
+    """
+    if image.mode in ("1", "P"):
+        return True
+
+    sample = image
+
+    if max(image.size) > COLOR_SAMPLE_SIZE:
+        sample = image.resize(
+            (min(image.width, COLOR_SAMPLE_SIZE), min(image.height, COLOR_SAMPLE_SIZE)),
+            Image.Resampling.NEAREST,
+        )
+
+    return sample.getcolors(maxcolors=GRAPHIC_COLORS) is not None
+
+
+def choose_format(image: Image.Image, provider: str | None = None) -> str:
+    """
+    PNG for graphics, JPEG for photos, and WebP (when the provider accepts
+    it) for photos with transparency, which JPEG can not store.
+    """
+    formats = get_image_limits(provider)["formats"]
+
+    if is_graphic(image):
+        return "PNG"
+
+    if has_transparency(image):
+        if "WEBP" in formats and features.check("webp"):
+            return "WEBP"
+
+        return "PNG"
+
+    return "JPEG"
+
+
+def _convert(image: Image.Image, format: str) -> Image.Image:
+    match format:
+        case "JPEG":
+            modes = ("RGB", "L")
+        case "WEBP":
+            modes = ("RGB", "RGBA")
+        case _:
+            modes = ("1", "L", "LA", "P", "RGB", "RGBA")
+
+    if image.mode in modes:
+        return image
+
+    if format != "JPEG" and has_transparency(image):
+        return image.convert("RGBA")
+
+    return image.convert("RGB")
+
+
+def _get_buffer() -> io.BytesIO:
+    # One buffer per thread, reused by every encode: no regrowth after warmup
+    buffer = getattr(_buffers, "buffer", None)
+
+    if buffer is None:
+        buffer = _buffers.buffer = io.BytesIO()
+
+    buffer.seek(0)
+    buffer.truncate()
+
+    return buffer
+
+
+def _digest(image: Image.Image) -> str:
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+    digest.update(f"{image.mode}{image.size}".encode())
+
+    return digest.hexdigest()
+
+
+def _encode(entry: dict, image: Image.Image, as_base64: bool, quality: int) -> None:
+    options = {"quality": quality} if entry["format"] in ("JPEG", "WEBP") else {}
+
+    buffer = _get_buffer()
+    image.save(buffer, format=entry["format"], **options)
+
+    if as_base64:
+        with buffer.getbuffer() as view:
+            entry["base64"] = base64.b64encode(view).decode("utf-8")
+    else:
+        entry["bytes"] = buffer.getvalue()
+
+
+def prepare_image(
+    image: Image.Image,
+    provider: str | None = None,
+    format: str | None = None,
+    quality: int = 90,
+    as_base64: bool = True,
+) -> dict:
+    """
+    Resize and encode a PIL image for a vision request.
+
+    The image is fitted to the provider limits (`IMAGE_LIMITS`), encoded as
+    PNG, JPEG or WebP (`choose_format`, unless `format` is given) into a
+    per-thread reusable buffer, and memoized by content hash, so the same
+    image sent again (batch jobs, retries, conversation history) is not
+    encoded twice.
+
+    Returns a dict with `format`, `media_type`, `width`, `height` and either
+    `base64` (str) or `bytes`, as requested by `as_base64`.
+    """
+    key = (_digest(image), provider, format, quality)
+
+    with _prepared_lock:
+        entry = _prepared.get(key)
+
+        if entry is not None:
+            _prepared.move_to_end(key)
+
+    if entry is None:
+        resized = resize_image(image, provider)
+        format = (format or choose_format(resized, provider)).upper()
+        resized = _convert(resized, format)
+
+        entry = {
+            "format": format,
+            "media_type": MEDIA_TYPES.get(format, f"image/{format.lower()}"),
+            "width": resized.width,
+            "height": resized.height,
+            "bytes": None,
+            "base64": None,
+        }
+
+        _encode(entry, resized, as_base64, quality)
+
+        with _prepared_lock:
+            _prepared[key] = entry
+
+            while len(_prepared) > PREPARED_CACHE_SIZE:
+                _prepared.popitem(last=False)
+
+    if as_base64 and entry["base64"] is None:
+        entry["base64"] = base64.b64encode(entry["bytes"]).decode("utf-8")
+    elif not as_base64 and entry["bytes"] is None:
+        entry["bytes"] = base64.b64decode(entry["base64"])
+
+    return entry
+
+
+def image_to_base64(image: Image.Image, provider: str | None = None) -> tuple:
+    """(base64 string, media type) of a prepared image."""
+    entry = prepare_image(image, provider)
+    return entry["base64"], entry["media_type"]
+
+
+def image_to_data_url(image: Image.Image, provider: str | None = None) -> str:
+    data, media_type = image_to_base64(image, provider)
+    return f"data:{media_type};base64,{data}"
+
+
+def clear_prepared_images() -> None:
+    with _prepared_lock:
+        _prepared.clear()
@@ -0,0 +1,104 @@
+import pytest
+import asyncio
+import time
+
+from repenseai.genai.tasks.function import AsyncFunctionTask, FunctionTask
+from repenseai.genai.tasks.parallel import AsyncParallelTask, ParallelTask
+
+
+async def delayed_echo(context):
+    await asyncio.sleep(context["delay"])
+    return context["value"]
+
+
+@pytest.mark.asyncio
+async def test_async_parallel_keeps_input_order():
+    task = AsyncParallelTask(AsyncFunctionTask(delayed_echo))
+    contexts = [{"delay": 0.05 * (5 - i), "value": i} for i in range(5)]
+
+    results = await task.run(contexts)
+
+    assert results == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_async_parallel_stream_yields_as_completed():
+    task = AsyncParallelTask(AsyncFunctionTask(delayed_echo))
+    contexts = [{"delay": 0.05 * (3 - i), "value": i} for i in range(3)]
+
+    indexes = [index async for index, _ in task.stream(contexts)]
+
+    assert indexes == [2, 1, 0]
+
+
+@pytest.mark.asyncio
+async def test_async_parallel_limits_concurrency():
+    running = 0
+    peak = 0
+
+    async def track(context):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return context["value"]
+
+    task = AsyncParallelTask(AsyncFunctionTask(track), max_concurrency=3)
+    results = await task.run([{"value": i} for i in range(20)])
+
+    assert results == list(range(20))
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_async_parallel_timeout_and_errors():
+    async def fail(context):
+        raise ValueError("boom")
+
+    task = AsyncParallelTask(
+        [
+            AsyncFunctionTask(delayed_echo),
+            AsyncFunctionTask(fail),
+            AsyncFunctionTask(delayed_echo),
+        ],
+        timeout=0.1,
+    )
+
+    results = await task.run(
+        [{"delay": 0, "value": "a"}, {}, {"delay": 1, "value": "c"}]
+    )
+
+    assert results == ["a", None, None]
+
+
+@pytest.mark.asyncio
+async def test_async_parallel_cancels_pending_tasks():
+    finished = []
+
+    async def slow(context):
+        await asyncio.sleep(context["delay"])
+        finished.append(context["value"])
+        return context["value"]
+
+    task = AsyncParallelTask(AsyncFunctionTask(slow))
+    stream = task.stream([{"delay": 0, "value": 0}, {"delay": 1, "value": 1}])
+
+    async for index, _ in stream:
+        break
+
+    await stream.aclose()
+    await asyncio.sleep(0)
+
+    assert finished == [0]
+
+
+def test_parallel_keeps_input_order():
+    def sleepy_echo(context):
+        time.sleep(context["delay"])
+        return context["value"]
+
+    task = ParallelTask(FunctionTask(sleepy_echo))
+    contexts = [{"delay": 0.05 * (4 - i), "value": i} for i in range(4)]
+
+    assert task.run(contexts) == [0, 1, 2, 3]
@@ -0,0 +1,52 @@
+import pytest
+import asyncio
+
+from tests.config import TEXT
+from repenseai.genai.agent import AsyncAgent
+from repenseai.genai.tasks.api import AsyncTask
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("model", TEXT)
+async def test_async_chat(model):
+
+    agent = AsyncAgent(
+        model=model,
+        model_type="chat",
+        temperature=0.0,
+        max_tokens=100,
+    )
+
+    task = AsyncTask(
+        user="Say 'Hello, World!'",
+        agent=agent,
+    )
+
+    response = await task.run({})
+
+    assert "world" in response.get("response").lower()
+    assert response.get("cost") > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("model", ["gpt-4o-mini", "claude-3-5-haiku-20241022"])
+async def test_async_chat_concurrent(model):
+
+    agent = AsyncAgent(
+        model=model,
+        model_type="chat",
+        temperature=0.0,
+        max_tokens=100,
+    )
+
+    tasks = [
+        AsyncTask(user="Say the number {number} and nothing else", agent=agent)
+        for _ in range(5)
+    ]
+
+    responses = await asyncio.gather(
+        *[task.run({"number": i}) for i, task in enumerate(tasks)]
+    )
+
+    for i, response in enumerate(responses):
+        assert str(i) in response.get("response")
@@ -0,0 +1,290 @@
+import json
+import pytest
+
+import httpx
+
+from anthropic import Anthropic
+from openai import OpenAI
+
+from repenseai.genai.agent import Agent
+from repenseai.genai.batch import BatchJob
+from repenseai.genai.tasks.api import Task
+
+
+WORDS = ["apple", "banana", "cherry"]
+
+
+def completion(text):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+    }
+
+
+def get_text(messages):
+    return messages[-1]["content"][0]["text"].split()[-1]
+
+
+class FakeOpenAIBatches:
+    """Files and Batches endpoints: answers each request with its last word."""
+
+    def __init__(self, polls=1):
+        self.polls = polls
+        self.uploads = []
+        self.retrieves = 0
+
+    def batch(self, status):
+        batch = {
+            "id": "batch_1",
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "input_file_id": "file-in",
+            "completion_window": "24h",
+            "created_at": 0,
+            "status": status,
+        }
+
+        if status == "completed":
+            batch["output_file_id"] = "file-out"
+
+        return batch
+
+    def handler(self, request):
+        path = request.url.path
+
+        if path == "/v1/files":
+            lines = [
+                json.loads(line)
+                for line in request.content.decode().splitlines()
+                if line.startswith("{")
+            ]
+            self.uploads.append(lines)
+
+            return httpx.Response(
+                200,
+                json={
+                    "id": "file-in",
+                    "object": "file",
+                    "bytes": len(request.content),
+                    "created_at": 0,
+                    "filename": "batch.jsonl",
+                    "purpose": "batch",
+                    "status": "processed",
+                },
+            )
+
+        if path == "/v1/batches":
+            return httpx.Response(200, json=self.batch("validating"))
+
+        if path == "/v1/batches/batch_1":
+            self.retrieves += 1
+            done = self.retrieves > self.polls
+
+            return httpx.Response(
+                200, json=self.batch("completed" if done else "in_progress")
+            )
+
+        if path == "/v1/files/file-out/content":
+            lines = [
+                {
+                    "id": f"req_{i}",
+                    "custom_id": line["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": completion(get_text(line["body"]["messages"]).upper()),
+                    },
+                    "error": None,
+                }
+                for i, line in enumerate(self.uploads[-1])
+            ]
+
+            return httpx.Response(200, text="\n".join(map(json.dumps, lines)))
+
+        return httpx.Response(404)
+
+
+def build_tasks(agent, client):
+    tasks = [Task(user="Repeat the word {word}", agent=agent) for _ in WORDS]
+    tasks[0].api.client = client
+
+    return tasks
+
+
+@pytest.fixture
+def openai_agent():
+    return Agent(model="gpt-4o-mini", model_type="chat", api_key="test")
+
+
+def openai_client(server):
+    return OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(server.handler)),
+    )
+
+
+def test_openai_batch_demultiplexes_results(openai_agent):
+    server = FakeOpenAIBatches(polls=2)
+    tasks = build_tasks(openai_agent, openai_client(server))
+
+    results = openai_agent.batch(
+        tasks, [{"word": word} for word in WORDS], poll_interval=0
+    )
+
+    assert [r["response"] for r in results] == ["APPLE", "BANANA", "CHERRY"]
+    assert results[0]["tokens"]["total_tokens"] == 12
+    assert results[0]["cost"] < openai_agent.calculate_cost(results[0]["tokens"])
+
+    upload = server.uploads[0]
+
+    assert [line["custom_id"] for line in upload] == ["task-0", "task-1", "task-2"]
+    assert upload[1]["url"] == "/v1/chat/completions"
+    assert "stream" not in upload[1]["body"]
+    assert tasks[2].prompt[-1] == {"role": "assistant", "content": "CHERRY"}
+
+
+def test_batch_resumes_from_saved_state(openai_agent, tmp_path):
+    path = str(tmp_path / "job.json")
+    context = [{"word": word} for word in WORDS]
+
+    server = FakeOpenAIBatches(polls=3)
+
+    with pytest.raises(Exception, match="resume"):
+        openai_agent.batch(
+            build_tasks(openai_agent, openai_client(server)),
+            context,
+            path=path,
+            poll_interval=0,
+            timeout=0,
+        )
+
+    with open(path) as file:
+        assert json.load(file)["batch_id"] == "batch_1"
+
+    results = openai_agent.batch(
+        build_tasks(openai_agent, openai_client(server)),
+        context,
+        path=path,
+        poll_interval=0,
+    )
+
+    assert [r["response"] for r in results] == ["APPLE", "BANANA", "CHERRY"]
+    assert len(server.uploads) == 1
+
+    # Another set of requests can not pick up this job
+    with pytest.raises(Exception, match="other requests"):
+        BatchJob.load(path, "another key")
+
+
+def anthropic_handler(request):
+    base = "https://api.anthropic.com/v1/messages/batches/msgbatch_1"
+
+    batch = {
+        "id": "msgbatch_1",
+        "type": "message_batch",
+        "processing_status": "ended",
+        "created_at": "2024-01-01T00:00:00Z",
+        "expires_at": "2024-01-02T00:00:00Z",
+        "ended_at": None,
+        "archived_at": None,
+        "cancel_initiated_at": None,
+        "results_url": f"{base}/results",
+        "request_counts": {
+            "processing": 0,
+            "succeeded": 1,
+            "errored": 1,
+            "canceled": 0,
+            "expired": 0,
+        },
+    }
+
+    if request.url.path.endswith("/results"):
+        lines = [
+            {
+                "custom_id": "task-0",
+                "result": {
+                    "type": "succeeded",
+                    "message": {
+                        "id": "msg_1",
+                        "type": "message",
+                        "role": "assistant",
+                        "model": "claude-3-5-haiku-20241022",
+                        "content": [{"type": "text", "text": "APPLE"}],
+                        "stop_reason": "end_turn",
+                        "stop_sequence": None,
+                        "usage": {"input_tokens": 10, "output_tokens": 2},
+                    },
+                },
+            },
+            {
+                "custom_id": "task-1",
+                "result": {
+                    "type": "errored",
+                    "error": {
+                        "type": "error",
+                        "error": {"type": "invalid_request_error", "message": "bad"},
+                    },
+                },
+            },
+        ]
+
+        return httpx.Response(200, text="\n".join(map(json.dumps, lines)))
+
+    return httpx.Response(200, json=batch)
+
+
+def test_anthropic_batch_reports_errors_per_task():
+    agent = Agent(model="claude-3-5-haiku-20241022", model_type="chat", api_key="test")
+    tasks = [Task(user="Repeat the word {word}", agent=agent) for _ in range(2)]
+
+    client = Anthropic(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(anthropic_handler)),
+    )
+
+    results = agent.batch(tasks, {"word": "apple"}, client=client, poll_interval=0)
+
+    assert results[0]["response"] == "APPLE"
+    assert results[0]["tokens"]["completion_tokens"] == 2
+    assert results[1]["response"] is None
+    assert "invalid_request_error" in results[1]["error"]
+
+
+def test_local_stand_in_runs_tasks(openai_agent, tmp_path):
+    def handler(request):
+        messages = json.loads(request.content)["messages"]
+        return httpx.Response(200, json=completion(get_text(messages).upper()))
+
+    client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    tasks = [
+        Task(user="Repeat the word {word}", agent=openai_agent, simple_response=True)
+        for _ in WORDS
+    ]
+
+    for task in tasks:
+        task.api.client = client
+
+    results = openai_agent.batch(
+        tasks,
+        [{"word": word} for word in WORDS],
+        local=True,
+        path=str(tmp_path / "local.json"),
+    )
+
+    assert results == ["APPLE", "BANANA", "CHERRY"]
@@ -0,0 +1,201 @@
+import pytest
+import time
+
+import numpy as np
+
+from repenseai.genai.agent import Agent
+from repenseai.genai.cache import (
+    CompletionCache,
+    IVFIndex,
+    SemanticCache,
+    VectorIndex,
+    make_key,
+)
+from repenseai.genai.tasks.api import Task
+
+
+def test_make_key_is_canonical():
+    key1 = make_key(model="gpt-4o", messages=[{"role": "user", "content": "Hi"}])
+    key2 = make_key(messages=[{"content": "Hi", "role": "user"}], model="gpt-4o")
+    key3 = make_key(model="gpt-4o", messages=[{"role": "user", "content": "Hey"}])
+
+    assert key1 == key2
+    assert key1 != key3
+
+
+def test_lru_eviction():
+    cache = CompletionCache(maxsize=2)
+
+    cache.set("a", {"response": 1})
+    cache.set("b", {"response": 2})
+    cache.get("a")
+    cache.set("c", {"response": 3})
+
+    assert cache.get("a") == {"response": 1}
+    assert cache.get("b") is None
+    assert cache.get("c") == {"response": 3}
+
+
+def test_ttl_expiration():
+    cache = CompletionCache(ttl=0.05)
+    cache.set("a", {"response": 1})
+
+    assert cache.get("a") is not None
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_persists(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    cache = CompletionCache(path=path)
+    cache.set("a", {"response": "Hello", "tokens": {"total_tokens": 3}})
+    cache.close()
+
+    cache = CompletionCache(path=path)
+    assert cache.get("a") == {"response": "Hello", "tokens": {"total_tokens": 3}}
+
+
+def test_unserializable_values_are_skipped():
+    cache = CompletionCache()
+
+    assert cache.set("a", {"response": object()}) is False
+    assert cache.get("a") is None
+
+
+@pytest.fixture(params=[CompletionCache, SemanticCache])
+def agent(request):
+    return Agent(
+        model="gpt-4o-mini",
+        model_type="chat",
+        api_key="test",
+        cache=request.param(),
+    )
+
+
+def test_task_hits_cache(agent):
+    calls = []
+
+    def patch(task):
+        def call_api(prompt):
+            calls.append(prompt)
+            task.api.tokens = {
+                "prompt_tokens": 10,
+                "completion_tokens": 5,
+                "total_tokens": 15,
+            }
+            return "Hello, World!"
+
+        task.api.call_api = call_api
+        return task
+
+    task = Task(user="Say hello to {name}", agent=agent)
+
+    response1 = patch(task.clone()).run({"name": "World"})
+    response2 = patch(task.clone()).run({"name": "World"})
+    response3 = patch(task.clone()).run({"name": "Mars"})
+
+    assert len(calls) == 2
+    assert response1["cost"] > 0
+    assert response2["cost"] == 0
+    assert response2["response"] == "Hello, World!"
+    assert response2["tokens"]["total_tokens"] == 15
+    assert response3["cost"] > 0
+    assert agent.cache.stats()["hits"] == 1
+
+
+def chat(text):
+    return ([{"role": "user", "content": [{"type": "text", "text": text}]}],)
+
+
+def test_semantic_cache_hits_near_duplicates():
+    cache = SemanticCache(threshold=0.8)
+    cache.store("scope", chat("How do I reset my password?"), {"response": "A"})
+
+    assert cache.lookup("scope", chat("how do i reset my password"))["response"] == "A"
+    assert cache.lookup("scope", chat("What are your opening hours?")) is None
+    assert cache.lookup("other", chat("How do I reset my password?")) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["mean_similarity"] >= 0.8
+
+
+def test_semantic_cache_skips_images():
+    cache = SemanticCache()
+    request = (
+        [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "Describe"},
+                    {"type": "image_url", "image_url": {"url": "data:..."}},
+                ],
+            }
+        ],
+    )
+
+    assert cache.store("scope", request, {"response": "A"}) is False
+    assert cache.lookup("scope", request) is None
+
+
+def test_ivf_index_matches_brute_force():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(600, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    flat = VectorIndex(32)
+    ivf = IVFIndex(32, n_lists=8, n_probe=8, train_size=200)
+
+    for vector in vectors:
+        flat.add(vector)
+        ivf.add(vector)
+
+    assert ivf.centroids is not None
+
+    for query in vectors[:20]:
+        assert ivf.search(query)[0][0] == flat.search(query)[0][0]
+
+
+def test_semantic_cache_eviction():
+    cache = SemanticCache(maxsize=10)
+
+    for i in range(25):
+        cache.store("scope", chat(f"question number {i}"), {"response": i})
+
+    assert cache.stats()["size"] <= 10
+    assert cache.lookup("scope", chat("question number 24"))["response"] == 24
+
+
+def support_chat(question):
+    system = "You are the support assistant of an online store. " * 40
+
+    return (
+        [
+            {"role": "system", "content": system},
+            {"role": "user", "content": [{"type": "text", "text": question}]},
+        ],
+    )
+
+
+def test_semantic_cache_matches_the_question_not_the_system_prompt():
+    cache = SemanticCache()
+    cache.store(
+        "scope", support_chat("Cancel my order 5512"), {"response": "Cancelled"}
+    )
+
+    refund = support_chat("Where is my refund for order 9911?")
+    assert cache.lookup("scope", refund) is None
+
+    # The same question under another system prompt is another context
+    assert cache.lookup("scope", chat("Cancel my order 5512")) is None
+    assert cache.lookup("scope", support_chat("cancel my order 5512!")) is not None
+
+
+def test_semantic_cache_requires_the_same_identifiers():
+    cache = SemanticCache(threshold=0.5)
+    cache.store("scope", chat("Cancel my order 5512"), {"response": "5512"})
+
+    assert cache.lookup("scope", chat("Cancel my order 5513")) is None
+    assert cache.lookup("scope", chat("Cancel my order #5512"))["response"] == "5512"
@@ -0,0 +1,100 @@
+import pytest
+import asyncio
+
+import httpx
+
+from openai import AsyncOpenAI, OpenAI
+
+from repenseai.genai.clients import ClientRegistry, close_clients, get_client
+from repenseai.genai.retry import RetryPolicy
+
+
+@pytest.fixture
+def registry():
+    registry = ClientRegistry(max_connections=10, keepalive_expiry=5.0)
+    yield registry
+    registry.close()
+
+
+def test_same_key_shares_client(registry):
+    client1 = registry.get_client("openai", OpenAI, api_key="key")
+    client2 = registry.get_client("openai", OpenAI, api_key="key")
+
+    assert client1 is client2
+
+
+def test_different_keys_get_different_clients(registry):
+    client1 = registry.get_client("openai", OpenAI, api_key="key")
+    client2 = registry.get_client("openai", OpenAI, api_key="other")
+    client3 = registry.get_client(
+        "x", OpenAI, api_key="key", base_url="https://api.x.ai/v1"
+    )
+
+    assert client1 is not client2
+    assert client1 is not client3
+
+
+def test_retry_policy_disables_sdk_retries(registry):
+    client = registry.get_client("openai", OpenAI, api_key="key")
+    retried = registry.get_client(
+        "openai", OpenAI, api_key="key", retry_policy=RetryPolicy()
+    )
+
+    assert client.max_retries == 2
+    assert retried.max_retries == 0 and retried is not client
+
+
+def test_pool_settings_are_applied(registry):
+    registry.configure(max_connections=3, max_keepalive_connections=2)
+    client = registry.get_http_client("perplexity")
+
+    assert isinstance(client, httpx.Client)
+    assert client._transport._pool._max_connections == 3
+    assert client._transport._pool._max_keepalive_connections == 2
+    assert client._transport._pool._keepalive_expiry == 5.0
+
+
+def test_unknown_setting_raises(registry):
+    with pytest.raises(ValueError):
+        registry.configure(pool_size=10)
+
+
+def test_async_clients_are_scoped_to_the_loop(registry):
+    async def get():
+        client1 = registry.get_client(
+            "openai", AsyncOpenAI, api_key="key", asynchronous=True
+        )
+        client2 = registry.get_client(
+            "openai", AsyncOpenAI, api_key="key", asynchronous=True
+        )
+        assert client1 is client2
+        return client1
+
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+
+    assert first is not second
+
+
+@pytest.mark.asyncio
+async def test_aclose_awaits_async_clients(registry):
+    client = registry.get_client(
+        "openai", AsyncOpenAI, api_key="key", asynchronous=True
+    )
+    http_client = registry.get_http_client("perplexity", asynchronous=True)
+    sync_client = registry.get_http_client("perplexity")
+
+    await registry.aclose()
+
+    assert client.is_closed() and http_client.is_closed and sync_client.is_closed
+    assert client is not registry.get_client(
+        "openai", AsyncOpenAI, api_key="key", asynchronous=True
+    )
+
+
+def test_close_clients_closes_async_clients():
+    client = get_client("openai", AsyncOpenAI, api_key="close", asynchronous=True)
+
+    close_clients()
+
+    assert client.is_closed()
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+import time
+
+from repenseai.genai.tasks.workflow import (
+    AsyncDagWorkflow,
+    DagWorkflow,
+    Step,
+    build_graph,
+)
+
+
+def slow(key, delay=0.2):
+    def step(context):
+        time.sleep(delay)
+        return f"{key}({','.join(str(context.get(k)) for k in sorted(context))})"
+
+    step.__name__ = key
+    return step
+
+
+def test_independent_steps_run_concurrently():
+    workflow = DagWorkflow(
+        [
+            Step(slow("summary"), writes="summary", reads=["text"]),
+            Step(slow("keywords"), writes="keywords", reads=["text"]),
+            Step(slow("sentiment"), writes="sentiment", reads=["text"]),
+            Step(slow("title", 0.1), writes="title", reads=["summary", "keywords"]),
+        ]
+    )
+
+    start = time.monotonic()
+    context = workflow.run({"text": "t"})
+
+    assert time.monotonic() - start < 0.5
+    assert context["summary"] == "summary(t)"
+    # Steps get the context as it was when they started
+    assert context["title"].startswith("title(") and "summary(t)" in context["title"]
+
+    report = workflow.report
+
+    assert report["critical_path"][-1] == "title"
+    assert report["critical_path"][0] in ("summary", "keywords")
+    assert report["critical_path_duration"] == pytest.approx(0.3, abs=0.1)
+    assert report["sequential_duration"] == pytest.approx(0.7, abs=0.1)
+
+
+def test_tuple_steps_and_undeclared_reads_run_in_order():
+    order = []
+
+    def record(name):
+        def step(context):
+            order.append(name)
+            return name
+
+        return step
+
+    workflow = DagWorkflow(
+        [
+            (record("a"), "a", []),
+            (record("b"), "b"),
+            (record("c"), "c", ["b"]),
+        ]
+    )
+
+    assert workflow.dependencies == [set(), {0}, {1}]
+    assert workflow.run() == {"a": "a", "b": "b", "c": "c"}
+    assert order == ["a", "b", "c"]
+
+
+def test_graph_errors():
+    with pytest.raises(ValueError, match="cycle"):
+        build_graph(
+            [
+                Step(len, writes="x", reads=["y"], name="first"),
+                Step(len, writes="y", reads=["x"], name="second"),
+            ]
+        )
+
+    with pytest.raises(ValueError, match="both write 'x'"):
+        build_graph([Step(len, writes="x"), Step(len, writes="x", reads=[])])
+
+
+def test_failed_step_skips_dependents():
+    workflow = DagWorkflow(
+        [
+            Step(lambda context: 1 / 0, writes="broken", reads=[]),
+            Step(lambda context: "ran", writes="after", reads=["broken"]),
+            Step(lambda context: "ok", writes="other", reads=[]),
+        ]
+    )
+
+    context = workflow.run()
+
+    assert context == {"other": "ok"}
+    assert workflow.report["failed"] == ["broken", "after"]
+
+
+@pytest.mark.asyncio
+async def test_async_dag_workflow():
+    async def fetch(context):
+        await asyncio.sleep(0.2)
+        return context["text"].upper()
+
+    def join(context):
+        return context["a"] + context["b"]
+
+    workflow = AsyncDagWorkflow(
+        [
+            Step(fetch, writes="a", reads=["text"]),
+            Step(fetch, writes="b", reads=["text"]),
+            Step(join, writes="joined", reads=["a", "b"]),
+        ]
+    )
+
+    start = time.monotonic()
+    context = await workflow.run({"text": "x"})
+
+    assert time.monotonic() - start < 0.35
+    assert context["joined"] == "XX"
+    assert workflow.report["critical_path"][-1] == "joined"
+
+    limited = AsyncDagWorkflow(workflow.steps, max_concurrency=1)
+
+    start = time.monotonic()
+    await limited.run({"text": "x"})
+
+    assert time.monotonic() - start >= 0.4
@@ -0,0 +1,97 @@
+import json
+
+import httpx
+
+from anthropic import Anthropic
+
+from repenseai.genai import images
+from repenseai.genai.agent import Agent
+from repenseai.genai.history import snapshot, snapshot_args
+from repenseai.genai.images import ImageCache
+from repenseai.genai.tasks.api import Task
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+IMAGE_URL = "http://images.test/a.png"
+
+
+def image_message():
+    return {
+        "role": "user",
+        "content": [
+            {"type": "image_url", "image_url": {"url": IMAGE_URL}},
+            {"type": "text", "text": "What is this?"},
+        ],
+    }
+
+
+def test_snapshot_shares_parts():
+    messages = [
+        {"role": "system", "content": "Be brief"},
+        image_message(),
+        {"role": "assistant", "content": "A square"},
+    ]
+
+    view = snapshot(messages)
+
+    assert view == messages and view is not messages
+    assert all(a is not b for a, b in zip(view, messages))
+    assert view[1]["content"] is not messages[1]["content"]
+    assert view[1]["content"][0] is messages[1]["content"][0]
+
+    view[1]["content"][0] = {"type": "image", "source": {}}
+    view.pop()
+
+    assert messages[1] == image_message() and len(messages) == 3
+
+    assert snapshot("Hello") == "Hello"
+    assert snapshot_args((messages, "image"))[1] == "image"
+
+
+def test_provider_rewrites_leave_the_prompt_intact(monkeypatch):
+    cache = ImageCache()
+    cache.set(IMAGE_URL, PNG)
+    monkeypatch.setattr(images, "image_cache", cache)
+
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+
+        return httpx.Response(
+            200,
+            json={
+                "id": "msg_1",
+                "type": "message",
+                "role": "assistant",
+                "model": "claude-3-5-sonnet-20241022",
+                "content": [{"type": "text", "text": "A black square"}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            },
+        )
+
+    agent = Agent(
+        model="claude-3-5-sonnet-20241022",
+        model_type="chat",
+        api_key="test",
+        prompt_cache=False,
+    )
+    task = Task(user="And now?", agent=agent, history=[image_message()])
+    task.api.client = Anthropic(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    task.run()
+    task.add_user_message("Thanks")
+    task.run()
+
+    # The provider sent base64 images, the prompt keeps the urls
+    for request in requests:
+        assert request["messages"][0]["content"][0]["type"] == "image"
+
+    assert task.prompt[0] == image_message()
+    assert len(task.prompt) == 5
@@ -0,0 +1,235 @@
+import json
+import pytest
+
+import httpx
+
+from openai import AsyncOpenAI, OpenAI
+
+from repenseai.genai.agent import Agent, AsyncAgent
+from repenseai.genai.hooks import (
+    InMemoryCollector,
+    OpenTelemetryExporter,
+    PrometheusExporter,
+    span,
+)
+from repenseai.genai.tasks.api import AsyncTask, Task
+from repenseai.genai.tasks.parallel import AsyncParallelTask, ParallelTask
+from repenseai.genai.tasks.workflow import AsyncWorkflow, Workflow
+
+
+def shout(text):
+    """upper case the text"""
+    return text.upper()
+
+
+def completion(message, prompt_tokens=10, completion_tokens=2):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", **message},
+                "finish_reason": "tool_calls" if "tool_calls" in message else "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def plug(task, tool_call=False):
+    responses = []
+
+    if tool_call:
+        call = {
+            "id": "call_0",
+            "type": "function",
+            "function": {"name": "shout", "arguments": json.dumps({"text": "hi"})},
+        }
+        responses.append(completion({"content": None, "tool_calls": [call]}))
+
+    responses.append(completion({"content": "HI"}))
+
+    def handler(request):
+        return httpx.Response(200, json=responses.pop(0))
+
+    task.api.client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+
+def test_task_spans_nest_and_carry_usage():
+    collector = InMemoryCollector()
+
+    agent = Agent(
+        model="gpt-4o-mini",
+        model_type="chat",
+        api_key="test",
+        tools=[shout],
+        hooks=[collector],
+    )
+    task = Task(user="Shout hi", agent=agent)
+    plug(task, tool_call=True)
+
+    response = task.run()
+
+    assert response["response"] == "HI"
+    assert [s.name for s in collector.get_spans()] == [
+        "prompt.build",
+        "api.call",
+        "tool.call",
+        "tool.calls",
+        "api.call",
+        "task.run",
+    ]
+
+    (run,) = collector.get_spans("task.run")
+    calls = collector.get_spans("api.call")
+    (tool,) = collector.get_spans("tool.call")
+
+    assert all(s.trace_id == run.span_id for s in collector.get_spans())
+    assert all(call.parent_id == run.span_id for call in calls)
+    assert tool.parent_id == collector.get_spans("tool.calls")[0].span_id
+    assert tool.attributes["tool"] == "shout"
+
+    assert calls[0].attributes["provider"] == "openai"
+    assert calls[0].attributes["prompt_tokens"] == 10
+    assert run.attributes["total_tokens"] == 24
+    assert run.attributes["cost"] == pytest.approx(
+        sum(call.attributes["cost"] for call in calls)
+    )
+
+
+def test_workflow_hooks_reach_task_spans():
+    collector = InMemoryCollector()
+
+    agent = Agent(model="gpt-4o-mini", model_type="chat", api_key="test")
+    tasks = [Task(user="Hi", agent=agent, simple_response=True) for _ in range(2)]
+
+    for task in tasks:
+        plug(task)
+
+    workflow = Workflow(
+        [
+            (ParallelTask(tasks), "answers"),
+            (lambda context: 1 / 0, "broken"),
+        ],
+        hooks=[collector],
+    )
+
+    assert workflow.run()["answers"] == ["HI", "HI"]
+
+    (run,) = collector.get_spans("workflow.run")
+    steps = collector.get_spans("workflow.step")
+    (parallel,) = collector.get_spans("parallel.run")
+
+    assert [s.attributes["step"] for s in steps] == ["answers", "broken"]
+    assert steps[1].error.startswith("ZeroDivisionError")
+    assert parallel.parent_id == steps[0].span_id
+    assert all(s.parent_id == parallel.span_id for s in collector.get_spans("task.run"))
+    assert len(collector.get_spans("api.call")) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_workflow_spans():
+    collector = InMemoryCollector()
+
+    async def handler(request):
+        return httpx.Response(200, json=completion({"content": "HI"}))
+
+    agent = AsyncAgent(model="gpt-4o-mini", model_type="chat", api_key="test")
+    tasks = []
+
+    for _ in range(2):
+        task = AsyncTask(user="Hi", agent=agent, simple_response=True)
+        task.api = await agent.get_api()
+        task.api.client = AsyncOpenAI(
+            api_key="test",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        tasks.append(task)
+
+    workflow = AsyncWorkflow([(AsyncParallelTask(tasks), "answers")], hooks=[collector])
+
+    context = await workflow.run()
+
+    assert context["answers"] == ["HI", "HI"]
+
+    (parallel,) = collector.get_spans("parallel.run")
+    runs = collector.get_spans("task.run")
+
+    assert len(runs) == 2
+    assert all(run.parent_id == parallel.span_id for run in runs)
+
+
+def test_spans_without_hooks_are_noops():
+    with span("api.call", provider="openai") as current:
+        current.set(cost=1.0)
+
+    assert not hasattr(current, "span_id")
+
+
+def test_prometheus_exporter_renders_metrics():
+    exporter = PrometheusExporter(buckets=(0.1, 1))
+
+    agent = Agent(
+        model="gpt-4o-mini", model_type="chat", api_key="test", hooks=[exporter]
+    )
+    task = Task(user="Hi", agent=agent)
+    plug(task)
+    task.run()
+
+    with pytest.raises(ValueError):
+        with span("tool.call", [exporter]):
+            raise ValueError("boom")
+
+    metrics = exporter.render()
+    labels = 'provider="openai",model="gpt-4o-mini"'
+
+    assert (
+        f'repenseai_span_duration_seconds_count{{span="api.call",{labels}}} 1'
+        in metrics
+    )
+    assert (
+        f'repenseai_span_duration_seconds_bucket{{span="task.run",{labels},le="+Inf"}} 1'
+        in metrics
+    )
+    assert 'repenseai_span_errors_total{span="tool.call",provider="",model=""} 1' in (
+        metrics
+    )
+    # Tokens of the task are not counted twice
+    assert f'repenseai_tokens_total{{{labels},type="prompt"}} 10' in metrics
+
+
+def test_opentelemetry_exporter_keeps_parents():
+    pytest.importorskip("opentelemetry.sdk")
+
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    memory = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+
+    exporter = OpenTelemetryExporter(provider.get_tracer("test"))
+
+    with span("task.run", [exporter]):
+        with span("api.call", provider="openai"):
+            pass
+
+    call, run = memory.get_finished_spans()
+
+    assert call.parent.span_id == run.context.span_id
+    assert call.attributes["repenseai.provider"] == "openai"
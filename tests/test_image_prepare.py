@@ -0,0 +1,112 @@
+import base64
+import io
+import random
+
+from PIL import Image
+
+from repenseai.genai.api.aws import VisionAPI as AWSVisionAPI
+from repenseai.genai.api.openai import VisionAPI as OpenAIVisionAPI
+from repenseai.utils.image import (
+    clear_prepared_images,
+    get_target_size,
+    image_to_data_url,
+    prepare_image,
+)
+
+
+def photo(size=(640, 480), mode="RGB"):
+    data = random.Random(0).randbytes(size[0] * size[1] * len(mode))
+    return Image.frombytes(mode, size, data)
+
+
+def chart(size=(800, 600)):
+    image = Image.new("RGB", size, "white")
+    image.paste((30, 90, 200), (100, 100, 300, 500))
+    image.paste((200, 60, 40), (400, 250, 600, 500))
+
+    return image
+
+
+def decode(entry):
+    return Image.open(io.BytesIO(base64.b64decode(entry["base64"])))
+
+
+def test_target_size_follows_provider_limits():
+    assert get_target_size((4000, 3000)) == (2048, 1536)
+    assert get_target_size((1000, 800)) == (1000, 800)
+
+    # OpenAI high detail: fit 2048 then shortest side 768
+    assert get_target_size((4000, 3000), "openai") == (1024, 768)
+
+    # Anthropic: 1568 max side and ~1.15 megapixels
+    width, height = get_target_size((1568, 1568), "anthropic")
+    assert width * height <= 1_150_000
+
+
+def test_target_size_never_upscales_or_breaks_limits():
+    # Small images are sent as they are
+    assert get_target_size((120, 120), "anthropic") == (120, 120)
+    assert get_target_size((100, 50), "mistral") == (100, 50)
+
+    # Very elongated images still fit the max side and pixel limits
+    for provider in ("anthropic", "mistral", "together"):
+        for size in ((100, 3000), (3000, 100), (20, 20000)):
+            width, height = get_target_size(size, provider)
+
+            assert max(width, height) <= 1568 and width * height <= 1_150_000
+            assert width <= size[0] and height <= size[1]
+
+    assert get_target_size((100, 3000), "anthropic") == (52, 1568)
+
+
+def test_prepare_image_chooses_format_by_content():
+    clear_prepared_images()
+
+    assert prepare_image(chart())["format"] == "PNG"
+    assert prepare_image(photo())["format"] == "JPEG"
+
+    transparent = photo(mode="RGBA")
+    transparent.putalpha(128)
+
+    assert prepare_image(transparent, "anthropic")["format"] == "WEBP"
+    assert prepare_image(transparent)["format"] == "PNG"
+
+
+def test_prepare_image_resizes_and_encodes():
+    clear_prepared_images()
+
+    entry = prepare_image(photo((3000, 2000)), "anthropic")
+    image = decode(entry)
+
+    assert image.format == "JPEG"
+    assert image.size == (entry["width"], entry["height"])
+    assert max(image.size) <= 1568
+    assert entry["media_type"] == "image/jpeg"
+
+
+def test_prepare_image_is_memoized_by_content():
+    clear_prepared_images()
+
+    first = prepare_image(chart())
+    second = prepare_image(chart())
+
+    assert first is second
+    assert prepare_image(chart(), "openai") is not first
+
+    raw = prepare_image(chart(), as_base64=False)
+    assert raw["bytes"] == base64.b64decode(first["base64"])
+
+
+def test_vision_apis_use_prepared_images():
+    clear_prepared_images()
+
+    api = OpenAIVisionAPI(api_key="test", model="gpt-4o-mini")
+    url = api._VisionAPI__process_image(photo())
+
+    assert url == image_to_data_url(photo(), "openai")
+    assert url.startswith("data:image/jpeg;base64,")
+
+    data, format = AWSVisionAPI(api_key="test")._process_image(chart())
+
+    assert format == "png"
+    assert Image.open(io.BytesIO(data)).size == (800, 600)
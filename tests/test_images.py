@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import pytest
+
+import httpx
+
+from repenseai.genai import images
+from repenseai.genai.api.anthropic import AsyncChatAPI
+from repenseai.genai.images import (
+    ImageCache,
+    aprefetch_images,
+    fetch_image,
+    fetch_image_base64,
+    get_image_urls,
+)
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+@pytest.fixture
+def server(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        path = request.url.path
+
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+
+        if path == "/missing.png":
+            return httpx.Response(404)
+
+        # /copy.png serves the same bytes as /a.png
+        content = PNG if path in ("/a.png", "/copy.png") else path.encode() * 16
+
+        return httpx.Response(200, content=content, headers={"etag": '"v1"'})
+
+    async def async_handler(request):
+        await asyncio.sleep(0.05)
+        return handler(request)
+
+    clients = {
+        False: httpx.Client(transport=httpx.MockTransport(handler)),
+        True: httpx.AsyncClient(transport=httpx.MockTransport(async_handler)),
+    }
+
+    def get_http_client(provider, asynchronous=False):
+        return clients[asynchronous]
+
+    monkeypatch.setattr(images, "get_http_client", get_http_client)
+    monkeypatch.setattr(images, "image_cache", ImageCache())
+
+    return calls
+
+
+def test_fetch_image_is_cached_by_content(server):
+    assert fetch_image("https://example.com/a.png") == PNG
+    assert fetch_image("https://example.com/a.png") == PNG
+    assert fetch_image("https://example.com/copy.png") == PNG
+
+    assert len(server) == 2
+    assert images.image_cache.stats()["images"] == 1
+    assert images.image_cache.stats()["hits"] == 1
+
+    encoded = fetch_image_base64("https://example.com/copy.png")
+    assert base64.b64decode(encoded) == PNG
+    assert len(server) == 2
+
+
+def test_image_cache_lru_eviction(server):
+    cache = ImageCache(maxsize=2)
+
+    for name in ("b", "c", "b", "d"):
+        fetch_image(f"https://example.com/{name}.png", cache)
+
+    assert len(server) == 3
+    assert cache.get("https://example.com/c.png") is None
+    assert cache.get("https://example.com/b.png") is not None
+
+
+def test_image_cache_revalidates_with_etag(server):
+    cache = ImageCache(revalidate=True)
+
+    first = fetch_image("https://example.com/b.png", cache)
+    second = fetch_image("https://example.com/b.png", cache)
+
+    assert first == second
+    assert len(server) == 2
+    assert server[1].headers["if-none-match"] == '"v1"'
+    assert cache.stats()["misses"] == 1
+
+
+def test_fetch_errors_are_not_cached(server):
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch_image("https://example.com/missing.png")
+
+    assert images.image_cache.stats()["images"] == 0
+
+
+@pytest.mark.asyncio
+async def test_aprefetch_images_runs_concurrently(server):
+    urls = [f"https://example.com/{i}.png" for i in range(8)]
+
+    start = asyncio.get_running_loop().time()
+    entries = await aprefetch_images(urls + urls)
+    elapsed = asyncio.get_running_loop().time() - start
+
+    assert list(entries) == urls
+    assert len(server) == 8
+    assert elapsed < 0.3
+
+
+@pytest.mark.asyncio
+async def test_anthropic_prompt_images_fetched_once(server):
+    api = AsyncChatAPI(api_key="test", model="claude-3-5-sonnet-20241022")
+
+    def build_prompt():
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": "https://example.com/a.png"},
+                    }
+                ],
+            },
+            {"role": "user", "content": [{"type": "text", "text": "What is it?"}]},
+        ]
+
+    assert get_image_urls(build_prompt()) == ["https://example.com/a.png"]
+
+    for _ in range(3):
+        prompt = await api._AsyncChatAPI__process_prompt_list(build_prompt())
+
+    source = prompt[0]["content"][0]["source"]
+
+    assert base64.b64decode(source["data"]) == PNG
+    assert source["media_type"] == "image/png"
+    assert len(server) == 1
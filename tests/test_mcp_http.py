@@ -0,0 +1,92 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+
+from mcp.server.fastmcp import FastMCP
+
+from repenseai.genai.mcp.server import Server, ServerPool
+
+
+BMI_ARGS = {"weight_kg": 105, "height_m": 1.77}
+
+
+def build_app():
+    mcp = FastMCP("BMI")
+
+    @mcp.tool()
+    def calculate_bmi(weight_kg: float, height_m: float) -> float:
+        """Calculate BMI given weight in kg and height in meters"""
+        return weight_kg / (height_m**2)
+
+    return mcp.sse_app()
+
+
+@pytest.fixture(scope="module")
+def url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(
+        build_app(),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        timeout_graceful_shutdown=1,
+    )
+    server = uvicorn.Server(config)
+
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+    yield f"http://127.0.0.1:{port}/sse"
+
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def test_server_transport_from_url():
+    assert Server(name="a", command="python", args=[]).transport == "stdio"
+    assert Server(name="b", url="http://localhost/sse").transport == "sse"
+    assert Server(name="c", url="http://localhost/mcp").transport == "streamable_http"
+
+    with pytest.raises(ValueError):
+        Server(name="d")
+
+    with pytest.raises(ValueError):
+        Server(name="e", url="http://localhost/sse", transport="websocket")
+
+
+@pytest.mark.asyncio
+async def test_sse_server_call_tool(url):
+    server = Server(name="bmi", url=url)
+
+    try:
+        tools = await server.list_tools()
+        assert [tool.name for tool in tools] == ["calculate_bmi"]
+
+        response = await server.call_tool("calculate_bmi", BMI_ARGS)
+        assert response.content[0].text.startswith("33.5")
+    finally:
+        await server.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_sse_server_shared_by_pool(url):
+    async with ServerPool([Server(name="bmi", url=url, workers=2)]) as pool:
+        session = pool.connections["bmi"][0].session
+
+        responses = await asyncio.gather(
+            *[pool.call_tool("calculate_bmi", BMI_ARGS) for _ in range(6)]
+        )
+
+        assert all(r.content[0].text.startswith("33.5") for r in responses)
+        assert pool.connections["bmi"][0].session is session
+        assert pool.metrics()["bmi"]["calls"] == 6
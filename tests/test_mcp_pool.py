@@ -0,0 +1,231 @@
+import asyncio
+import pytest
+import sys
+import threading
+
+from repenseai.genai.mcp.server import Server, ServerPool
+
+
+BMI_ARGS = {"weight_kg": 105, "height_m": 1.77}
+
+
+def build_pool(**kwargs):
+    return ServerPool(
+        [
+            Server(
+                name="bmi", command=sys.executable, args=["tests/mcp_server_bmi.py"]
+            ),
+            Server(
+                name="diet", command=sys.executable, args=["tests/mcp_server_diet.py"]
+            ),
+        ],
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_starts_lazily_and_reuses_servers():
+    pool = build_pool()
+
+    try:
+        assert pool.connections == {}
+
+        tools = await pool.get_all_tools()
+        assert "calculate_bmi" in [tool.name for tool in tools]
+
+        session = pool.connections["bmi"][0].session
+        args = {"weight_kg": 105, "height_m": 1.77}
+
+        for _ in range(3):
+            response = await pool.call_tool("calculate_bmi", args)
+            assert response.content[0].text.startswith("33.5")
+
+        assert pool.connections["bmi"][0].session is session
+        assert await pool.health_check() == {"bmi": True, "diet": True}
+    finally:
+        await pool.stop()
+
+    assert pool.connections == {}
+
+
+@pytest.mark.asyncio
+async def test_pool_restarts_crashed_server():
+    pool = build_pool(health_check_interval=0)
+
+    try:
+        await pool.start()
+
+        connection = pool.connections["bmi"][0]
+        connection.task.cancel()
+
+        response = await pool.call_tool(
+            "calculate_bmi", {"weight_kg": 105, "height_m": 1.77}
+        )
+
+        assert response.content[0].text.startswith("33.5")
+        assert pool.connections["bmi"][0].is_alive
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("retry_on_crash", [False, True])
+async def test_pool_server_dying_during_a_call(retry_on_crash):
+    server = Server(
+        name="bmi",
+        command=sys.executable,
+        args=["tests/mcp_server_bmi.py"],
+        retry_on_crash=retry_on_crash,
+    )
+    pool = ServerPool([server])
+    calls = []
+
+    try:
+        await pool.start()
+
+        connection = pool.connections["bmi"][0]
+
+        async def dying(tool_name, args):
+            calls.append(tool_name)
+            connection.task.cancel()
+            await asyncio.wait([connection.task], timeout=10)
+            raise ConnectionError("broken pipe")
+
+        connection.session.call_tool = dying
+
+        if retry_on_crash:
+            response = await pool.call_tool("calculate_bmi", BMI_ARGS)
+            assert response.content[0].text.startswith("33.5")
+        else:
+            with pytest.raises(ConnectionError, match="died during a call"):
+                await pool.call_tool("calculate_bmi", BMI_ARGS)
+
+        # The tool is never sent twice to the dead session, the worker is back
+        assert calls == ["calculate_bmi"]
+        assert connection.is_alive
+    finally:
+        await pool.stop()
+
+
+def owner_tasks(pool):
+    return [c.task for workers in pool.connections.values() for c in workers]
+
+
+def test_pool_stops_from_another_asyncio_run():
+    pool = build_pool()
+
+    asyncio.run(pool.start())
+    tasks = owner_tasks(pool)
+
+    asyncio.run(pool.stop())
+
+    assert tasks and all(task.done() for task in tasks)
+    assert pool.connections == {}
+
+
+def test_pool_stops_servers_of_a_suspended_loop():
+    pool = build_pool()
+    loop = asyncio.new_event_loop()
+
+    try:
+        loop.run_until_complete(pool.start())
+        tasks = owner_tasks(pool)
+
+        # The first loop is not running: its servers would be left behind
+        assert not any(task.done() for task in tasks)
+
+        asyncio.run(pool.stop())
+
+        assert all(task.done() for task in tasks)
+        assert pool.connections == {}
+    finally:
+        loop.close()
+
+
+def test_pool_stops_servers_on_their_own_running_loop():
+    pool = build_pool()
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    try:
+        asyncio.run_coroutine_threadsafe(pool.start(), loop).result(timeout=30)
+        tasks = owner_tasks(pool)
+
+        asyncio.run(pool.stop())
+
+        assert all(task.done() for task in tasks)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_unknown_tool():
+    async with build_pool() as pool:
+        with pytest.raises(ValueError):
+            await pool.call_tool("unknown", {})
+
+
+@pytest.mark.asyncio
+async def test_server_workers_spread_concurrent_calls():
+    server = Server(
+        name="bmi",
+        command=sys.executable,
+        args=["tests/mcp_server_bmi.py"],
+        workers=2,
+    )
+
+    try:
+        await server.connect()
+
+        responses = await asyncio.gather(
+            *[server.call_tool("calculate_bmi", BMI_ARGS) for _ in range(4)]
+        )
+
+        assert all(r.content[0].text.startswith("33.5") for r in responses)
+
+        metrics = server.metrics()
+
+        assert metrics["workers"] == 2
+        assert metrics["alive"] == 2
+        assert metrics["calls"] == 4
+        assert metrics["queue_depth"] == 0
+        assert [c.calls for c in server.connections] == [2, 2]
+    finally:
+        await server.cleanup()
+
+    assert server.connections == []
+
+
+@pytest.mark.asyncio
+async def test_pool_spawns_workers_under_load():
+    pool = ServerPool(
+        [
+            Server(
+                name="bmi",
+                command=sys.executable,
+                args=["tests/mcp_server_bmi.py"],
+                workers=3,
+            )
+        ]
+    )
+
+    try:
+        await pool.start()
+        assert pool.metrics()["bmi"]["alive"] == 1
+
+        await pool.call_tool("calculate_bmi", BMI_ARGS)
+        assert pool.metrics()["bmi"]["alive"] == 1
+
+        await asyncio.gather(
+            *[pool.call_tool("calculate_bmi", BMI_ARGS) for _ in range(3)]
+        )
+
+        metrics = pool.metrics()
+        assert metrics["bmi"]["alive"] == 3
+        assert metrics["bmi"]["calls"] == 4
+        assert metrics["bmi"]["peak_queue_depth"] == 1
+    finally:
+        await pool.stop()
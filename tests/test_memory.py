@@ -0,0 +1,130 @@
+import json
+
+import httpx
+
+from openai import OpenAI
+
+from repenseai.genai.agent import Agent
+from repenseai.genai.memory import (
+    SUMMARY_PREFIX,
+    SummaryMemory,
+    TokenWindowMemory,
+    WindowMemory,
+    split_turns,
+)
+from repenseai.genai.tasks.api import Task
+
+
+def mock_client(answer, requests=None):
+    def handler(request):
+        if requests is not None:
+            requests.append(json.loads(request.content))
+
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": answer},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 5,
+                    "completion_tokens": 1,
+                    "total_tokens": 6,
+                },
+            },
+        )
+
+    return OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+
+def chat(memory, turns, requests=None):
+    agent = Agent(model="gpt-4o-mini", model_type="chat", api_key="test")
+
+    task = Task(user="Turn 0", agent=agent, memory=memory)
+    task.api.client = mock_client("Answer", requests)
+    task.run()
+
+    for turn in range(1, turns):
+        task.add_user_message(f"Turn {turn}")
+        task.run()
+
+    return task
+
+
+def test_split_turns_keeps_tool_calls_in_their_turn():
+    messages = [
+        {"role": "system", "content": "Be brief"},
+        {"role": "user", "content": "Weather?"},
+        {"role": "assistant", "tool_calls": [{"id": "1"}]},
+        {"role": "tool", "tool_call_id": "1", "content": "Sunny"},
+        {"role": "assistant", "content": "Sunny"},
+        {"role": "user", "content": "Thanks"},
+    ]
+
+    system, turns = split_turns(messages)
+
+    assert system == messages[:1]
+    assert turns == [messages[1:5], messages[5:]]
+
+
+def test_window_memory_keeps_last_turns():
+    requests = []
+    task = chat(WindowMemory(max_turns=2), turns=6, requests=requests)
+
+    assert len(task.prompt) == 4
+    assert task.prompt[0]["content"][0]["text"] == "Turn 4"
+
+    # The payload stays flat: at most 2 previous turns and the new message
+    assert max(len(r["messages"]) for r in requests) == 5
+
+
+def test_token_window_memory():
+    task = chat(TokenWindowMemory(max_tokens=30), turns=6)
+
+    assert task.agent.count_tokens(task.prompt) <= 30
+    assert task.prompt[-1] == {"role": "assistant", "content": "Answer"}
+
+
+def test_summary_memory_swaps_in_background_summary():
+    summarizer = Agent(model="gpt-4o-mini", model_type="chat", api_key="test")
+    memory = SummaryMemory(summarizer, keep_turns=2, summarize_after=3)
+
+    summaries = []
+
+    def summarize(messages):
+        summaries.append(messages)
+
+        task = Task(user=memory.prompt, agent=summarizer, simple_response=True)
+        task.api.client = mock_client("Earlier turns")
+
+        return task.run({"conversation": "..."})
+
+    memory.summarize = summarize
+
+    task = chat(memory, turns=4)
+
+    # 4 turns: the 2 oldest are being summarized
+    memory.wait()
+    assert len(summaries) == 1 and len(summaries[0]) == 4
+
+    task.add_user_message("Turn 4")
+    task.run()
+
+    assert task.prompt[0]["content"] == SUMMARY_PREFIX + "Earlier turns"
+    assert task.prompt[2]["content"][0]["text"] == "Turn 2"
+    assert memory.summary == "Earlier turns"
+
+    clone = task.clone().memory
+    assert clone.summary is None and clone is not memory
@@ -0,0 +1,228 @@
+import json
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from anthropic import Anthropic
+from openai import OpenAI
+
+from repenseai.genai.agent import Agent
+from repenseai.genai.api.google import ChatAPI as GoogleChatAPI
+from repenseai.genai.api.google import VisionAPI as GoogleVisionAPI
+from repenseai.genai.prompt_cache import add_cache_control, tokens_cost
+from repenseai.genai.tasks.api import Task
+
+
+DOCUMENT = "lorem ipsum dolor sit amet " * 400
+
+
+def lookup(query: str) -> str:
+    """look something up"""
+    return query
+
+
+def count_breakpoints(json_data):
+    return json.dumps(json_data).count("cache_control")
+
+
+def test_breakpoints_on_stable_prefixes():
+    history = [
+        {"role": "user", "content": [{"type": "text", "text": DOCUMENT}]},
+        {"role": "assistant", "content": "Got it"},
+    ]
+    prompt = history + [{"role": "user", "content": "Summarize it"}]
+
+    json_data = add_cache_control(
+        {"model": "m", "messages": prompt, "tools": [{"name": "a"}, {"name": "b"}]}
+    )
+
+    # Tools are short: only the history and the last message are marked
+    assert "cache_control" not in json_data["tools"][-1]
+    assert json_data["messages"][1]["content"][0]["cache_control"] == {
+        "type": "ephemeral"
+    }
+    assert json_data["messages"][2]["content"] == [
+        {"type": "text", "text": "Summarize it", "cache_control": {"type": "ephemeral"}}
+    ]
+
+    # The prompt itself is left alone
+    assert count_breakpoints(prompt) == 0
+
+    short = {"messages": [{"role": "user", "content": "Hi"}]}
+    assert add_cache_control(short) == short
+
+    thinking = {
+        "messages": [
+            {
+                "role": "assistant",
+                "content": [
+                    {"type": "text", "text": DOCUMENT},
+                    {"type": "thinking", "thinking": "hmm", "signature": "x"},
+                ],
+            }
+        ]
+    }
+    marked = add_cache_control(thinking)["messages"][0]["content"]
+
+    assert "cache_control" in marked[0] and "cache_control" not in marked[1]
+
+
+def test_breakpoints_stay_under_the_limit():
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": DOCUMENT,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+        }
+        for _ in range(3)
+    ]
+    messages += [{"role": "user", "content": DOCUMENT} for _ in range(2)]
+
+    json_data = add_cache_control({"messages": messages})
+
+    assert count_breakpoints(json_data) == 4
+
+
+def test_anthropic_task_uses_prompt_cache():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+
+        return httpx.Response(
+            200,
+            json={
+                "id": "msg_1",
+                "type": "message",
+                "role": "assistant",
+                "model": "claude-3-5-haiku-20241022",
+                "content": [{"type": "text", "text": "Short summary"}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {
+                    "input_tokens": 10,
+                    "output_tokens": 5,
+                    "cache_read_input_tokens": 2000,
+                    "cache_creation_input_tokens": 0,
+                },
+            },
+        )
+
+    agent = Agent(
+        model="claude-3-5-haiku-20241022",
+        model_type="chat",
+        api_key="test",
+        tools=[lookup],
+    )
+    task = Task(
+        user="Summarize it",
+        agent=agent,
+        history=[{"role": "user", "content": DOCUMENT}],
+    )
+    task.api.client = Anthropic(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    response = task.run()
+
+    assert count_breakpoints(requests[0]["messages"]) == 2
+    assert count_breakpoints(task.prompt) == 0
+
+    tokens = response["tokens"]
+
+    assert tokens["prompt_tokens"] == 2010
+    assert tokens["cached_tokens"] == 2000
+
+    uncached = {"prompt_tokens": 2010, "completion_tokens": 5}
+    assert agent.calculate_cost(tokens) < agent.calculate_cost(uncached)
+
+    agent = Agent(
+        model="claude-3-5-haiku-20241022",
+        model_type="chat",
+        api_key="test",
+        prompt_cache=False,
+    )
+    assert agent.get_api().build_request([{"role": "user", "content": DOCUMENT}]) == {
+        "model": "claude-3-5-haiku-20241022",
+        "temperature": 0.0,
+        "max_tokens": 3500,
+        "messages": [{"role": "user", "content": DOCUMENT}],
+    }
+
+
+def test_openai_cached_tokens_are_reported_and_discounted():
+    def handler(request):
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Hi"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 2000,
+                    "completion_tokens": 1,
+                    "total_tokens": 2001,
+                    "prompt_tokens_details": {"cached_tokens": 1536},
+                },
+            },
+        )
+
+    agent = Agent(model="gpt-4o-mini", model_type="chat", api_key="test")
+    task = Task(user="Hello", agent=agent)
+    task.api.client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    tokens = task.run()["tokens"]
+
+    assert tokens["cached_tokens"] == 1536
+    assert tokens_cost(tokens, {"input": 1.0, "output": 2.0}, "openai") == (
+        pytest.approx((464 + 1536 * 0.5 + 2) / 1_000_000)
+    )
+    # DeepSeek reports cache hits on the top level
+    assert tokens_cost(
+        {"prompt_tokens": 100, "completion_tokens": 0, "prompt_cache_hit_tokens": 100},
+        {"input": 1.0, "output": 2.0, "cached_input": 0.1},
+        "deepseek",
+    ) == pytest.approx(10 / 1_000_000)
+
+
+def test_google_usage_reports_cached_tokens():
+    usage = SimpleNamespace(
+        prompt_token_count=2000,
+        candidates_token_count=10,
+        cached_content_token_count=1500,
+    )
+
+    for api_class in (GoogleChatAPI, GoogleVisionAPI):
+        api = api_class(api_key="test", model="gemini-2.0-flash")
+
+        # Usage comes from the response: no count_tokens round trips
+        api.client = None
+        api.response = SimpleNamespace(usage_metadata=usage, text="Hi")
+
+        assert api.get_tokens() == {
+            "completion_tokens": 10,
+            "prompt_tokens": 2000,
+            "total_tokens": 2010,
+            "cached_tokens": 1500,
+        }
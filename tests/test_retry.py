@@ -0,0 +1,172 @@
+import pytest
+import time
+
+import httpx
+
+from openai import OpenAI, BadRequestError, InternalServerError
+
+from repenseai.genai.agent import Agent
+from repenseai.genai.retry import RetryPolicy, get_retry_after, is_retryable
+from repenseai.genai.tasks.api import Task
+
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "Hello, World!"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 4, "total_tokens": 9},
+}
+
+
+def build_client(responses):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    return client, calls
+
+
+def create(client):
+    return client.chat.completions.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}]
+    )
+
+
+def test_retries_rate_limit_honoring_retry_after():
+    client, calls = build_client(
+        [
+            httpx.Response(429, headers={"retry-after-ms": "200"}, json={}),
+            httpx.Response(200, json=COMPLETION),
+        ]
+    )
+
+    start = time.monotonic()
+    response = RetryPolicy(max_retries=3).call(create, client)
+
+    assert response.choices[0].message.content == "Hello, World!"
+    assert len(calls) == 2
+    assert time.monotonic() - start >= 0.2
+
+
+def test_fatal_errors_are_not_retried():
+    client, calls = build_client([httpx.Response(400, json={})])
+
+    with pytest.raises(BadRequestError):
+        RetryPolicy(max_retries=3).call(create, client)
+
+    assert len(calls) == 1
+
+
+def test_deadline_stops_retrying():
+    client, calls = build_client(
+        [httpx.Response(503, headers={"retry-after": "5"}, json={})]
+    )
+
+    with pytest.raises(Exception):
+        RetryPolicy(max_retries=3, deadline=1).call(create, client)
+
+    assert len(calls) == 1
+
+
+def test_retries_http_responses():
+    responses = [httpx.Response(502), httpx.Response(502), httpx.Response(200)]
+    policy = RetryPolicy(max_retries=2, base_delay=0.01)
+
+    response = policy.call(lambda: responses.pop(0))
+
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_async_retries_connection_errors():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+
+        if len(attempts) < 3:
+            raise httpx.ConnectError("connection reset")
+
+        return "ok"
+
+    assert await RetryPolicy(base_delay=0.01).acall(flaky) == "ok"
+    assert len(attempts) == 3
+
+
+def test_deadline_bounds_each_attempt():
+    timeouts = []
+
+    def create(messages, timeout=None):
+        timeouts.append(timeout)
+
+        if len(timeouts) < 3:
+            raise httpx.ReadTimeout("timeout")
+
+        return "ok"
+
+    policy = RetryPolicy(max_retries=3, base_delay=0.05, deadline=2)
+
+    assert policy.call(create, [], timeout=60) == "ok"
+    assert 1.9 <= timeouts[0] <= 2
+    assert timeouts[2] < timeouts[1] < timeouts[0]
+
+    # Mistral takes milliseconds, calls without a timeout are left as they are
+    assert policy.call(lambda timeout_ms=None: timeout_ms) in range(1900, 2001)
+    assert policy.call(lambda value: value, "value") == "value"
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (TimeoutError(), True),
+        (httpx.ReadTimeout("timeout"), True),
+        (ValueError("bad"), False),
+    ],
+)
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_get_retry_after_http_date():
+    date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 10))
+    response = httpx.Response(429, headers={"retry-after": date})
+
+    assert 8 <= get_retry_after(response) <= 10
+
+
+def test_agent_policy_owns_the_retries():
+    agent = Agent(
+        model="gpt-4o-mini",
+        model_type="chat",
+        api_key="test",
+        retry_policy=RetryPolicy(max_retries=1, base_delay=0.01),
+    )
+    task = Task(user="Hi", agent=agent)
+
+    # The SDK does not retry on its own: attempts would multiply
+    assert task.api.client.max_retries == 0
+
+    client, calls = build_client([httpx.Response(503, json={})])
+    task.api.client = client
+
+    # Once the policy gives up, the error is raised instead of returning None
+    with pytest.raises(InternalServerError):
+        task.run()
+
+    assert len(calls) == 2
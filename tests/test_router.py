@@ -0,0 +1,192 @@
+import asyncio
+import pytest
+import time
+
+import httpx
+
+from anthropic import Anthropic, AsyncAnthropic
+from openai import AsyncOpenAI, OpenAI
+
+from repenseai.genai.router import AsyncRouterAgent, CircuitBreaker, RouterAgent
+from repenseai.genai.tasks.api import AsyncTask, Task
+
+
+CANDIDATES = [("openai", "gpt-4o-mini"), ("anthropic", "claude-3-5-haiku-20241022")]
+
+
+def openai_body(text):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+    }
+
+
+def anthropic_body(text):
+    return {
+        "id": "msg_1",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-3-5-haiku-20241022",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 2},
+    }
+
+
+class FakeProvider:
+    """Local stand-in for a provider endpoint, with a delay or an error."""
+
+    def __init__(self, body, delay=0.0, status=200):
+        self.body = body
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+
+    def response(self):
+        self.calls += 1
+
+        if self.status != 200:
+            return httpx.Response(self.status, json={"error": {"message": "down"}})
+
+        return httpx.Response(200, json=self.body)
+
+    def handler(self, request):
+        time.sleep(self.delay)
+        return self.response()
+
+    async def async_handler(self, request):
+        await asyncio.sleep(self.delay)
+        return self.response()
+
+
+def plug(task, openai, anthropic):
+    apis = task.api.apis
+
+    apis[0].client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(openai.handler)),
+    )
+    apis[1].client = Anthropic(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(anthropic.handler)),
+    )
+
+
+def test_router_fails_over_to_next_provider():
+    router = RouterAgent(CANDIDATES, model_type="chat", api_key="test")
+
+    openai = FakeProvider(openai_body("from openai"), status=500)
+    anthropic = FakeProvider(anthropic_body("from anthropic"))
+
+    task = Task(user="Hello", agent=router)
+    plug(task, openai, anthropic)
+
+    response = task.run()
+
+    assert response["response"] == "from anthropic"
+    assert response["cost"] == router.candidates[1].agent.calculate_cost(
+        response["tokens"]
+    )
+
+    metrics = router.metrics()
+
+    assert metrics["openai/gpt-4o-mini"]["failures"] == 1
+    assert metrics["anthropic/claude-3-5-haiku-20241022"]["wins"] == 1
+
+
+def test_router_hedges_slow_provider():
+    router = RouterAgent(
+        CANDIDATES, model_type="chat", api_key="test", hedge=True, hedge_delay=0.05
+    )
+
+    openai = FakeProvider(openai_body("from openai"), delay=0.5)
+    anthropic = FakeProvider(anthropic_body("from anthropic"))
+
+    task = Task(user="Hello", agent=router, simple_response=True)
+    plug(task, openai, anthropic)
+
+    start = time.monotonic()
+    response = task.run()
+
+    assert response == "from anthropic"
+    assert time.monotonic() - start < 0.4
+    assert router.metrics()["anthropic/claude-3-5-haiku-20241022"]["hedges"] == 1
+
+
+def test_router_circuit_breaker_skips_failing_provider():
+    router = RouterAgent(
+        CANDIDATES, model_type="chat", api_key="test", failure_threshold=2
+    )
+
+    openai = FakeProvider(openai_body("from openai"), status=503)
+    anthropic = FakeProvider(anthropic_body("from anthropic"))
+
+    for _ in range(4):
+        task = Task(user="Hello", agent=router, simple_response=True)
+        plug(task, openai, anthropic)
+
+        assert task.run() == "from anthropic"
+
+    assert openai.calls == 2
+    assert router.metrics()["openai/gpt-4o-mini"]["circuit"] == "open"
+
+
+def test_circuit_breaker_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_async_router_hedges_and_cancels_loser():
+    router = AsyncRouterAgent(
+        CANDIDATES, model_type="chat", api_key="test", hedge=True, hedge_delay=0.05
+    )
+
+    openai = FakeProvider(openai_body("from openai"), delay=0.05)
+    anthropic = FakeProvider(anthropic_body("from anthropic"), delay=1.0)
+
+    task = AsyncTask(user="Hello", agent=router, simple_response=True)
+    task.api = await router.get_api()
+
+    task.api.apis[0].client = AsyncOpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(openai.async_handler)
+        ),
+    )
+    task.api.apis[1].client = AsyncAnthropic(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(anthropic.async_handler)
+        ),
+    )
+
+    start = time.monotonic()
+
+    assert await task.run() == "from openai"
+    assert time.monotonic() - start < 0.5
@@ -0,0 +1,152 @@
+import httpx
+import pytest
+import time
+
+from openai import OpenAI
+
+from repenseai.genai import scheduler
+from repenseai.genai.agent import Agent
+from repenseai.genai.scheduler import RateLimiter, TokenBucket
+from repenseai.genai.tasks.api import Task
+
+
+def test_token_bucket_reserve_returns_wait():
+    bucket = TokenBucket(60)
+
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_token_bucket_invalid_capacity():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_rate_limiter_counts_the_prompt_once(monkeypatch):
+    calls = []
+
+    def count_tokens(prompt, provider, model):
+        calls.append(prompt)
+        return 100
+
+    monkeypatch.setattr(scheduler, "count_tokens", count_tokens)
+
+    limiter = RateLimiter()
+    limiter.set_limit("openai", tpm=1000)
+
+    ticket = limiter.acquire("openai", "gpt-4o-mini", "hi")
+
+    assert calls == ["hi"]
+    assert ticket["raw"] == 100 and ticket["reserved"] == 100
+
+
+def test_rate_limiter_rpm_blocks():
+    limiter = RateLimiter()
+    limiter.set_limit("openai", rpm=600)
+
+    start = time.monotonic()
+    for _ in range(600 + 2):
+        limiter.acquire("openai", "gpt-4o-mini", "hi")
+
+    assert time.monotonic() - start >= 0.15
+
+
+def test_rate_limiter_model_and_provider_limits_apply():
+    limiter = RateLimiter()
+    limiter.set_limit("openai", rpm=1000)
+    limiter.set_limit("openai", "gpt-4o", tpm=1000)
+
+    limiter.acquire("openai", "gpt-4o", "a" * 400)
+
+    provider_bucket = limiter.limits[("openai", None)]["rpm"]
+    model_bucket = limiter.limits[("openai", "gpt-4o")]["tpm"]
+
+    assert provider_bucket.available() == pytest.approx(999, abs=1)
+    assert model_bucket.available() == pytest.approx(1000 - 101, abs=1)
+
+
+def test_rate_limiter_learns_from_usage():
+    limiter = RateLimiter(smoothing=1.0)
+    limiter.set_limit("anthropic", tpm=100_000)
+
+    ticket = limiter.acquire("anthropic", "claude", "a" * 400)
+    limiter.record(
+        ticket,
+        {"prompt_tokens": 202, "completion_tokens": 50, "total_tokens": 252},
+    )
+
+    assert limiter.estimate("anthropic", "claude", "a" * 400) == 202 + 50
+
+    bucket = limiter.limits[("anthropic", None)]["tpm"]
+    assert bucket.available() == pytest.approx(100_000 - 252, abs=5)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_async_acquire():
+    limiter = RateLimiter()
+    limiter.set_limit("groq", tpm=600)
+
+    start = time.monotonic()
+    await limiter.aacquire("groq", "llama", "a" * 2400)
+    await limiter.aacquire("groq", "llama", "a" * 40)
+
+    assert time.monotonic() - start >= 1.0
+
+
+def test_failed_call_keeps_its_reservation():
+    responses = [
+        httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Hi"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 5000,
+                    "completion_tokens": 1000,
+                    "total_tokens": 6000,
+                },
+            },
+        ),
+        httpx.Response(400, json={"error": {"message": "bad request"}}),
+    ]
+
+    limiter = RateLimiter(smoothing=1.0)
+    limiter.set_limit("openai", tpm=100_000)
+
+    agent = Agent(
+        model="gpt-4o-mini", model_type="chat", api_key="test", rate_limiter=limiter
+    )
+    client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(
+            transport=httpx.MockTransport(lambda request: responses.pop(0))
+        ),
+    )
+
+    task = Task(user="Hello", agent=agent)
+    task.api.client = client
+    task.run()
+
+    bucket = limiter.limits[("openai", None)]["tpm"]
+    calibration = dict(limiter.calibration)
+    available = bucket.available()
+
+    # The next call of the same task fails: api.tokens still holds the first usage
+    task.add_user_message("Again")
+    reserved = limiter.estimate("openai", "gpt-4o-mini", task.prompt)
+
+    assert task.run()["response"] is None
+
+    # Charged the reservation, not the 6000 tokens of the previous call
+    assert bucket.available() == pytest.approx(available - reserved, abs=200)
+    assert limiter.calibration == calibration
@@ -0,0 +1,225 @@
+import httpx
+import pytest
+import sqlite3
+
+from openai import OpenAI
+
+from repenseai.genai.agent import Agent
+from repenseai.genai.router import RouterAgent
+from repenseai.genai.selection import MetricsStore, ModelSelector
+from repenseai.genai.tasks.api import Task
+
+
+CHEAP = ("openai", "gpt-4o-mini")
+PRICEY = ("openai", "gpt-4o")
+
+
+def fill(store, candidate, latency, count=10, ok=True):
+    for _ in range(count):
+        store.record(*candidate, latency, ok, {"completion_tokens": 100})
+
+
+def test_metrics_store_persists_between_runs(tmp_path):
+    path = str(tmp_path / "metrics.db")
+
+    store = MetricsStore(path=path)
+    fill(store, CHEAP, 0.5, count=9)
+    fill(store, CHEAP, 2.0, count=1, ok=False)
+    store.close()
+
+    stats = MetricsStore(path=path).get_stats(*CHEAP)
+
+    assert stats["calls"] == 10
+    assert stats["error_rate"] == 0.1
+    assert stats["p95"] == 0.5
+    assert stats["tokens_per_second"] == 200
+
+
+def test_metrics_store_batches_and_prunes_writes(tmp_path):
+    path = str(tmp_path / "metrics.db")
+
+    store = MetricsStore(path=path, window=5, flush_every=4, flush_interval=60)
+    fill(store, CHEAP, 0.5, count=3)
+
+    def rows():
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+
+    # Nothing is committed before the batch is full
+    assert rows() == 0
+
+    fill(store, CHEAP, 0.5, count=9)
+    store.flush()
+
+    # Only the last `window` calls of the model are kept
+    assert rows() == 5
+    store.close()
+
+    assert MetricsStore(path=path, window=3).get_stats(*CHEAP)["calls"] == 3
+
+
+def test_selector_rejects_unknown_models():
+    selector = ModelSelector(MetricsStore())
+
+    with pytest.raises(ValueError, match="Unknown chat models: my-model"):
+        selector.select(["gpt-4o-mini", "my-model"])
+
+
+def test_selector_picks_cheapest_model_meeting_targets():
+    store = MetricsStore()
+    selector = ModelSelector(store, max_latency=1.0)
+
+    models = ["gpt-4o", "gpt-4o-mini"]
+
+    # No data yet: the cheapest model gets the traffic
+    assert selector.select(models) == "gpt-4o-mini"
+
+    fill(store, CHEAP, 3.0)
+    fill(store, PRICEY, 0.4)
+
+    assert selector.select(models) == "gpt-4o"
+
+    # Nothing fast enough: fastest first
+    fill(store, PRICEY, 5.0, count=100)
+    assert selector.select(models) == "gpt-4o-mini"
+
+    selector = ModelSelector(store, min_quality=0.8, quality={"gpt-4o": 0.9})
+    assert selector.rank([CHEAP, PRICEY]) == [1, 0]
+
+
+def test_agent_records_call_metrics():
+    store = MetricsStore()
+
+    def handler(request):
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Hi"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 5,
+                    "completion_tokens": 1,
+                    "total_tokens": 6,
+                },
+            },
+        )
+
+    client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    agent = Agent(
+        model="gpt-4o-mini", model_type="chat", api_key="test", metrics_store=store
+    )
+    task = Task(user="Hello", agent=agent)
+    task.api.client = client
+    task.run()
+
+    router = RouterAgent(
+        [PRICEY, CHEAP],
+        model_type="chat",
+        api_key="test",
+        selector=ModelSelector(store),
+    )
+    task = Task(user="Hello", agent=router, simple_response=True)
+
+    for api in task.api.apis:
+        api.client = client
+
+    assert task.run() == "Hi"
+
+    # Both calls went to the cheaper model
+    assert store.get_stats(*CHEAP)["calls"] == 2
+    assert store.get_stats(*PRICEY)["calls"] == 0
+
+
+def test_failed_calls_record_no_usage():
+    calls = []
+
+    class Recorder:
+        def record(self, provider, model, latency, ok=True, tokens=None):
+            calls.append((ok, tokens))
+
+    responses = [
+        httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Hi"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 5,
+                    "completion_tokens": 1,
+                    "total_tokens": 6,
+                },
+            },
+        ),
+        httpx.Response(400, json={"error": {"message": "bad request"}}),
+    ]
+
+    agent = Agent(
+        model="gpt-4o-mini",
+        model_type="chat",
+        api_key="test",
+        metrics_store=Recorder(),
+    )
+    task = Task(user="Hello", agent=agent)
+    task.api.client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(
+            transport=httpx.MockTransport(lambda request: responses.pop(0))
+        ),
+    )
+
+    task.run()
+    task.add_user_message("Again")
+    task.run()
+
+    assert calls[0][0] and calls[0][1]["completion_tokens"] == 1
+    assert calls[1] == (False, None)
+
+
+def test_selector_uses_agent_prices():
+    store = MetricsStore()
+    custom = ("openai", "my-fine-tune")
+
+    fill(store, custom, 0.5)
+    fill(store, CHEAP, 0.5)
+
+    selector = ModelSelector(store)
+
+    # Unknown prices rank last instead of failing the call
+    assert selector.rank([custom, CHEAP]) == [1, 0]
+    assert selector.rank([custom, CHEAP], prices=[0.01, None]) == [0, 1]
+
+    router = RouterAgent(
+        [
+            {"provider": "openai", "model": "gpt-4o", "price": 0.01},
+            CHEAP,
+        ],
+        model_type="chat",
+        api_key="test",
+        selector=selector,
+    )
+
+    assert router.get_order() == [0, 1]
@@ -0,0 +1,314 @@
+import asyncio
+import json
+import pytest
+import threading
+import time
+
+import httpx
+
+from concurrent.futures import ThreadPoolExecutor
+
+from openai import AsyncOpenAI, OpenAI
+
+from repenseai.genai.agent import Agent, AsyncAgent
+from repenseai.genai.api import anthropic, openai
+from repenseai.genai.tasks import api as tasks_api
+from repenseai.genai.streaming import ToolCallAssembler, get_tool_call_deltas
+from repenseai.genai.tasks.api import AsyncTask, Task
+
+
+DELAY = 0.05
+
+
+def chunk(delta=None, usage=None, finish_reason=None):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": (
+            [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            if delta is not None
+            else []
+        ),
+        "usage": usage,
+    }
+
+
+def tool_delta(index, arguments, id=None, name=None):
+    function = {"arguments": arguments}
+
+    if name:
+        function["name"] = name
+
+    return chunk({"tool_calls": [{"index": index, "id": id, "function": function}]})
+
+
+EVENTS = [
+    chunk({"role": "assistant", "content": "Hello"}),
+    chunk({"content": ", World!"}),
+    chunk(usage={"prompt_tokens": 5, "completion_tokens": 4, "total_tokens": 9}),
+]
+
+
+TOOL_EVENTS = [
+    chunk({"role": "assistant", "content": None}),
+    tool_delta(0, '{"ci', id="call_0", name="get_weather"),
+    tool_delta(0, 'ty": "Rio"}'),
+    tool_delta(1, '{"city": "Lima"}', id="call_1", name="get_weather"),
+    chunk({}, finish_reason="tool_calls"),
+    chunk(usage={"prompt_tokens": 5, "completion_tokens": 8, "total_tokens": 13}),
+]
+
+
+def get_weather(city: str) -> str:
+    """get the weather of a city"""
+    return f"Sunny in {city}"
+
+
+def lines(events=EVENTS):
+    for event in events:
+        yield f"data: {json.dumps(event)}\n\n".encode()
+
+    yield b"data: [DONE]\n\n"
+
+
+def tool_handler(request):
+    # First turn calls the tools, the second one answers with their results
+    messages = json.loads(request.content)["messages"]
+    events = TOOL_EVENTS if messages[-1]["role"] == "user" else EVENTS
+
+    return httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, content=lines(events)
+    )
+
+
+def handler(request):
+    def body():
+        time.sleep(DELAY)
+        yield from lines()
+
+    return httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, content=body()
+    )
+
+
+async def async_handler(request):
+    async def body():
+        await asyncio.sleep(DELAY)
+
+        for line in lines():
+            yield line
+
+    return httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, content=body()
+    )
+
+
+def test_task_stream_yields_text_and_metrics():
+    agent = Agent(model="gpt-4o-mini", model_type="chat", api_key="test")
+    task = Task(user="Say 'Hello, World!'", agent=agent)
+
+    task.api.client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    events = list(task.stream())
+
+    assert [e["text"] for e in events if e["type"] == "text"] == ["Hello", ", World!"]
+
+    done = events[-1]
+
+    assert done["type"] == "done"
+    assert done["response"] == "Hello, World!"
+    assert done["tokens"]["total_tokens"] == 9
+    assert done["cost"] > 0
+    assert done["metrics"]["ttft"] >= DELAY
+    assert done["metrics"]["completion_tokens"] == 4
+    assert done["metrics"]["tokens_per_second"] > 0
+
+    assert task.metrics == done["metrics"]
+    assert task.prompt[-1] == {"role": "assistant", "content": "Hello, World!"}
+    assert task.api.stream is False
+
+
+@pytest.mark.asyncio
+async def test_async_task_stream():
+    agent = AsyncAgent(model="gpt-4o-mini", model_type="chat", api_key="test")
+    task = AsyncTask(user="Say 'Hello, World!'", agent=agent)
+
+    task.api = await agent.get_api()
+    task.api.client = AsyncOpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(async_handler)),
+    )
+
+    text = ""
+
+    async for event in task.stream():
+        if event["type"] == "text":
+            text += event["text"]
+
+    assert text == "Hello, World!"
+    assert event["type"] == "done"
+    assert event["metrics"]["ttft"] >= DELAY
+    assert task.metrics["chunks"] == 2
+
+
+def test_tool_call_deltas_are_normalized():
+    openai = chunk(
+        {
+            "tool_calls": [
+                {
+                    "index": 0,
+                    "id": "call_1",
+                    "function": {"name": "get_weather", "arguments": '{"ci'},
+                }
+            ]
+        }
+    )
+
+    anthropic = {
+        "type": "content_block_delta",
+        "index": 1,
+        "delta": {"type": "input_json_delta", "partial_json": 'ty": "Rio"}'},
+    }
+
+    bedrock = {
+        "contentBlockStart": {
+            "contentBlockIndex": 2,
+            "start": {"toolUse": {"toolUseId": "tool_1", "name": "get_weather"}},
+        }
+    }
+
+    assert get_tool_call_deltas(openai) == [
+        {"index": 0, "id": "call_1", "name": "get_weather", "arguments": '{"ci'}
+    ]
+    assert get_tool_call_deltas(anthropic) == [
+        {"index": 1, "id": None, "name": None, "arguments": 'ty": "Rio"}'}
+    ]
+    assert get_tool_call_deltas(bedrock) == [
+        {"index": 2, "id": "tool_1", "name": "get_weather", "arguments": ""}
+    ]
+    assert get_tool_call_deltas(chunk({"content": "Hi"})) == []
+
+
+def test_task_stream_runs_tool_calls():
+    agent = Agent(
+        model="gpt-4o-mini", model_type="chat", api_key="test", tools=[get_weather]
+    )
+    task = Task(user="Weather in Rio and Lima?", agent=agent)
+
+    task.api.client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(tool_handler)),
+    )
+
+    events = list(task.stream())
+    done = [e for e in events if e["type"] == "tool_call_done"]
+
+    assert [(e["id"], e["input"]) for e in done] == [
+        ("call_0", {"city": "Rio"}),
+        ("call_1", {"city": "Lima"}),
+    ]
+
+    # The first call starts running as soon as the second one begins
+    types = [e["type"] for e in events]
+    assert types.index("tool_call_done") < len(types) - types[::-1].index("tool_call")
+
+    results = next(e["results"] for e in events if e["type"] == "tool_results")
+    assert [r["content"] for r in results] == ["Sunny in Rio", "Sunny in Lima"]
+
+    assert events[-1]["response"] == "Hello, World!"
+
+    assert task.prompt[-4]["tool_calls"][1]["function"]["name"] == "get_weather"
+    assert task.prompt[-3]["tool_call_id"] == "call_0"
+    assert task.prompt[-1] == {"role": "assistant", "content": "Hello, World!"}
+
+
+def test_closing_the_stream_cancels_pending_tools(monkeypatch):
+    # A single busy worker: the tools of the stream stay queued
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(release.wait)
+
+    futures = []
+    submit = executor.submit
+
+    def record(*args, **kwargs):
+        futures.append(submit(*args, **kwargs))
+        return futures[-1]
+
+    monkeypatch.setattr(executor, "submit", record)
+    monkeypatch.setattr(tasks_api, "get_tool_executor", lambda: executor)
+
+    agent = Agent(
+        model="gpt-4o-mini", model_type="chat", api_key="test", tools=[get_weather]
+    )
+    task = Task(user="Weather in Rio and Lima?", agent=agent)
+
+    task.api.client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(tool_handler)),
+    )
+
+    events = task.stream()
+
+    for event in events:
+        if event["type"] == "tool_call_done":
+            break
+
+    events.close()
+    release.set()
+    executor.shutdown()
+
+    assert futures and all(future.cancelled() for future in futures)
+
+
+def test_tool_call_assembler_completes_calls_in_order():
+    assembler = ToolCallAssembler()
+
+    assert assembler.add({"index": 0, "id": "a", "name": "f", "arguments": '{"x'}) == []
+    assert assembler.add({"index": 0, "arguments": '": 1}'}) == []
+
+    completed = assembler.add({"index": 1, "id": "b", "name": "g", "arguments": "{"})
+
+    assert completed == [
+        {"id": "a", "name": "f", "arguments": '{"x": 1}', "input": {"x": 1}}
+    ]
+    assert assembler.close(1)[0]["input"] is None
+    assert assembler.close() == []
+    assert [call["id"] for call in assembler.get_calls()] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_truncated_tool_call_is_not_run():
+    calls = []
+
+    def lookup(city: str = "") -> str:
+        """look a city up"""
+        calls.append(city)
+        return city
+
+    assembler = ToolCallAssembler()
+    assembler.add(
+        {"index": 0, "id": "a", "name": "lookup", "arguments": '{"city": "Ri'}
+    )
+    call = assembler.close()[0]
+
+    results = [
+        openai.ChatAPI(api_key="test", tools=[lookup]).run_tool_call(call),
+        await openai.AsyncChatAPI(api_key="test", tools=[lookup]).run_tool_call(call),
+        anthropic.ChatAPI(api_key="test", tools=[lookup]).run_tool_call(call),
+        await anthropic.AsyncChatAPI(api_key="test", tools=[lookup]).run_tool_call(
+            call
+        ),
+    ]
+
+    assert not calls
+    assert all(r["content"].startswith("Error: Invalid arguments") for r in results)
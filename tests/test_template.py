@@ -0,0 +1,58 @@
+import pytest
+
+from repenseai.genai.agent import Agent
+from repenseai.genai.tasks.api import Task
+from repenseai.genai.template import PromptTemplate, compile_template
+
+
+class Unprintable:
+    def __str__(self):
+        raise AssertionError("values not in the template are never formatted")
+
+
+def test_render_in_one_pass():
+    template = PromptTemplate("Translate {text} to {language}. {text}!")
+
+    assert template.fields == ("text", "language")
+    assert template.render({"text": "Olá", "language": "English"}) == (
+        "Translate Olá to English. Olá!"
+    )
+
+    # Values are not rendered again: a value with braces stays as it is
+    assert template.render({"text": "{language}", "language": "English"}) == (
+        "Translate {language} to English. {language}!"
+    )
+
+    assert template.render({"text": 42, "language": "Go", "df": Unprintable()}) == (
+        "Translate 42 to Go. 42!"
+    )
+
+
+def test_missing_keys():
+    template = PromptTemplate('Answer {question} as {"answer": "..."}')
+
+    assert template.missing({}) == ["question", '"answer": "..."']
+
+    # Missing placeholders and literal braces are kept
+    assert template.render({"question": "why?"}) == 'Answer why? as {"answer": "..."}'
+
+    with pytest.raises(ValueError, match="Missing template keys: question"):
+        PromptTemplate("Answer {question}").render({}, strict=True)
+
+    assert compile_template("Hi {name}") is compile_template("Hi {name}")
+
+
+def test_task_renders_the_user_template():
+    agent = Agent(model="gpt-4o-mini", model_type="chat", api_key="test")
+
+    task = Task(user="Summarize {text}", agent=agent)
+    prompt = task._build_prompt({"text": "the report", "rows": Unprintable()})
+
+    assert prompt == [
+        {"role": "user", "content": [{"type": "text", "text": "Summarize the report"}]}
+    ]
+
+    strict = Task(user="Summarize {text}", agent=agent, strict_template=True)
+
+    with pytest.raises(ValueError):
+        strict._build_prompt({})
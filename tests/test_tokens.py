@@ -0,0 +1,149 @@
+import httpx
+import pytest
+
+from openai import OpenAI
+
+from repenseai.genai.agent import Agent
+from repenseai.genai.router import RouterAgent
+from repenseai.genai.tasks.api import Task
+from repenseai.genai.tokens import (
+    count_text_tokens,
+    count_tokens,
+    get_context_window,
+    trim_messages,
+)
+
+
+PARAGRAPH = "The quick brown fox jumps over the lazy dog. " * 20
+
+
+def message(role, text):
+    return {"role": role, "content": [{"type": "text", "text": text}]}
+
+
+def test_count_tokens():
+    assert count_text_tokens("") == 0
+    assert count_text_tokens("abcd" * 10) == 11
+
+    # Claude's tokenizer is denser than the default estimate
+    assert count_text_tokens(PARAGRAPH, "anthropic") > count_text_tokens(PARAGRAPH)
+
+    messages = [message("user", PARAGRAPH)]
+    text_tokens = count_text_tokens(PARAGRAPH, "openai", "gpt-4o")
+
+    assert count_tokens(messages, "openai", "gpt-4o") == text_tokens + 4 + 3
+    assert count_tokens(
+        messages, "openai", "gpt-4o", tools=[{"name": "lookup"}]
+    ) > count_tokens(messages, "openai", "gpt-4o")
+
+    image = {"type": "image_url", "image_url": {"url": "http://x/y.png"}}
+    assert count_tokens([{"role": "user", "content": [image]}]) == 765 + 4 + 3
+
+
+def test_context_windows():
+    assert get_context_window("gpt-4o-mini") == 128_000
+    assert get_context_window("gemini-1.5-pro") == 2_097_152
+    assert get_context_window("meta-llama/Llama-3.3-70B-Instruct-Turbo") == 128_000
+    assert get_context_window("unknown-model") is None
+
+    agent = Agent(
+        model="gpt-4o-mini", model_type="chat", api_key="test", context_window=1000
+    )
+    assert agent.get_context_window() == 1000
+
+    router = RouterAgent(
+        [("openai", "gpt-4o-mini"), ("anthropic", "claude-3-5-haiku-20241022")],
+        model_type="chat",
+        api_key="test",
+    )
+    assert router.get_context_window() == 128_000
+    assert router.count_tokens(PARAGRAPH) == count_text_tokens(PARAGRAPH, "anthropic")
+
+
+def test_trim_keeps_system_and_whole_turns():
+    messages = [
+        {"role": "system", "content": "Be brief"},
+        message("user", PARAGRAPH),
+        {"role": "assistant", "tool_calls": [{"id": "1"}]},
+        {"role": "tool", "tool_call_id": "1", "content": PARAGRAPH},
+        message("user", PARAGRAPH),
+        message("assistant", "Sure"),
+        message("user", "Thanks"),
+    ]
+
+    assert trim_messages(messages, 10_000) is messages
+
+    limit = count_tokens(messages[:1] + messages[4:])
+    trimmed = trim_messages(messages, limit)
+
+    # The tool call and its result are dropped together
+    assert trimmed == messages[:1] + messages[4:]
+    assert trim_messages(messages, 1) == messages[:1] + messages[-1:]
+
+
+def test_task_preflight_budget():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Hi"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 5,
+                    "completion_tokens": 1,
+                    "total_tokens": 6,
+                },
+            },
+        )
+
+    history = [message("user", PARAGRAPH), message("assistant", "Ok")] * 5
+
+    agent = Agent(
+        model="gpt-4o-mini",
+        model_type="chat",
+        api_key="test",
+        max_tokens=100,
+        context_window=1000,
+    )
+
+    task = Task(user="Hello", agent=agent, history=history, on_overflow="raise")
+    task.api.client = OpenAI(
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    assert task.count_tokens() > 900
+    assert not task.fits_context()
+    assert task.estimate_cost(completion_tokens=0) == agent.calculate_cost(
+        {"prompt_tokens": task.count_tokens(), "completion_tokens": 0}
+    )
+
+    # Nothing is sent when the prompt does not fit
+    with pytest.raises(ValueError, match="over the 900 available"):
+        task.run()
+
+    assert not calls
+
+    task.on_overflow = "trim"
+
+    assert task.run()["response"] == "Hi"
+    assert len(calls) == 1
+    assert task.count_tokens() <= 900
+    assert task.prompt[-2] == message("user", "Hello")
+
+    with pytest.raises(ValueError):
+        Task(user="Hello", agent=agent, on_overflow="drop")
@@ -0,0 +1,117 @@
+import pytest
+import asyncio
+import json
+import time
+
+from repenseai.genai.api import anthropic, openai
+
+
+def slow_upper(text):
+    """upper case the text slowly"""
+    time.sleep(0.2)
+    return text.upper()
+
+
+def broken(text):
+    """always fails"""
+    raise RuntimeError("boom")
+
+
+async def async_slow_lower(text):
+    """lower case the text slowly"""
+    await asyncio.sleep(0.2)
+    return text.lower()
+
+
+def openai_message(*calls):
+    return {
+        "role": "assistant",
+        "tool_calls": [
+            {
+                "id": f"call_{i}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps({"text": text})},
+            }
+            for i, (name, text) in enumerate(calls)
+        ],
+    }
+
+
+def anthropic_message(*calls):
+    return {
+        "role": "assistant",
+        "content": [
+            {"type": "tool_use", "id": f"call_{i}", "name": name, "input": {"text": t}}
+            for i, (name, t) in enumerate(calls)
+        ],
+    }
+
+
+def test_sync_tool_calls_run_concurrently():
+    api = openai.ChatAPI(api_key="test", tools=[slow_upper, broken])
+    message = openai_message(
+        ("slow_upper", "a"), ("broken", "b"), ("slow_upper", "c"), ("slow_upper", "d")
+    )
+
+    start = time.monotonic()
+    results = api.process_tool_calls(message)
+
+    assert time.monotonic() - start < 0.5
+    assert [r["tool_call_id"] for r in results] == [f"call_{i}" for i in range(4)]
+    assert [r["content"] for r in results[::2]] == ["A", "C"]
+    assert results[1]["content"].startswith("Error: Tool 'broken'")
+
+
+def test_sync_anthropic_tool_calls_run_concurrently():
+    api = anthropic.ChatAPI(api_key="test", tools=[slow_upper])
+    message = anthropic_message(("slow_upper", "a"), ("slow_upper", "b"))
+
+    start = time.monotonic()
+    results = api.process_tool_calls(message)[0]["content"]
+
+    assert time.monotonic() - start < 0.35
+    assert [r["content"] for r in results] == ["A", "B"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "module, build_message",
+    [(openai, openai_message), (anthropic, anthropic_message)],
+)
+async def test_async_tool_calls_run_concurrently(module, build_message):
+    api = module.AsyncChatAPI(
+        api_key="test", tools=[slow_upper, async_slow_lower, broken]
+    )
+    message = build_message(
+        ("slow_upper", "a"), ("async_slow_lower", "B"), ("broken", "c")
+    )
+
+    start = time.monotonic()
+    results = await api.process_tool_calls(message)
+
+    if module is anthropic:
+        results = results[0]["content"]
+
+    assert time.monotonic() - start < 0.35
+    assert [r["content"] for r in results[:2]] == ["A", "b"]
+    assert results[2]["content"].startswith("Error: Tool 'broken'")
+
+
+@pytest.mark.asyncio
+async def test_malformed_arguments_only_fail_their_call():
+    message = openai_message(("slow_upper", "a"), ("slow_upper", "b"))
+    message["tool_calls"][1]["function"]["arguments"] = '{"text": "b'
+
+    results = openai.ChatAPI(api_key="test", tools=[slow_upper]).process_tool_calls(
+        message
+    )
+
+    assert results[0]["content"] == "A"
+    assert results[1]["content"].startswith("Error: Invalid arguments")
+
+    api = openai.AsyncChatAPI(api_key="test", tools=[slow_upper])
+    results = await api.process_tool_calls(message)
+
+    assert results[0]["content"] == "A"
+    assert results[1]["content"].startswith("Error: Invalid arguments")
+    assert results[1]["tool_call_id"] == "call_1"